@@ -3,72 +3,229 @@
 Telegram RPG Bot - Main Entry Point v3.0
 Enhanced with Interactive Battles and Kingdom Wars
 """
+import argparse
 import asyncio
 import logging
+import signal
 import sys
+import time
 from pathlib import Path
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 
 from config.settings import settings
-from config.database import init_db
+from config.database import engine, init_db
+from data_init import seed_game_data
 from handlers import setup_handlers
 from middlewares.auth import AuthMiddleware
+from middlewares.metrics import MetricsMiddleware
 from middlewares.throttling import ThrottlingMiddleware
 from middlewares.war_block import WarBlockMiddleware
 from services.user_service import UserService
+from services.active_battles import active_battles
+from services.battle_counts import battle_counts
+from services.notification_service import notification_queue
+from services.edit_queue import edit_queue
+from services.fsm_storage import fsm_storage
+from services.ledger_service import money_ledger
+from services.shop_catalog import shop_catalog
+from services.leaderboard_service import leaderboards
+from services.opponent_index import opponent_index
 from utils.logging_config import setup_logging
+from utils.metrics import metrics_server
+from utils.task_registry import background_tasks
+from utils.update_runner import KeyedTaskRunner
 from war_scheduler import enhanced_war_scheduler
 
+# Imported by a fresh interpreter for the --profile-startup breakdown: what a worker loads before polling
+STARTUP_IMPORTS = "import bot_main; bot_main.create_dispatcher()"
+
+def create_bot() -> Bot:
+    return Bot(
+        token=settings.BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+
+def create_dispatcher(rate_limit: int = settings.RATE_LIMIT) -> Dispatcher:
+    """Dispatcher with the game middlewares and handlers"""
+    dp = Dispatcher(storage=fsm_storage)
+    
+    # Initialize services
+    user_service = UserService()
+    
+    # Setup middlewares
+    dp.update.outer_middleware(MetricsMiddleware())
+    dp.message.middleware(AuthMiddleware(user_service))
+    dp.callback_query.middleware(AuthMiddleware(user_service))
+    dp.message.middleware(ThrottlingMiddleware(rate_limit))
+    dp.callback_query.middleware(ThrottlingMiddleware(rate_limit))
+    dp.message.middleware(WarBlockMiddleware())
+    dp.callback_query.middleware(WarBlockMiddleware())
+    
+    # Setup handlers
+    setup_handlers(dp)
+    return dp
+
+async def load_caches(shard: int = 0, workers: int = 1):
+    """In-memory views served instead of queries; `shard` of `workers` when run by a worker"""
+    # Static shop content is served from memory
+    await shop_catalog.reload()
+    
+    # Leaderboards are kept in memory and updated as players change
+    await leaderboards.load()
+    
+    # PvP opponent lists are served from memory
+    await opponent_index.load()
+    
+    # Battles this process follows for the metrics
+    await active_battles.load(shard, workers)
+    await battle_counts.load(shard, workers)
+
+async def start_leader_duties(bot: Bot):
+    """War scheduler and personal notifications; run by one process only"""
+    enhanced_war_scheduler.set_bot(bot)
+    enhanced_war_scheduler.start()
+    logging.getLogger(__name__).info("Enhanced Kingdom War Scheduler started")
+    
+    # Start personal notification queue
+    await notification_queue.start()
+
+async def stop_services():
+    # Stop enhanced war scheduler on shutdown
+    enhanced_war_scheduler.stop()
+    await notification_queue.stop()
+    await edit_queue.stop()
+    await money_ledger.stop()
+
+async def shutdown(bot: Optional[Bot] = None, dp: Optional[Dispatcher] = None,
+                   runner: Optional[KeyedTaskRunner] = None, timeout: float = settings.SHUTDOWN_TIMEOUT):
+    """Finish in-flight work, persist in-memory state and close connections; intake must be stopped.
+
+    Updates being handled and background work (battles, wars being resolved)
+    share `timeout` seconds; what is still running then is cancelled and
+    reported. Battle round timers are cancelled right away.
+    """
+    logger = logging.getLogger(__name__)
+    started = time.monotonic()
+    deadline = started + timeout
+    
+    # No new war starts while draining; a war being resolved is background work
+    enhanced_war_scheduler.stop()
+    
+    updates = abandoned_updates = 0
+    if runner is not None:
+        updates = runner.pending_count
+        if not await runner.join(max(deadline - time.monotonic(), 0)):
+            abandoned_updates = await runner.cancel()
+    tasks, abandoned_tasks = await background_tasks.drain(max(deadline - time.monotonic(), 0))
+    drained = time.monotonic() - started
+    
+    # Queued notifications, edits and ledger entries are written out, FSM states by the dispatcher
+    await stop_services()
+    if dp is not None:
+        await dp.emit_shutdown(bot=bot, **dp.workflow_data)
+    if bot is not None:
+        await bot.session.close()
+    await engine.dispose()
+    await metrics_server.stop()
+    
+    logger.info(f"Shutdown: drained {updates} updates and {tasks} background tasks in {drained:.2f}s, "
+                f"persisted state in {time.monotonic() - started - drained:.2f}s")
+    if abandoned_updates or abandoned_tasks:
+        logger.warning(f"Shutdown deadline of {timeout}s reached: abandoned {abandoned_updates} updates "
+                       f"and {abandoned_tasks} background tasks")
+
 async def main():
     """Main bot function"""
     setup_logging()
     logger = logging.getLogger(__name__)
     
+    # SIGTERM (docker stop, systemd) stops the bot like Ctrl+C: intake ends, then shutdown() drains
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    
+    bot = dp = runner = None
     try:
         # Initialize database
         await init_db()
         logger.info("Database initialized successfully")
         
-        # Initialize bot and dispatcher
-        bot = Bot(
-            token=settings.BOT_TOKEN,
-            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-        )
+        items, skills = await seed_game_data()
+        if items or skills:
+            logger.info(f"Seeded {items} items and {skills} skills")
         
-        dp = Dispatcher(storage=MemoryStorage())
+        if settings.WORKERS > 1:
+            # Updates are handled by worker processes, this one only receives them
+            from supervisor import run_supervisor
+            await run_supervisor(settings.WORKERS)
+            return
         
-        # Initialize services
-        user_service = UserService()
+        await load_caches()
         
-        # Setup middlewares
-        dp.message.middleware(AuthMiddleware(user_service))
-        dp.callback_query.middleware(AuthMiddleware(user_service))
-        dp.message.middleware(ThrottlingMiddleware(settings.RATE_LIMIT))
-        dp.callback_query.middleware(ThrottlingMiddleware(settings.RATE_LIMIT))
-        dp.message.middleware(WarBlockMiddleware())
-        dp.callback_query.middleware(WarBlockMiddleware())
+        # Initialize bot and dispatcher
+        bot = create_bot()
+        dp = create_dispatcher()
         
-        # Setup handlers
-        setup_handlers(dp)
+        await start_leader_duties(bot)
         
-        # Start enhanced war scheduler
-        enhanced_war_scheduler.set_bot(bot)
-        enhanced_war_scheduler.start()
-        logger.info("Enhanced Kingdom War Scheduler started")
+        # Start batched money ledger writer
+        await money_ledger.start()
+        await metrics_server.start(settings.METRICS_SOCKET)
         
-        logger.info("Starting RPG Bot v3.0...")
-        await dp.start_polling(bot, skip_updates=True)
+        logger.info(f"Starting RPG Bot v3.0 ({settings.BOT_MODE})...")
+        runner = KeyedTaskRunner(settings.MAX_CONCURRENT_UPDATES)
+        if settings.BOT_MODE == "webhook":
+            from webhook import run_webhook
+            await run_webhook(dp, bot, runner)
+        else:
+            from polling import run_polling
+            await run_polling(dp, bot, runner)
         
+    except asyncio.CancelledError:
+        logger.info("Stop requested, shutting down")
     except Exception as e:
         logger.error(f"Error starting bot: {e}")
         sys.exit(1)
     finally:
-        # Stop enhanced war scheduler on shutdown
-        enhanced_war_scheduler.stop()
+        await shutdown(bot, dp, runner)
+
+async def profile_startup():
+    """Print how long each startup step and each import group takes; nothing is sent to Telegram"""
+    from utils.startup_profile import import_breakdown
+    
+    steps = []
+    
+    async def step(title: str, coro):
+        started = time.perf_counter()
+        await coro
+        steps.append((title, time.perf_counter() - started))
+    
+    async def build_dispatcher():
+        create_dispatcher()
+    
+    await step("init_db (schema check)", init_db())
+    await step("seed_game_data", seed_game_data())
+    await step("load_caches", load_caches())
+    await step("create_dispatcher", build_dispatcher())
+    
+    imports_total, groups = import_breakdown(STARTUP_IMPORTS)
+    
+    print(f"⏱️ Imports (fresh interpreter): {imports_total * 1000:.0f} ms")
+    for group, seconds in groups[:15]:
+        print(f"  {group:<40}{seconds * 1000:>8.1f} ms{seconds / imports_total * 100:>6.1f}%")
+    print(f"⏱️ Startup steps: {sum(seconds for _, seconds in steps) * 1000:.0f} ms")
+    for title, seconds in steps:
+        print(f"  {title:<40}{seconds * 1000:>8.1f} ms")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Telegram RPG Bot")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print an import-time and startup-step breakdown against the configured database, then exit")
+    args = parser.parse_args()
+    
+    try:
+        asyncio.run(profile_startup() if args.profile_startup else main())
+    except KeyboardInterrupt:
+        pass  # Already shut down: asyncio.run re-raises the Ctrl+C it turned into a cancellation
\ No newline at end of file
@@ -1,17 +1,43 @@
+from sqlalchemy import event, inspect, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from config.settings import settings
+from utils.metrics import metrics
 import logging
+import zlib
 
 logger = logging.getLogger(__name__)
 
 # Create async engine
+# SQLite file databases default to NullPool (a new connection per session);
+# a small persistent pool avoids reconnecting on every query under load
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False,
-    future=True
+    future=True,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=5,
+    max_overflow=10,
+    # pysqlite gives up on a busy database after 5s; SQLite's busy handler is not fair,
+    # so under a burst of purchases a waiting writer can be passed over for longer than that
+    connect_args={"timeout": settings.DB_BUSY_TIMEOUT}
 )
 
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the single writer"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+db_statements = metrics.counter('rpg_db_statements_total', 'SQL statements executed')
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    db_statements.inc()
+
 # Session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -30,6 +56,62 @@ async def get_session() -> AsyncSession:
         finally:
             await session.close()
 
+def _add_missing_columns(connection) -> list:
+    """Add columns declared on the models but missing in an existing database.
+    
+    create_all() only creates missing tables; new columns need a server default
+    so existing rows get a value. A column whose info has a 'backfill' SQL
+    expression is then set from it for the existing rows. Returns the added
+    columns as 'table.column'.
+    """
+    inspector = inspect(connection)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            default = f" DEFAULT {column.server_default.arg}" if column.server_default is not None else ""
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}"))
+            if 'backfill' in column.info:
+                connection.execute(text(f"UPDATE {table.name} SET {column.name} = ({column.info['backfill']})"))
+            added.append(f"{table.name}.{column.name}")
+            logger.info(f"Added column {table.name}.{column.name}")
+    return added
+
+def _add_missing_indexes(connection):
+    """Create indexes declared on the models for tables that already existed.
+    
+    create_all() only creates indexes together with their tables.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(connection, checkfirst=True)
+            except Exception as e:
+                logger.warning(f"Could not create index {index.name}: {e}")
+
+def _schema_fingerprint() -> int:
+    """Checksum of the declared tables, columns and indexes, kept in PRAGMA user_version"""
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        for column in table.columns:
+            default = column.server_default.arg if column.server_default is not None else ""
+            parts.append(f"{column.name} {column.type!r} {column.nullable} {default}")
+        parts.extend(sorted(
+            f"{index.name} {[column.name for column in index.columns]} {index.unique}" for index in table.indexes
+        ))
+    return zlib.crc32("\n".join(parts).encode()) & 0x7fffffff or 1
+
+def _schema_is_current(connection, fingerprint: int) -> bool:
+    """Whether the last init_db ran with the same models and every table is still there"""
+    if connection.execute(text("PRAGMA user_version")).scalar() != fingerprint:
+        return False
+    existing = {row[0] for row in connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    return existing.issuperset(Base.metadata.tables)
+
 async def init_db():
     """Initialize database"""
     try:
@@ -41,9 +123,40 @@ async def init_db():
         from models.monster import Monster
         from models.kingdom_war import KingdomWar, WarParticipation
         from models.interactive_battle import InteractiveBattle
+        from models.notification import PendingNotification
+        from models.ledger import MoneyLedgerEntry
+        from models.fsm import FSMRecord
         
+        fingerprint = _schema_fingerprint()
         async with engine.begin() as conn:
+            # Fast path for restarts: nothing to create or migrate
+            if await conn.run_sync(_schema_is_current, fingerprint):
+                logger.info("Database schema is up to date")
+                return
+            
+            has_ledger = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table('money_ledger'))
             await conn.run_sync(Base.metadata.create_all)
+            added_columns = await conn.run_sync(_add_missing_columns)
+            await conn.run_sync(_add_missing_indexes)
+            
+            if 'users.strength_bonus' in added_columns:
+                # Equipment bonus vector is new: fill it from the currently equipped items
+                for stat in ('strength', 'armor', 'hp', 'agility', 'mana'):
+                    await conn.execute(text(
+                        f"UPDATE users SET {stat}_bonus = ("
+                        f"SELECT COALESCE(SUM(items.{stat}_bonus), 0) FROM user_items "
+                        f"JOIN items ON items.id = user_items.item_id "
+                        f"WHERE user_items.user_id = users.id AND user_items.is_equipped = 1)"
+                    ))
+            
+            if not has_ledger:
+                # The ledger starts from the balances players already have
+                await conn.execute(text(
+                    "INSERT INTO money_ledger (user_id, delta, reason, ts) "
+                    "SELECT id, money, 'opening', CURRENT_TIMESTAMP FROM users WHERE money != 0"
+                ))
+            
+            await conn.execute(text(f"PRAGMA user_version = {fingerprint}"))
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
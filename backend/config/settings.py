@@ -8,9 +8,11 @@ class Settings(BaseSettings):
     
     # Database
     DB_PATH: str = "./rpg_game.db"
+    DB_BUSY_TIMEOUT: float = 30.0  # Seconds a writer waits for SQLite's write lock before "database is locked"
     
     # War Settings
     WAR_CHANNEL_ID: str = ""  # ID канала для уведомлений о войнах
+    WAR_MISFIRE_GRACE: int = 3600  # Seconds a missed war job may still run late after a restart
     
     # Game Settings
     MAX_LEVEL: int = 100
@@ -30,6 +32,39 @@ class Settings(BaseSettings):
     # Security
     RATE_LIMIT: int = 30
     
+    # Update ingestion: "polling" or "webhook"
+    BOT_MODE: str = "polling"
+    WEBHOOK_URL: str = ""  # Public HTTPS base URL Telegram posts to, e.g. https://bot.example.com
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_SECRET: str = ""  # Checked against X-Telegram-Bot-Api-Secret-Token
+    MAX_CONCURRENT_UPDATES: int = 100  # Handler tasks running at once; one user's updates always run in order
+    DROP_PENDING_UPDATES: bool = False  # Discard updates queued by Telegram while the bot was down
+    SHUTDOWN_TIMEOUT: float = 8.0  # Seconds in-flight updates and battles get on SIGTERM; keep under the stop grace period (docker: 10)
+    
+    # Multi-process mode: WORKERS > 1 starts a supervisor sharding updates by user over worker processes
+    WORKERS: int = 1
+    WORKER_SOCKET: str = "./rpg_bot_workers.sock"  # Unix socket between the supervisor and its workers
+    SCHEDULER_LOCK_PATH: str = "./rpg_bot_scheduler.lock"  # Held by the worker that runs the war scheduler
+    
+    # Each bot process serves its metrics here for web_monitor; workers append ".{shard}"
+    METRICS_SOCKET: str = "./rpg_bot_metrics.sock"
+    
+    # Outbound notifications (Telegram limits: ~30 msg/s globally, 1 msg/s per chat)
+    NOTIFY_GLOBAL_RATE: float = 30.0
+    NOTIFY_CHAT_RATE: float = 1.0
+    NOTIFY_MAX_IN_FLIGHT: int = 10
+    NOTIFY_MAX_ATTEMPTS: int = 5
+    
+    # Message edits: coalesced per message, paced per chat
+    EDIT_CHAT_RATE: float = 1.0
+    EDIT_CHAT_BURST: int = 3  # Edits a quiet chat may get at once before pacing kicks in
+    
+    # FSM storage (registration dialogs)
+    FSM_STATE_TTL: int = 86400  # Seconds before an untouched state counts as abandoned and is deleted
+    FSM_CACHE_IDLE: int = 600  # Seconds an unchanged key stays cached in memory after its last use
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     
@@ -37,6 +72,10 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"sqlite+aiosqlite:///{self.DB_PATH}"
     
+    @property
+    def SCHEDULER_DATABASE_URL(self) -> str:
+        return f"sqlite:///{self.DB_PATH}"
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,24 +1,23 @@
 from aiogram import Dispatcher
-from handlers.start import router as start_router
-from handlers.profile import router as profile_router
-from handlers.battle import router as battle_router
-from handlers.shop import router as shop_router
-from handlers.inventory import router as inventory_router
-from handlers.interactive_battle import router as interactive_battle_router
-from handlers.kingdom_war import router as kingdom_war_router
-from handlers.enhanced_interactive_battle import router as enhanced_interactive_battle_router
-from handlers.enhanced_pvp_battle import router as enhanced_pvp_battle_router
-from handlers.enhanced_main_battle import router as enhanced_main_battle_router
+import importlib
+
+# Handler modules in routing order; imported when a dispatcher is set up,
+# so importing the package (e.g. from the supervisor) stays cheap
+HANDLER_MODULES = (
+    'start',
+    'profile',
+    'battle',
+    'shop',
+    'inventory',
+    'interactive_battle',
+    'kingdom_war',
+    'enhanced_interactive_battle',
+    'enhanced_pvp_battle',
+    'enhanced_main_battle',
+    'leaderboard',
+)
 
 def setup_handlers(dp: Dispatcher):
     """Setup all handlers"""
-    dp.include_router(start_router)
-    dp.include_router(profile_router)
-    dp.include_router(battle_router)
-    dp.include_router(shop_router)
-    dp.include_router(inventory_router)
-    dp.include_router(interactive_battle_router)
-    dp.include_router(kingdom_war_router)
-    dp.include_router(enhanced_interactive_battle_router)
-    dp.include_router(enhanced_pvp_battle_router)
-    dp.include_router(enhanced_main_battle_router)
+    for name in HANDLER_MODULES:
+        dp.include_router(importlib.import_module(f"handlers.{name}").router)
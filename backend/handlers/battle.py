@@ -1,13 +1,16 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from keyboards.main_menu import battle_menu_keyboard, kingdom_attack_keyboard, battle_accept_keyboard
+from keyboards.main_menu import STATIC_KEYBOARDS, battle_menu_keyboard, kingdom_attack_keyboard, battle_accept_keyboard
+from keyboards.static import single_button_keyboard
 from services.battle_service import BattleService
 from services.user_service import UserService
+from services.opponent_index import opponent_index, LEVEL_RANGE
 from config.settings import GameConstants
 from sqlalchemy import select
 from config.database import AsyncSessionLocal
 from models.user import User
+from models.ledger import LedgerReasonEnum
 import random
 
 router = Router()
@@ -22,8 +25,8 @@ async def show_battle_menu(callback: CallbackQuery, user, is_registered: bool):
     await callback.message.edit_text(
         f"⚔️ <b>Меню сражений</b>\n\n"
         f"👤 {user.name} | Уровень {user.level}\n"
-        f"💪 Сила: {user.strength} | 🛡️ Броня: {user.armor}\n"
-        f"❤️ HP: {user.current_hp}/{user.hp} | 🔮 Мана: {user.current_mana}/{user.mana}\n\n"
+        f"💪 Сила: {user.effective_stats.strength} | 🛡️ Броня: {user.effective_stats.armor}\n"
+        f"❤️ HP: {user.current_hp}/{user.max_hp} | 🔮 Мана: {user.current_mana}/{user.max_mana}\n\n"
         f"Выберите тип сражения:",
         reply_markup=battle_menu_keyboard()
     )
@@ -47,7 +50,8 @@ async def show_kingdom_attack(callback: CallbackQuery, user, is_registered: bool
     )
     await callback.answer()
 
-@router.callback_query(F.data.startswith("attack_"))
+# Exactly "attack_{kingdom}": battle rounds and war registration use longer "attack_" callbacks
+@router.callback_query(F.data.in_({f"attack_{kingdom}" for kingdom in GameConstants.KINGDOMS}))
 async def attack_kingdom(callback: CallbackQuery, user, is_registered: bool):
     """Show players from target kingdom"""
     if not is_registered:
@@ -57,21 +61,10 @@ async def attack_kingdom(callback: CallbackQuery, user, is_registered: bool):
     target_kingdom = callback.data.replace("attack_", "")
     kingdom_info = GameConstants.KINGDOMS[target_kingdom]
     
-    # Get online players from target kingdom (level range ±5)
-    async with AsyncSessionLocal() as session:
-        min_level = max(1, user.level - 5)
-        max_level = user.level + 5
-        
-        result = await session.execute(
-            select(User).where(
-                User.kingdom == target_kingdom,
-                User.level >= min_level,
-                User.level <= max_level,
-                User.id != user.id,
-                User.is_active == True
-            ).limit(10)
-        )
-        players = result.scalars().all()
+    # Random pick of active players from target kingdom (level range ±5)
+    min_level = max(1, user.level - LEVEL_RANGE)
+    max_level = user.level + LEVEL_RANGE
+    players = opponent_index.sample(target_kingdom, user.level, exclude_id=user.id, limit=10)
     
     if not players:
         await callback.answer(
@@ -110,7 +103,7 @@ async def challenge_player(callback: CallbackQuery, user, is_registered: bool):
     defender_id = int(callback.data.replace("challenge_", ""))
     
     # Check if user has enough HP
-    if user.current_hp < user.hp * 0.3:  # Need at least 30% HP
+    if user.current_hp < user.max_hp * 0.3:  # Need at least 30% HP
         await callback.answer(
             "❤️ Недостаточно здоровья для боя!\n"
             "Нужно минимум 30% HP",
@@ -135,9 +128,7 @@ async def challenge_player(callback: CallbackQuery, user, is_registered: bool):
         f"Вы вызвали на бой <b>{defender.name}</b> (Ур.{defender.level})\n"
         f"Ожидаем ответа противника...\n\n"
         f"ID битвы: #{battle.id}",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад в меню", callback_data="battle_menu")]
-        ])
+        reply_markup=single_button_keyboard("🔙 Назад в меню", "battle_menu")
     )
     
     # Here we would normally send notification to defender via bot
@@ -162,10 +153,7 @@ async def show_pvp_battles(callback: CallbackQuery, user, is_registered: bool):
             f"1. Выберите 'Атака королевства'\n"
             f"2. Выберите целевое королевство\n"
             f"3. Вызовите игрока на бой",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🏰 Атака королевства", callback_data="kingdom_attack")],
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
-            ])
+            reply_markup=STATIC_KEYBOARDS['pvp_no_challenges']
         )
         await callback.answer()
         return
@@ -225,10 +213,10 @@ async def view_battle_challenge(callback: CallbackQuery, user, is_registered: bo
         f"🏰 Королевство: <b>{kingdom_info['emoji']} {kingdom_info['name']}</b>\n\n"
         
         f"💪 <b>Характеристики противника:</b>\n"
-        f"⚔️ Сила: <b>{challenger.strength}</b>\n"
-        f"🛡️ Броня: <b>{challenger.armor}</b>\n"
-        f"❤️ Здоровье: <b>{challenger.hp}</b>\n"
-        f"💨 Проворность: <b>{challenger.agility}</b>\n\n"
+        f"⚔️ Сила: <b>{challenger.effective_stats.strength}</b>\n"
+        f"🛡️ Броня: <b>{challenger.effective_stats.armor}</b>\n"
+        f"❤️ Здоровье: <b>{challenger.max_hp}</b>\n"
+        f"💨 Проворность: <b>{challenger.effective_stats.agility}</b>\n\n"
         
         f"🏆 Статистика: {challenger.pvp_wins}W/{challenger.pvp_losses}L\n\n"
         f"Принять вызов?"
@@ -250,7 +238,7 @@ async def accept_battle(callback: CallbackQuery, user, is_registered: bool):
     battle_id = int(callback.data.replace("accept_battle_", ""))
     
     # Check if user has enough HP
-    if user.current_hp < user.hp * 0.3:  # Need at least 30% HP
+    if user.current_hp < user.max_hp * 0.3:  # Need at least 30% HP
         await callback.answer(
             "❤️ Недостаточно здоровья для боя!\n"
             "Нужно минимум 30% HP",
@@ -287,9 +275,7 @@ async def decline_battle(callback: CallbackQuery, user, is_registered: bool):
     await callback.message.edit_text(
         f"❌ <b>Вызов отклонён</b>\n\n"
         f"Вы отклонили вызов на бой.",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="pvp_battle")]
-        ])
+        reply_markup=single_button_keyboard("🔙 Назад", "pvp_battle")
     )
     await callback.answer("Вызов отклонён!")
 
@@ -348,9 +334,7 @@ async def check_battle_result(callback: CallbackQuery, user, is_registered: bool
     
     await callback.message.edit_text(
         battle_text,
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 В меню битв", callback_data="battle_menu")]
-        ])
+        reply_markup=single_button_keyboard("🔙 В меню битв", "battle_menu")
     )
     await callback.answer()
 
@@ -388,9 +372,7 @@ async def show_battle_stats(callback: CallbackQuery, user, is_registered: bool):
     
     await callback.message.edit_text(
         stats_text,
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
-        ])
+        reply_markup=single_button_keyboard("🔙 Назад", "battle_menu")
     )
     await callback.answer()
 
@@ -409,11 +391,7 @@ async def show_training_options(callback: CallbackQuery, user, is_registered: bo
         f"💡 Интерактивные бои дают больше опыта!"
     )
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⚔️ Быстрый бой", callback_data="quick_training")],
-        [InlineKeyboardButton(text="🎯 Интерактивный бой", callback_data="pve_encounter")],
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
-    ])
+    keyboard = STATIC_KEYBOARDS['training_menu']
     
     await callback.message.edit_text(training_text, reply_markup=keyboard)
     await callback.answer()
@@ -427,14 +405,14 @@ async def training_battle(callback: CallbackQuery, user, is_registered: bool):
     
     # Generate AI opponent with similar stats
     ai_level = max(1, user.level + random.randint(-2, 2))
-    ai_strength = user.strength + random.randint(-3, 3)
-    ai_armor = user.armor + random.randint(-3, 3)
-    ai_hp = user.hp + random.randint(-20, 20)
-    ai_agility = user.agility + random.randint(-3, 3)
+    ai_strength = user.effective_stats.strength + random.randint(-3, 3)
+    ai_armor = user.effective_stats.armor + random.randint(-3, 3)
+    ai_hp = user.max_hp + random.randint(-20, 20)
+    ai_agility = user.effective_stats.agility + random.randint(-3, 3)
     
     # Simple battle simulation
-    user_damage = max(1, user.strength + user.agility // 2 - ai_armor // 2)
-    ai_damage = max(1, ai_strength + ai_agility // 2 - user.armor // 2)
+    user_damage = max(1, user.effective_stats.strength + user.effective_stats.agility // 2 - ai_armor // 2)
+    ai_damage = max(1, ai_strength + ai_agility // 2 - user.effective_stats.armor // 2)
     
     user_hp = user.current_hp
     ai_hp_current = max(50, ai_hp)
@@ -466,9 +444,8 @@ async def training_battle(callback: CallbackQuery, user, is_registered: bool):
         # Update user stats (simplified)
         user_service = UserService()
         await user_service.add_experience(user.id, exp_reward)
-        await user_service.update_user(user.id, 
-                                     money=user.money + money_reward,
-                                     pve_wins=user.pve_wins + 1)
+        await user_service.add_money(user.id, money_reward, LedgerReasonEnum.pve_reward)
+        await user_service.update_user(user.id, pve_wins=user.pve_wins + 1)
         
         result_text = (
             f"{result}\n\n"
@@ -488,22 +465,18 @@ async def training_battle(callback: CallbackQuery, user, is_registered: bool):
     
     await callback.message.edit_text(
         f"🤖 <b>Тренировочный бой</b>\n\n{result_text}",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔄 Ещё бой", callback_data="training_battle")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
-        ])
+        reply_markup=STATIC_KEYBOARDS['training_result']
     )
     await callback.answer()
 
 # Placeholder handlers for future features
-@router.callback_query(F.data.in_(["dungeon_menu", "skills_menu", "events", "leaderboards"]))
+@router.callback_query(F.data.in_(["dungeon_menu", "skills_menu", "events"]))
 async def placeholder_features(callback: CallbackQuery):
     """Placeholder for future features"""
     feature_names = {
         "dungeon_menu": "Подземелья",
         "skills_menu": "Навыки", 
-        "events": "События",
-        "leaderboards": "Таблица лидеров"
+        "events": "События"
     }
     
     feature_name = feature_names.get(callback.data, "Эта функция")
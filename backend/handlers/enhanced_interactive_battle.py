@@ -1,8 +1,12 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.main_menu import STATIC_KEYBOARDS
+from keyboards.static import single_button_keyboard
 from services.enhanced_battle_service import EnhancedBattleService
+from services.edit_queue import edit_queue
 from models.interactive_battle import BattlePhaseEnum
+from utils.task_registry import background_tasks
 import asyncio
 
 router = Router()
@@ -14,7 +18,7 @@ async def start_enhanced_pve_encounter(callback: CallbackQuery, user, is_registe
         await callback.answer("Сначала нужно зарегистрироваться!")
         return
     
-    if user.current_hp < user.hp * 0.3:
+    if user.current_hp < user.max_hp * 0.3:
         await callback.answer("❤️ Недостаточно здоровья для боя! Нужно минимум 30% HP", show_alert=True)
         return
     
@@ -30,7 +34,7 @@ async def start_enhanced_pve_encounter(callback: CallbackQuery, user, is_registe
     # Enhanced monster card with flee chance info
     level_diff = user.level - monster_data['level']
     base_chance = 0.6
-    agility_bonus = (user.agility - 10) * 0.02
+    agility_bonus = (user.effective_stats.agility - 10) * 0.02
     level_bonus = level_diff * 0.05
     flee_chance = max(0.1, min(0.9, base_chance + agility_bonus + level_bonus))
     
@@ -51,9 +55,9 @@ async def start_enhanced_pve_encounter(callback: CallbackQuery, user, is_registe
         f"💰 Деньги: <b>+{monster_data['money_reward']}</b> золота\n\n"
         
         f"👤 <b>Ваше состояние:</b>\n"
-        f"❤️ HP: <b>{user.current_hp}/{user.hp}</b>\n"
-        f"🔮 Мана: <b>{user.current_mana}/{user.mana}</b>\n"
-        f"💨 Проворность: <b>{user.agility}</b>\n\n"
+        f"❤️ HP: <b>{user.current_hp}/{user.max_hp}</b>\n"
+        f"🔮 Мана: <b>{user.current_mana}/{user.max_mana}</b>\n"
+        f"💨 Проворность: <b>{user.effective_stats.agility}</b>\n\n"
         
         f"🏃‍♂️ <b>Шанс побега: {flee_chance:.1%}</b>\n"
         f"⚠️ При неудачном побеге монстр нанесёт удар!\n\n"
@@ -67,7 +71,7 @@ async def start_enhanced_pve_encounter(callback: CallbackQuery, user, is_registe
         [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
     ])
     
-    await callback.message.edit_text(monster_card, reply_markup=keyboard)
+    await edit_queue.edit(callback.message, monster_card, reply_markup=keyboard)
     await callback.answer()
 
 @router.callback_query(F.data.startswith("accept_enhanced_pve_"))
@@ -76,9 +80,7 @@ async def accept_enhanced_pve_battle(callback: CallbackQuery, user, is_registere
     battle_id = int(callback.data.replace("accept_enhanced_pve_", ""))
     
     battle_service = EnhancedBattleService()
-    battle = await battle_service.get_battle(battle_id)
-    
-    if not battle:
+    if not await battle_service.accept_pve_battle(battle_id, user.id):
         await callback.answer("❌ Битва не найдена!", show_alert=True)
         return
     
@@ -94,17 +96,17 @@ async def flee_enhanced_pve_battle(callback: CallbackQuery, user, is_registered:
     success, message, damage = await battle_service.attempt_flee(battle_id, user.id)
     
     if success:
-        await callback.message.edit_text(
+        await edit_queue.edit(
+            callback.message,
             f"🏃‍♂️ <b>Успешный побег!</b>\n\n"
             f"{message}\n\n"
             f"Иногда отступление - лучшая стратегия.\n"
             f"Восстановите здоровье и возвращайтесь сильнее!",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 В меню битв", callback_data="battle_menu")]
-            ])
+            reply_markup=single_button_keyboard("🔙 В меню битв", "battle_menu")
         )
     else:
-        await callback.message.edit_text(
+        await edit_queue.edit(
+            callback.message,
             f"❌ <b>Побег не удался!</b>\n\n"
             f"{message}\n\n"
             f"Теперь вам придётся сражаться!",
@@ -128,8 +130,8 @@ async def show_attack_type_selection(callback: CallbackQuery, battle_id: int, us
     attack_text = (
         f"⚔️ <b>Раунд {battle.current_round} - Выбор атаки</b>\n\n"
         f"👤 <b>Ваше состояние:</b>\n"
-        f"❤️ HP: <b>{battle.player1_hp}/{user.hp}</b>\n"
-        f"🔮 Мана: <b>{battle.player1_mana}/{user.mana}</b>\n\n"
+        f"❤️ HP: <b>{battle.player1_hp}/{user.max_hp}</b>\n"
+        f"🔮 Мана: <b>{battle.player1_mana}/{user.max_mana}</b>\n\n"
         
         f"{monster_data['type_emoji']} <b>{monster_data['name']}:</b>\n"
         f"❤️ HP: <b>{battle.monster_hp}/{monster_data['hp']}</b>\n\n"
@@ -160,10 +162,10 @@ async def show_attack_type_selection(callback: CallbackQuery, battle_id: int, us
         [InlineKeyboardButton(text="⚔️ Обычная атака", callback_data=f"attack_type_normal_{battle_id}")]
     ])
     
-    await callback.message.edit_text(attack_text, reply_markup=keyboard)
+    await edit_queue.edit(callback.message, attack_text, reply_markup=keyboard)
     
     # Start timeout checker
-    asyncio.create_task(check_attack_timeout(battle_id, 50))
+    background_tasks.spawn(check_attack_timeout(battle_id, 50), name=f"attack-timeout-{battle_id}", timer=True)
 
 @router.callback_query(F.data.startswith("attack_type_"))
 async def handle_attack_type_choice(callback: CallbackQuery, user, is_registered: bool):
@@ -199,13 +201,13 @@ async def show_dodge_direction_selection(callback: CallbackQuery, battle_id: int
     monster_data = battle.get_monster_data()
     
     # Calculate perfect dodge chance
-    perfect_dodge_chance = min(user.agility / 500.0, 0.07) * 100
+    perfect_dodge_chance = min(user.effective_stats.agility / 500.0, 0.07) * 100
     
     dodge_text = (
         f"🛡️ <b>Раунд {battle.current_round} - Уклонение</b>\n\n"
         f"👤 <b>Ваше состояние:</b>\n"
-        f"❤️ HP: <b>{battle.player1_hp}/{user.hp}</b>\n"
-        f"💨 Проворность: <b>{user.agility}</b>\n\n"
+        f"❤️ HP: <b>{battle.player1_hp}/{user.max_hp}</b>\n"
+        f"💨 Проворность: <b>{user.effective_stats.agility}</b>\n\n"
         
         f"{monster_data['type_emoji']} <b>{monster_data['name']}:</b>\n"
         f"❤️ HP: <b>{battle.monster_hp}/{monster_data['hp']}</b>\n\n"
@@ -228,10 +230,10 @@ async def show_dodge_direction_selection(callback: CallbackQuery, battle_id: int
         ]
     ])
     
-    await callback.message.edit_text(dodge_text, reply_markup=keyboard)
+    await edit_queue.edit(callback.message, dodge_text, reply_markup=keyboard)
     
     # Start timeout checker
-    asyncio.create_task(check_dodge_timeout(battle_id, 50))
+    background_tasks.spawn(check_dodge_timeout(battle_id, 50), name=f"dodge-timeout-{battle_id}", timer=True)
 
 @router.callback_query(F.data.startswith("dodge_dir_"))
 async def handle_dodge_direction_choice(callback: CallbackQuery, user, is_registered: bool):
@@ -256,7 +258,8 @@ async def handle_dodge_direction_choice(callback: CallbackQuery, user, is_regist
     await callback.answer(f"✅ Выбрано: {direction_names[direction]}")
     
     # Show calculating message
-    await callback.message.edit_text(
+    await edit_queue.edit(
+        callback.message,
         f"⚙️ <b>Расчёт результатов раунда...</b>\n\n"
         f"⏳ Автоматическое применение навыков...\n"
         f"⚔️ Расчёт атак и уклонений...\n"
@@ -323,7 +326,7 @@ async def show_enhanced_round_results(callback: CallbackQuery, battle_id: int, u
         [InlineKeyboardButton(text="⚔️ Продолжить бой", callback_data=f"continue_enhanced_battle_{battle_id}")]
     ])
     
-    await callback.message.edit_text(results_text, reply_markup=keyboard)
+    await edit_queue.edit(callback.message, results_text, reply_markup=keyboard)
 
 @router.callback_query(F.data.startswith("continue_enhanced_battle_"))
 async def continue_enhanced_battle(callback: CallbackQuery, user, is_registered: bool):
@@ -372,12 +375,9 @@ async def show_enhanced_battle_finished(callback: CallbackQuery, battle, user):
                 f"• Попробуйте другую тактику атак!"
             )
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔄 Новый бой", callback_data="enhanced_pve_encounter")],
-        [InlineKeyboardButton(text="🔙 В меню", callback_data="battle_menu")]
-    ])
+    keyboard = STATIC_KEYBOARDS['enhanced_pve_result']
     
-    await callback.message.edit_text(result_text, reply_markup=keyboard)
+    await edit_queue.edit(callback.message, result_text, reply_markup=keyboard)
 
 async def check_attack_timeout(battle_id: int, timeout_seconds: int):
     """Check for attack selection timeout"""
@@ -1,7 +1,8 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import CallbackQuery
 from services.enhanced_kingdom_war_service import EnhancedKingdomWarService
-from keyboards.main_menu import battle_menu_keyboard
+from keyboards.main_menu import STATIC_KEYBOARDS, battle_menu_keyboard
+from keyboards.kingdom_war import join_attack_keyboard
 
 router = Router()
 
@@ -22,10 +23,7 @@ async def show_enhanced_battle_menu(callback: CallbackQuery, user, is_registered
             f"🚫 {block_message}\n\n"
             f"Вы не можете выполнять другие действия, пока идёт война королевств.\n"
             f"Дождитесь окончания сражения.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔄 Проверить статус", callback_data="enhanced_battle_menu")],
-                [InlineKeyboardButton(text="🔙 В главное меню", callback_data="main_menu")]
-            ])
+            reply_markup=STATIC_KEYBOARDS['war_blocked']
         )
         await callback.answer()
         return
@@ -34,8 +32,8 @@ async def show_enhanced_battle_menu(callback: CallbackQuery, user, is_registered
     battle_text = (
         f"⚔️ <b>Меню сражений v3.0</b>\n\n"
         f"👤 {user.name} | Уровень {user.level}\n"
-        f"💪 Сила: {user.strength} | 🛡️ Броня: {user.armor}\n"
-        f"❤️ HP: {user.current_hp}/{user.hp} | 🔮 Мана: {user.current_mana}/{user.mana}\n\n"
+        f"💪 Сила: {user.effective_stats.strength} | 🛡️ Броня: {user.effective_stats.armor}\n"
+        f"❤️ HP: {user.current_hp}/{user.max_hp} | 🔮 Мана: {user.current_mana}/{user.max_mana}\n\n"
         
         f"🆕 <b>Новые возможности:</b>\n"
         f"🎯 Интерактивные PvE бои с выбором действий\n"
@@ -46,24 +44,7 @@ async def show_enhanced_battle_menu(callback: CallbackQuery, user, is_registered
         f"Выберите тип сражения:"
     )
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🎯 Интерактивный PvE", callback_data="enhanced_pve_encounter"),
-            InlineKeyboardButton(text="⚔️ Интерактивный PvP", callback_data="interactive_pvp")
-        ],
-        [
-            InlineKeyboardButton(text="🤖 Быстрая тренировка", callback_data="quick_training"),
-            InlineKeyboardButton(text="🏰 Атака королевства", callback_data="kingdom_attack")
-        ],
-        [
-            InlineKeyboardButton(text="🛡️ Защита королевства", callback_data="kingdom_defense"),
-            InlineKeyboardButton(text="⚔️ Войны королевств", callback_data="kingdom_wars_menu")
-        ],
-        [
-            InlineKeyboardButton(text="📊 Статистика боев", callback_data="battle_stats"),
-            InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
-        ]
-    ])
+    keyboard = STATIC_KEYBOARDS['enhanced_battle_menu']
     
     await callback.message.edit_text(battle_text, reply_markup=keyboard)
     await callback.answer()
@@ -119,20 +100,7 @@ async def show_kingdom_wars_menu(callback: CallbackQuery, user, is_registered: b
         f"⚡ Зарабатывайте опыт за участие"
     )
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [
-            InlineKeyboardButton(text="🗡️ Присоединиться к атаке", callback_data="join_attack_menu"),
-            InlineKeyboardButton(text="🛡️ Защищать королевство", callback_data="join_defense")
-        ],
-        [
-            InlineKeyboardButton(text="📊 Мои результаты войн", callback_data="my_war_results"),
-            InlineKeyboardButton(text="🏆 Статистика королевств", callback_data="kingdom_stats")
-        ],
-        [
-            InlineKeyboardButton(text="❓ Правила войн", callback_data="war_rules"),
-            InlineKeyboardButton(text="🔙 Назад", callback_data="enhanced_battle_menu")
-        ]
-    ])
+    keyboard = STATIC_KEYBOARDS['enhanced_war_menu']
     
     await callback.message.edit_text(wars_text, reply_markup=keyboard)
     await callback.answer()
@@ -190,26 +158,8 @@ async def show_join_attack_menu(callback: CallbackQuery, user, is_registered: bo
         f"действия будут заблокированы до окончания войны."
     )
     
-    builder = InlineKeyboardBuilder()
-    
-    # Show other kingdoms for attack
-    kingdoms = {
-        'north': '❄️ Северное',
-        'west': '🌅 Западное',
-        'east': '🌸 Восточное', 
-        'south': '🔥 Южное'
-    }
-    
-    for kingdom_id, kingdom_name in kingdoms.items():
-        if kingdom_id != user.kingdom.value:
-            builder.row(InlineKeyboardButton(
-                text=f"🗡️ Атаковать {kingdom_name}",
-                callback_data=f"join_attack_{kingdom_id}"
-            ))
-    
-    builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars_menu"))
-    
-    await callback.message.edit_text(attack_text, reply_markup=builder.as_markup())
+    # Other kingdoms to attack
+    await callback.message.edit_text(attack_text, reply_markup=join_attack_keyboard(user.kingdom.value))
     await callback.answer()
 
 @router.callback_query(F.data.startswith("join_attack_"))
@@ -259,10 +209,7 @@ async def join_attack_squad(callback: CallbackQuery, user, is_registered: bool):
             f"Дождитесь начала сражения!"
         )
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🏰 Статус войны", callback_data="kingdom_wars_menu")],
-            [InlineKeyboardButton(text="🔙 В главное меню", callback_data="main_menu")]
-        ])
+        keyboard = STATIC_KEYBOARDS['war_joined']
     else:
         result_text = (
             f"❌ <b>Ошибка присоединения</b>\n\n"
@@ -270,10 +217,7 @@ async def join_attack_squad(callback: CallbackQuery, user, is_registered: bool):
             f"Попробуйте ещё раз или выберите другую цель."
         )
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="join_attack_menu")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars_menu")]
-        ])
+        keyboard = STATIC_KEYBOARDS['join_attack_failed']
     
     await callback.message.edit_text(result_text, reply_markup=keyboard)
     await callback.answer()
@@ -326,10 +270,7 @@ async def join_defense_squad(callback: CallbackQuery, user, is_registered: bool)
             f"до окончания войны."
         )
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🏰 Статус войны", callback_data="kingdom_wars_menu")],
-            [InlineKeyboardButton(text="🔙 В главное меню", callback_data="main_menu")]
-        ])
+        keyboard = STATIC_KEYBOARDS['war_joined']
     else:
         result_text = (
             f"❌ <b>Ошибка присоединения</b>\n\n"
@@ -337,10 +278,7 @@ async def join_defense_squad(callback: CallbackQuery, user, is_registered: bool)
             f"Попробуйте ещё раз."
         )
         
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="join_defense")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars_menu")]
-        ])
+        keyboard = STATIC_KEYBOARDS['join_defense_failed']
     
     await callback.message.edit_text(result_text, reply_markup=keyboard)
     await callback.answer()
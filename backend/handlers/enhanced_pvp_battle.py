@@ -1,7 +1,10 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.main_menu import STATIC_KEYBOARDS
 from services.enhanced_pvp_service import EnhancedPvPService
+from services.opponent_index import opponent_index, LEVEL_RANGE
+from services.edit_queue import edit_queue
 from models.interactive_battle import BattlePhaseEnum
 from config.settings import GameConstants
 import asyncio
@@ -15,7 +18,7 @@ async def show_interactive_pvp_menu(callback: CallbackQuery, user, is_registered
         await callback.answer("Сначала нужно зарегистрироваться!")
         return
     
-    if user.current_hp < user.hp * 0.3:
+    if user.current_hp < user.max_hp * 0.3:
         await callback.answer("❤️ Недостаточно здоровья для боя! Нужно минимум 30% HP", show_alert=True)
         return
     
@@ -29,8 +32,8 @@ async def show_interactive_pvp_menu(callback: CallbackQuery, user, is_registered
         f"• 50 секунд на каждый ход\n\n"
         
         f"👤 <b>Ваше состояние:</b>\n"
-        f"❤️ HP: <b>{user.current_hp}/{user.hp}</b>\n"
-        f"🔮 Мана: <b>{user.current_mana}/{user.mana}</b>\n"
+        f"❤️ HP: <b>{user.current_hp}/{user.max_hp}</b>\n"
+        f"🔮 Мана: <b>{user.current_mana}/{user.max_mana}</b>\n"
         f"⚡ Уровень: <b>{user.level}</b>\n\n"
         
         f"Выберите королевство для поиска противников:"
@@ -55,7 +58,7 @@ async def show_interactive_pvp_menu(callback: CallbackQuery, user, is_registered
     
     builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu"))
     
-    await callback.message.edit_text(menu_text, reply_markup=builder.as_markup())
+    await edit_queue.edit(callback.message, menu_text, reply_markup=builder.as_markup())
     await callback.answer()
 
 @router.callback_query(F.data.startswith("pvp_select_"))
@@ -63,28 +66,12 @@ async def select_pvp_opponent(callback: CallbackQuery, user, is_registered: bool
     """Select PvP opponent from kingdom"""
     target_kingdom = callback.data.replace("pvp_select_", "")
     
-    # Get online players from target kingdom (simplified)
-    from config.database import AsyncSessionLocal
-    from models.user import User
-    from sqlalchemy import select, and_
-    
-    async with AsyncSessionLocal() as session:
-        min_level = max(1, user.level - 5)
-        max_level = user.level + 5
-        
-        result = await session.execute(
-            select(User).where(
-                and_(
-                    User.kingdom == target_kingdom,
-                    User.level >= min_level,
-                    User.level <= max_level,
-                    User.id != user.id,
-                    User.is_active == True,
-                    User.current_hp >= User.hp * 0.3  # Must have enough HP
-                )
-            ).limit(10)
-        )
-        players = result.scalars().all()
+    # Random pick of active players from target kingdom with enough HP
+    min_level = max(1, user.level - LEVEL_RANGE)
+    max_level = user.level + LEVEL_RANGE
+    players = opponent_index.sample(
+        target_kingdom, user.level, exclude_id=user.id, limit=8, min_hp_ratio=0.3
+    )
     
     if not players:
         kingdom_info = GameConstants.KINGDOMS[target_kingdom]
@@ -105,10 +92,10 @@ async def select_pvp_opponent(callback: CallbackQuery, user, is_registered: bool
         f"Игроки уровня {min_level}-{max_level}:\n\n"
     )
     
-    for player in players[:8]:  # Show max 8 players
+    user_total = user.effective_stats.strength + user.effective_stats.armor + user.effective_stats.agility
+    for player in players:
         # Calculate relative strength
-        player_total = player.strength + player.armor + player.agility
-        user_total = user.strength + user.armor + user.agility
+        player_total = player.power
         
         if player_total > user_total * 1.2:
             strength_indicator = "🔴 Сильнее"
@@ -120,7 +107,7 @@ async def select_pvp_opponent(callback: CallbackQuery, user, is_registered: bool
         menu_text += (
             f"👤 <b>{player.name}</b> (Ур.{player.level})\n"
             f"📊 {strength_indicator} | "
-            f"❤️ {player.current_hp}/{player.hp} | "
+            f"❤️ {player.current_hp}/{player.max_hp} | "
             f"🏆 {player.pvp_wins}W/{player.pvp_losses}L\n\n"
         )
         
@@ -131,7 +118,7 @@ async def select_pvp_opponent(callback: CallbackQuery, user, is_registered: bool
     
     builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="interactive_pvp"))
     
-    await callback.message.edit_text(menu_text, reply_markup=builder.as_markup())
+    await edit_queue.edit(callback.message, menu_text, reply_markup=builder.as_markup())
     await callback.answer()
 
 @router.callback_query(F.data.startswith("challenge_interactive_"))
@@ -164,10 +151,10 @@ async def challenge_interactive_pvp(callback: CallbackQuery, user, is_registered
         f"🏰 Королевство: {GameConstants.KINGDOMS[defender.kingdom.value]['emoji']} {GameConstants.KINGDOMS[defender.kingdom.value]['name']}\n\n"
         
         f"📊 <b>Характеристики противника:</b>\n"
-        f"⚔️ Сила: <b>{defender.strength}</b>\n"
-        f"🛡️ Броня: <b>{defender.armor}</b>\n"
-        f"❤️ HP: <b>{defender.hp}</b>\n"
-        f"💨 Проворность: <b>{defender.agility}</b>\n\n"
+        f"⚔️ Сила: <b>{defender.effective_stats.strength}</b>\n"
+        f"🛡️ Броня: <b>{defender.effective_stats.armor}</b>\n"
+        f"❤️ HP: <b>{defender.max_hp}</b>\n"
+        f"💨 Проворность: <b>{defender.effective_stats.agility}</b>\n\n"
         
         f"🏆 Статистика: <b>{defender.pvp_wins}W/{defender.pvp_losses}L</b>\n\n"
         
@@ -180,7 +167,7 @@ async def challenge_interactive_pvp(callback: CallbackQuery, user, is_registered
         [InlineKeyboardButton(text="🔙 В меню", callback_data="battle_menu")]
     ])
     
-    await callback.message.edit_text(challenge_text, reply_markup=keyboard)
+    await edit_queue.edit(callback.message, challenge_text, reply_markup=keyboard)
     
     # Here would normally send notification to defender
     # For now just show success
@@ -241,8 +228,8 @@ async def show_interactive_pvp_battle_state(callback: CallbackQuery, battle, use
         f"🔄 Раунд: <b>{battle.current_round}</b>\n"
         f"📍 Фаза: <b>{phase_names.get(battle.phase.value, battle.phase.value)}</b>\n\n"
         
-        f"👤 <b>Вы:</b> ❤️ {user_hp}/{user.hp} | 🔮 {user_mana}/{user.mana}\n"
-        f"👤 <b>{opponent.name}:</b> ❤️ {opponent_hp}/{opponent.hp}\n\n"
+        f"👤 <b>Вы:</b> ❤️ {user_hp}/{user.max_hp} | 🔮 {user_mana}/{user.max_mana}\n"
+        f"👤 <b>{opponent.name}:</b> ❤️ {opponent_hp}/{opponent.max_hp}\n\n"
         
         f"🎯 Ваш выбор атаки: <b>{user_attack or 'Не выбран'}</b>\n"
         f"🛡️ Ваш выбор уклонения: <b>{user_dodge or 'Не выбран'}</b>\n\n"
@@ -268,7 +255,7 @@ async def show_interactive_pvp_battle_state(callback: CallbackQuery, battle, use
             [InlineKeyboardButton(text="🔄 Обновить", callback_data=f"check_pvp_status_{battle.id}")]
         ])
     
-    await callback.message.edit_text(status_text, reply_markup=keyboard)
+    await edit_queue.edit(callback.message, status_text, reply_markup=keyboard)
     await callback.answer()
 
 @router.callback_query(F.data.startswith("pvp_attack_"))
@@ -319,7 +306,8 @@ async def handle_pvp_dodge_choice(callback: CallbackQuery, user, is_registered:
     await callback.answer(f"✅ Выбрано: {direction_names[direction]}")
     
     # Show calculating message
-    await callback.message.edit_text(
+    await edit_queue.edit(
+        callback.message,
         f"⚙️ <b>Расчёт результатов раунда...</b>\n\n"
         f"⏳ Применение навыков обоих игроков...\n"
         f"⚔️ Расчёт атак и защиты...\n"
@@ -385,7 +373,7 @@ async def show_interactive_pvp_round_results(callback: CallbackQuery, battle, us
         [InlineKeyboardButton(text="⚔️ Продолжить бой", callback_data=f"check_pvp_status_{battle.id}")]
     ])
     
-    await callback.message.edit_text(results_text, reply_markup=keyboard)
+    await edit_queue.edit(callback.message, results_text, reply_markup=keyboard)
 
 async def show_interactive_pvp_results(callback: CallbackQuery, battle, user):
     """Show final PvP battle results"""
@@ -444,9 +432,6 @@ async def show_interactive_pvp_results(callback: CallbackQuery, battle, user):
             f"• Тренируйтесь против ИИ"
         )
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔄 Новый PvP", callback_data="interactive_pvp")],
-        [InlineKeyboardButton(text="🔙 В меню", callback_data="battle_menu")]
-    ])
+    keyboard = STATIC_KEYBOARDS['pvp_result']
     
-    await callback.message.edit_text(result_text, reply_markup=keyboard)
\ No newline at end of file
+    await edit_queue.edit(callback.message, result_text, reply_markup=keyboard)
\ No newline at end of file
@@ -1,8 +1,11 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.main_menu import STATIC_KEYBOARDS
+from keyboards.static import single_button_keyboard
 from services.interactive_battle_service import InteractiveBattleService
 from models.interactive_battle import BattlePhaseEnum
+from utils.task_registry import background_tasks
 import asyncio
 
 router = Router()
@@ -15,7 +18,7 @@ async def start_pve_encounter(callback: CallbackQuery, user, is_registered: bool
         return
     
     # Check if user has enough HP
-    if user.current_hp < user.hp * 0.3:
+    if user.current_hp < user.max_hp * 0.3:
         await callback.answer("❤️ Недостаточно здоровья для боя! Нужно минимум 30% HP", show_alert=True)
         return
     
@@ -46,8 +49,8 @@ async def start_pve_encounter(callback: CallbackQuery, user, is_registered: bool
         f"💰 Деньги: <b>+{monster_data['money_reward']}</b> золота\n\n"
         
         f"👤 <b>Ваше состояние:</b>\n"
-        f"❤️ HP: <b>{user.current_hp}/{user.hp}</b>\n"
-        f"🔮 Мана: <b>{user.current_mana}/{user.mana}</b>\n\n"
+        f"❤️ HP: <b>{user.current_hp}/{user.max_hp}</b>\n"
+        f"🔮 Мана: <b>{user.current_mana}/{user.max_mana}</b>\n\n"
         
         f"Что будете делать?"
     )
@@ -88,9 +91,7 @@ async def flee_pve_battle(callback: CallbackQuery, user, is_registered: bool):
             "🏃‍♂️ <b>Вы сбежали с поля боя!</b>\n\n"
             "Иногда отступление - лучшая стратегия.\n"
             "Восстановите здоровье и возвращайтесь сильнее!",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔙 В меню битв", callback_data="battle_menu")]
-            ])
+            reply_markup=single_button_keyboard("🔙 В меню битв", "battle_menu")
         )
     else:
         await callback.answer("❌ Не удалось сбежать!", show_alert=True)
@@ -110,8 +111,8 @@ async def show_attack_selection(callback: CallbackQuery, battle_id: int, user):
     attack_text = (
         f"⚔️ <b>Раунд {battle.current_round}</b>\n\n"
         f"👤 <b>Ваше состояние:</b>\n"
-        f"❤️ HP: <b>{battle.player1_hp}/{user.hp}</b>\n"
-        f"🔮 Мана: <b>{battle.player1_mana}/{user.mana}</b>\n\n"
+        f"❤️ HP: <b>{battle.player1_hp}/{user.max_hp}</b>\n"
+        f"🔮 Мана: <b>{battle.player1_mana}/{user.max_mana}</b>\n\n"
         
         f"{monster_data['type_emoji']} <b>{monster_data['name']}:</b>\n"
         f"❤️ HP: <b>{battle.monster_hp}/{monster_data['hp']}</b>\n\n"
@@ -133,9 +134,10 @@ async def show_attack_selection(callback: CallbackQuery, battle_id: int, user):
     await callback.message.edit_text(attack_text, reply_markup=keyboard)
     
     # Start timeout checker
-    asyncio.create_task(check_round_timeout(battle_id, 50))
+    background_tasks.spawn(check_round_timeout(battle_id, 50), name=f"round-timeout-{battle_id}", timer=True)
 
-@router.callback_query(F.data.startswith("attack_"))
+# Only the direction buttons: "attack_type_" and "attack_kingdom_" belong to other routers
+@router.callback_query(F.data.startswith(("attack_left_", "attack_center_", "attack_right_")))
 async def handle_attack_choice(callback: CallbackQuery, user, is_registered: bool):
     """Handle attack direction choice"""
     parts = callback.data.split("_")
@@ -165,7 +167,7 @@ async def show_dodge_selection(callback: CallbackQuery, battle_id: int, user):
     dodge_text = (
         f"🛡️ <b>Раунд {battle.current_round} - Уклонение</b>\n\n"
         f"👤 <b>Ваше состояние:</b>\n"
-        f"❤️ HP: <b>{battle.player1_hp}/{user.hp}</b>\n\n"
+        f"❤️ HP: <b>{battle.player1_hp}/{user.max_hp}</b>\n\n"
         
         f"{monster_data['type_emoji']} <b>{monster_data['name']}:</b>\n"
         f"❤️ HP: <b>{battle.monster_hp}/{monster_data['hp']}</b>\n\n"
@@ -186,7 +188,7 @@ async def show_dodge_selection(callback: CallbackQuery, battle_id: int, user):
     
     await callback.message.edit_text(dodge_text, reply_markup=keyboard)
 
-@router.callback_query(F.data.startswith("dodge_"))
+@router.callback_query(F.data.startswith(("dodge_left_", "dodge_center_", "dodge_right_")))
 async def handle_dodge_choice(callback: CallbackQuery, user, is_registered: bool):
     """Handle dodge direction choice"""
     parts = callback.data.split("_")
@@ -297,10 +299,7 @@ async def show_battle_finished(callback: CallbackQuery, battle, user):
             )
         result_emoji = "💀"
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔄 Новый бой", callback_data="pve_encounter")],
-        [InlineKeyboardButton(text="🔙 В меню", callback_data="battle_menu")]
-    ])
+    keyboard = STATIC_KEYBOARDS['pve_result']
     
     await callback.message.edit_text(result_text, reply_markup=keyboard)
 
@@ -1,11 +1,20 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import CallbackQuery, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.main_menu import STATIC_KEYBOARDS
 from services.inventory_service import InventoryService
 from models.item import ItemTypeEnum
 
 router = Router()
 
+CATEGORY_NAMES = {
+    'weapons': "⚔️ Оружие",
+    'armor': "🛡️ Броня",
+    'consumables': "🧪 Зелья",
+    'other': "📦 Прочее",
+    'equipped': "⚡ Экипированные предметы"
+}
+
 @router.callback_query(F.data == "inventory")
 async def show_inventory(callback: CallbackQuery, user, is_registered: bool):
     """Show user inventory"""
@@ -13,19 +22,16 @@ async def show_inventory(callback: CallbackQuery, user, is_registered: bool):
         await callback.answer("Сначала нужно зарегистрироваться!")
         return
     
+    # One query: entries come back with their item data, detached from the session
     inventory_service = InventoryService()
     inventory = await inventory_service.get_user_inventory(user.id)
-    stats = await inventory_service.get_inventory_stats(user.id)
     
     if not inventory:
         await callback.message.edit_text(
             f"🎒 <b>Инвентарь пуст</b>\n\n"
             f"📦 Использовано: 0/{user.inventory_size}\n\n"
             f"Отправляйтесь в магазин, чтобы купить предметы!",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🛒 Магазин", callback_data="shop_menu")],
-                [InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")]
-            ])
+            reply_markup=STATIC_KEYBOARDS['inventory_empty']
         )
         await callback.answer()
         return
@@ -50,7 +56,7 @@ async def show_inventory(callback: CallbackQuery, user, is_registered: bool):
             other_items.append(user_item)
     
     inventory_text = f"🎒 <b>Инвентарь</b>\n\n"
-    inventory_text += f"📦 Использовано: {stats['total_items']}/{user.inventory_size}\n\n"
+    inventory_text += f"📦 Использовано: {len(inventory)}/{user.inventory_size}\n\n"
     
     # Show equipped items
     if equipped_items:
@@ -111,32 +117,23 @@ async def show_inventory_category(callback: CallbackQuery, user, is_registered:
         await callback.answer("Сначала нужно зарегистрироваться!")
         return
     
-    category = callback.data.replace("inventory_", "")
+    # inventory_{category}, inventory_{category}_n{id} (older page), inventory_{category}_p{id} (newer page)
+    category, _, cursor = callback.data.replace("inventory_", "").partition("_")
+    category_name = CATEGORY_NAMES.get(category, "")
     
     inventory_service = InventoryService()
-    inventory = await inventory_service.get_user_inventory(user.id)
+    if cursor.startswith("n"):
+        page = await inventory_service.get_category_page(user.id, category, after_id=int(cursor[1:]))
+    elif cursor.startswith("p"):
+        page = await inventory_service.get_category_page(user.id, category, before_id=int(cursor[1:]))
+    else:
+        page = await inventory_service.get_category_page(user.id, category)
     
-    # Filter items by category
-    filtered_items = []
-    category_name = ""
-    
-    if category == "weapons":
-        filtered_items = [item for item in inventory if item.item.item_type == ItemTypeEnum.weapon and not item.is_equipped]
-        category_name = "⚔️ Оружие"
-    elif category == "armor":
-        filtered_items = [item for item in inventory if item.item.item_type == ItemTypeEnum.armor and not item.is_equipped]
-        category_name = "🛡️ Броня"
-    elif category == "consumables":
-        filtered_items = [item for item in inventory if item.item.item_type == ItemTypeEnum.consumable]
-        category_name = "🧪 Зелья"
-    elif category == "other":
-        filtered_items = [item for item in inventory if item.item.item_type not in [ItemTypeEnum.weapon, ItemTypeEnum.armor, ItemTypeEnum.consumable] and not item.is_equipped]
-        category_name = "📦 Прочее"
-    elif category == "equipped":
-        filtered_items = [item for item in inventory if item.is_equipped]
-        category_name = "⚡ Экипированные предметы"
-    
-    if not filtered_items:
+    if not page.items and cursor:
+        # The page emptied since it was shown (items sold or used): start over
+        page = await inventory_service.get_category_page(user.id, category)
+    
+    if not page.items:
         await callback.answer(f"В категории '{category_name}' нет предметов!", show_alert=True)
         return
     
@@ -144,7 +141,7 @@ async def show_inventory_category(callback: CallbackQuery, user, is_registered:
     
     builder = InlineKeyboardBuilder()
     
-    for user_item in filtered_items[:10]:  # Show max 10 items
+    for user_item in page.items:
         # Item info
         item = user_item.item
         quantity_text = f" x{user_item.quantity}" if user_item.quantity > 1 else ""
@@ -189,11 +186,28 @@ async def show_inventory_category(callback: CallbackQuery, user, is_registered:
         
         # Sell button
         if not user_item.is_equipped:
-            sell_price = int(item.price * 0.5)
+            sell_price = InventoryService.sell_price(item)
             builder.row(InlineKeyboardButton(
                 text=f"💰 Продать за {sell_price}г",
                 callback_data=f"sell_item_{user_item.id}"
             ))
+            if user_item.quantity > 1:
+                builder.row(InlineKeyboardButton(
+                    text=f"💰 Продать все ({user_item.quantity}) за {InventoryService.sell_price(item, user_item.quantity)}г",
+                    callback_data=f"sell_all_{item.id}"
+                ))
+    
+    nav_row = []
+    if page.has_prev:
+        nav_row.append(InlineKeyboardButton(
+            text="⬅️ Назад", callback_data=f"inventory_{category}_p{page.first_id}"
+        ))
+    if page.has_next:
+        nav_row.append(InlineKeyboardButton(
+            text="➡️ Далее", callback_data=f"inventory_{category}_n{page.last_id}"
+        ))
+    if nav_row:
+        builder.row(*nav_row)
     
     builder.row(
         InlineKeyboardButton(text="🔙 К инвентарю", callback_data="inventory")
@@ -279,4 +293,23 @@ async def sell_item(callback: CallbackQuery, user, is_registered: bool):
         # Refresh inventory
         await show_inventory(callback, user, is_registered)
     else:
-        await callback.answer(f"❌ {message}", show_alert=True)
\ No newline at end of file
+        await callback.answer(f"❌ {message}", show_alert=True)
+
+@router.callback_query(F.data.startswith("sell_all_"))
+async def sell_all_items(callback: CallbackQuery, user, is_registered: bool):
+    """Sell every unequipped piece of an item"""
+    if not is_registered:
+        await callback.answer("Сначала нужно зарегистрироваться!")
+        return
+    
+    item_id = int(callback.data.replace("sell_all_", ""))
+    
+    inventory_service = InventoryService()
+    success, message = await inventory_service.sell_all(user.id, item_id)
+    
+    if success:
+        await callback.answer(f"✅ {message}", show_alert=True)
+        # Refresh inventory
+        await show_inventory(callback, user, is_registered)
+    else:
+        await callback.answer(f"❌ {message}", show_alert=True)
@@ -1,6 +1,8 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.types import CallbackQuery
+from keyboards.main_menu import STATIC_KEYBOARDS
+from keyboards.static import single_button_keyboard
+from keyboards.kingdom_war import war_attack_keyboard, war_defense_keyboard
 from services.enhanced_kingdom_war_service import EnhancedKingdomWarService
 from services.user_service import UserService
 from config.settings import GameConstants
@@ -11,6 +13,15 @@ import logging
 router = Router()
 logger = logging.getLogger(__name__)
 
+def _war_slots(war_times, now) -> tuple:
+    """Keyboard key of upcoming wars: (date label, time label, slot code) each"""
+    return tuple(
+        ("сегодня" if war_time.date() == now.date() else "завтра",
+         war_time.strftime("%H:%M"),
+         war_time.strftime('%Y%m%d_%H'))
+        for war_time in war_times
+    )
+
 @router.callback_query(F.data == "kingdom_wars")
 async def show_kingdom_wars_menu(callback: CallbackQuery, user, is_registered: bool):
     """Show kingdom wars main menu"""
@@ -64,12 +75,7 @@ async def show_kingdom_wars_menu(callback: CallbackQuery, user, is_registered: b
         f"• Неучаствующие защитники теряют 40% золота дополнительно\n"
     )
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="⚔️ Атаковать королевство", callback_data="kingdom_war_attack")],
-        [InlineKeyboardButton(text="🛡️ Защищать своё королевство", callback_data="kingdom_war_defend")],
-        [InlineKeyboardButton(text="📊 Результаты войн", callback_data="war_results")],
-        [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
-    ])
+    keyboard = STATIC_KEYBOARDS['war_menu']
     
     await callback.message.edit_text(menu_text, reply_markup=keyboard)
     await callback.answer()
@@ -102,22 +108,8 @@ async def show_attack_kingdoms(callback: CallbackQuery, user, is_registered: boo
             next_war += timedelta(days=1)
         next_wars.append(next_war)
     
-    builder = InlineKeyboardBuilder()
-    
-    # Add kingdom attack buttons for each time slot
-    for war_time in next_wars[:2]:  # Show next 2 wars
-        time_str = war_time.strftime("%H:%M")
-        date_str = "сегодня" if war_time.date() == now.date() else "завтра"
-        
-        # Add kingdoms to attack (except user's own)
-        for kingdom_key, kingdom_info in GameConstants.KINGDOMS.items():
-            if kingdom_key != user.kingdom.value:
-                builder.row(InlineKeyboardButton(
-                    text=f"⚔️ {kingdom_info['emoji']} {kingdom_info['name']} [{date_str} {time_str}]",
-                    callback_data=f"attack_kingdom_{kingdom_key}_{war_time.strftime('%Y%m%d_%H')}"
-                ))
-    
-    builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars"))
+    # Kingdom attack buttons for the next 2 wars (except user's own kingdom)
+    keyboard = war_attack_keyboard(user.kingdom.value, _war_slots(next_wars[:2], now))
     
     await callback.message.edit_text(
         f"⚔️ **Выберите цель для атаки**\n\n"
@@ -125,7 +117,7 @@ async def show_attack_kingdoms(callback: CallbackQuery, user, is_registered: boo
         f"• Можно записаться на участие в ближайших войнах\n"
         f"• После записи другие действия будут заблокированы\n"
         f"• Выберите королевство и время войны:",
-        reply_markup=builder.as_markup()
+        reply_markup=keyboard
     )
     await callback.answer()
 
@@ -161,9 +153,7 @@ async def join_attack_squad(callback: CallbackQuery, user, is_registered: bool):
             f"⏰ Время: {war_time.strftime('%d.%m.%Y в %H:%M')} (Ташкентское время)\n\n"
             f"⚠️ **Внимание:** Все остальные действия заблокированы до окончания войны!\n\n"
             f"За 30 минут до войны будет объявление в канале войн.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")]
-            ])
+            reply_markup=single_button_keyboard("🏠 Главное меню", "main_menu")
         )
         await callback.answer("✅ Успешно записаны на атаку!")
     else:
@@ -197,19 +187,8 @@ async def show_defend_options(callback: CallbackQuery, user, is_registered: bool
             next_war += timedelta(days=1)
         next_wars.append(next_war)
     
-    builder = InlineKeyboardBuilder()
-    
-    # Add defense options for each time slot
-    for war_time in next_wars[:2]:  # Show next 2 wars
-        time_str = war_time.strftime("%H:%M")
-        date_str = "сегодня" if war_time.date() == now.date() else "завтра"
-        
-        builder.row(InlineKeyboardButton(
-            text=f"🛡️ Защищать {date_str} в {time_str}",
-            callback_data=f"defend_kingdom_{war_time.strftime('%Y%m%d_%H')}"
-        ))
-    
-    builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars"))
+    # Defense options for the next 2 wars
+    keyboard = war_defense_keyboard(_war_slots(next_wars[:2], now))
     
     kingdom_info = GameConstants.KINGDOMS[user.kingdom.value]
     
@@ -221,7 +200,7 @@ async def show_defend_options(callback: CallbackQuery, user, is_registered: bool
         f"• Защитники получают +30% к защите при атаке нескольких королевств\n"
         f"• После записи все действия будут заблокированы до окончания войны\n\n"
         f"Выберите время для защиты:",
-        reply_markup=builder.as_markup()
+        reply_markup=keyboard
     )
     await callback.answer()
 
@@ -255,9 +234,7 @@ async def join_defense_squad(callback: CallbackQuery, user, is_registered: bool)
             f"⏰ Время: {war_time.strftime('%d.%m.%Y в %H:%M')} (Ташкентское время)\n\n"
             f"⚠️ **Внимание:** Все остальные действия заблокированы до окончания войны!\n\n"
             f"За 30 минут до войны будет объявление в канале войн.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")]
-            ])
+            reply_markup=single_button_keyboard("🏠 Главное меню", "main_menu")
         )
         await callback.answer("✅ Успешно записаны на защиту!")
     else:
@@ -273,11 +250,7 @@ async def show_war_results_menu(callback: CallbackQuery, user, is_registered: bo
     await callback.message.edit_text(
         f"📊 **Результаты войн**\n\n"
         f"Выберите тип результатов:",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📈 Мои результаты", callback_data="my_war_results")],
-            [InlineKeyboardButton(text="🌍 Глобальные результаты", callback_data="global_war_results")],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars")]
-        ])
+        reply_markup=STATIC_KEYBOARDS['war_results_menu']
     )
     await callback.answer()
 
@@ -296,9 +269,7 @@ async def show_my_war_results(callback: CallbackQuery, user, is_registered: bool
         f"• История участия в войнах\n"
         f"• Полученные награды и потери\n"
         f"• Статистика по атакам и защите",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="war_results")]
-        ])
+        reply_markup=single_button_keyboard("🔙 Назад", "war_results")
     )
     await callback.answer()
 
@@ -318,9 +289,7 @@ async def show_global_war_results(callback: CallbackQuery, user, is_registered:
         f"• Участвующие королевства\n"
         f"• Переданные суммы золота\n"
         f"• Ключевые участники",
-        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="war_results")]
-        ])
+        reply_markup=single_button_keyboard("🔙 Назад", "war_results")
     )
     await callback.answer()
 
@@ -363,9 +332,7 @@ async def cmd_war_result(message, user, is_registered: bool):
                 f"1. Перейдите в меню битв\n"
                 f"2. Выберите 'Королевские битвы'\n"
                 f"3. Запишитесь на атаку или защиту",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="🏰 Королевские битвы", callback_data="kingdom_wars")]
-                ])
+                reply_markup=single_button_keyboard("🏰 Королевские битвы", "kingdom_wars")
             )
             return
         
@@ -448,8 +415,5 @@ async def cmd_war_result(message, user, is_registered: bool):
         
         await message.reply(
             result_text,
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🏰 Королевские битвы", callback_data="kingdom_wars")],
-                [InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")]
-            ])
+            reply_markup=STATIC_KEYBOARDS['war_result']
         )
\ No newline at end of file
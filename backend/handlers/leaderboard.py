@@ -0,0 +1,81 @@
+from aiogram import Router, F
+from aiogram.types import CallbackQuery, InlineKeyboardButton
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from config.settings import GameConstants
+from services.leaderboard_service import leaderboards
+
+router = Router()
+
+LEADERBOARD_SIZE = 10
+
+BOARD_TITLES = {
+    'level': "⭐ Уровень",
+    'pvp': "⚔️ PvP победы",
+    'wealth': "💰 Богатство"
+}
+
+def _score_text(board: str, player) -> str:
+    if board == 'level':
+        return f"Ур.{player.level} ({player.experience} опыта)"
+    if board == 'pvp':
+        return f"{player.pvp_wins} побед"
+    return f"{player.money} золота"
+
+@router.callback_query(F.data.startswith("leaderboard"))
+async def show_leaderboard(callback: CallbackQuery, user, is_registered: bool):
+    """Show a leaderboard: leaderboards, leaderboard_{board}_{scope}"""
+    if not is_registered:
+        await callback.answer("Сначала нужно зарегистрироваться!")
+        return
+
+    board, scope = 'level', 'all'
+    if callback.data.startswith("leaderboard_"):
+        board, _, scope = callback.data.replace("leaderboard_", "").partition("_")
+    if board not in BOARD_TITLES:
+        board = 'level'
+
+    kingdom = user.kingdom.value
+    if scope != kingdom:
+        scope = 'all'
+
+    scope_title = "🌍 Все королевства"
+    if scope != 'all':
+        kingdom_info = GameConstants.KINGDOMS[scope]
+        scope_title = f"{kingdom_info['emoji']} {kingdom_info['name']}"
+
+    text = f"📊 <b>Рейтинг: {BOARD_TITLES[board]}</b>\n{scope_title}\n\n"
+
+    top = leaderboards.top(board, scope, LEADERBOARD_SIZE)
+    if not top:
+        text += "Пока никого нет\n"
+    for position, (user_id, player) in enumerate(top, 1):
+        emoji = GameConstants.KINGDOMS[player.kingdom]['emoji']
+        marker = " 👈" if user_id == user.id else ""
+        text += f"{position}. {emoji} {player.name} — {_score_text(board, player)}{marker}\n"
+
+    rank = leaderboards.rank(board, user.id, scope)
+    if rank:
+        text += f"\n📍 Ваше место: <b>{rank}</b> из {leaderboards.size(board, scope)}"
+
+    builder = InlineKeyboardBuilder()
+    builder.row(*[
+        InlineKeyboardButton(
+            text=f"• {title} •" if name == board else title,
+            callback_data=f"leaderboard_{name}_{scope}"
+        )
+        for name, title in BOARD_TITLES.items()
+    ])
+    builder.row(
+        InlineKeyboardButton(
+            text="🌍 Все" if scope != 'all' else "• 🌍 Все •",
+            callback_data=f"leaderboard_{board}_all"
+        ),
+        InlineKeyboardButton(
+            text="🏰 Моё королевство" if scope == 'all' else "• 🏰 Моё королевство •",
+            callback_data=f"leaderboard_{board}_{kingdom}"
+        )
+    )
+    builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu"))
+
+    await callback.message.edit_text(text, reply_markup=builder.as_markup())
+    await callback.answer()
@@ -1,11 +1,17 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from keyboards.main_menu import profile_menu_keyboard
+from keyboards.static import single_button_keyboard
 from config.settings import GameConstants
 from services.user_service import UserService
+from utils.experience import experience_table
 
 router = Router()
 
+def _bonus_text(value: int) -> str:
+    """Equipment bonus suffix for a stat line"""
+    return f" (+{value} снаряжение)" if value else ""
+
 @router.callback_query(F.data == "profile")
 async def show_profile(callback: CallbackQuery, user, is_registered: bool):
     """Show user profile"""
@@ -16,9 +22,11 @@ async def show_profile(callback: CallbackQuery, user, is_registered: bool):
     kingdom_info = GameConstants.KINGDOMS[user.kingdom.value]
     gender_text = "👨 Мужской" if user.gender.value == "male" else "👩 Женский"
     
+    # Base stats plus equipment bonuses
+    stats = user.effective_stats
+    
     # Calculate experience needed for next level
-    from utils.formulas import GameFormulas
-    exp_needed = GameFormulas.experience_for_level(user.level + 1)
+    exp_needed = experience_table.for_next_level(user.level)
     
     profile_text = (
         f"👤 <b>Профиль игрока</b>\n\n"
@@ -29,11 +37,11 @@ async def show_profile(callback: CallbackQuery, user, is_registered: bool):
         f"⚡ Опыт: <b>{user.experience}/{exp_needed}</b>\n\n"
         
         f"💪 <b>Характеристики:</b>\n"
-        f"⚔️ Сила: <b>{user.strength}</b>\n"
-        f"🛡️ Броня: <b>{user.armor}</b>\n"
-        f"❤️ Здоровье: <b>{user.current_hp}/{user.hp}</b>\n"
-        f"💨 Проворность: <b>{user.agility}</b>\n"
-        f"🔮 Мана: <b>{user.current_mana}/{user.mana}</b>\n\n"
+        f"⚔️ Сила: <b>{stats.strength}</b>\n"
+        f"🛡️ Броня: <b>{stats.armor}</b>\n"
+        f"❤️ Здоровье: <b>{user.current_hp}/{user.max_hp}</b>\n"
+        f"💨 Проворность: <b>{stats.agility}</b>\n"
+        f"🔮 Мана: <b>{user.current_mana}/{user.max_mana}</b>\n\n"
         
         f"💰 <b>Ресурсы:</b>\n"
         f"🪙 Деньги: <b>{user.money}</b> золота\n"
@@ -62,38 +70,38 @@ async def view_detailed_stats(callback: CallbackQuery, user, is_registered: bool
         await callback.answer("Сначала нужно зарегистрироваться!")
         return
     
+    stats = user.effective_stats
+    bonus = user.equipment_bonus
+    
     # Calculate derived stats
-    crit_chance = min(user.agility / 200.0, 0.3) * 100
-    dodge_chance = min(user.agility / 300.0, 0.2) * 100
+    crit_chance = min(stats.agility / 200.0, 0.3) * 100
+    dodge_chance = min(stats.agility / 300.0, 0.2) * 100
     
     stats_text = (
         f"📊 <b>Подробная статистика</b>\n\n"
         f"💪 <b>Базовые характеристики:</b>\n"
-        f"⚔️ Сила: <b>{user.strength}</b>\n"
-        f"   └ Урон в бою: <b>+{user.strength}</b>\n"
-        f"🛡️ Броня: <b>{user.armor}</b>\n"
-        f"   └ Поглощение урона: <b>{int(user.armor * 0.8)}</b>\n"
-        f"❤️ Здоровье: <b>{user.hp}</b>\n"
-        f"   └ Текущее: <b>{user.current_hp}/{user.hp}</b>\n"
-        f"💨 Проворность: <b>{user.agility}</b>\n"
+        f"⚔️ Сила: <b>{stats.strength}</b>{_bonus_text(bonus.strength)}\n"
+        f"   └ Урон в бою: <b>+{stats.strength}</b>\n"
+        f"🛡️ Броня: <b>{stats.armor}</b>{_bonus_text(bonus.armor)}\n"
+        f"   └ Поглощение урона: <b>{int(stats.armor * 0.8)}</b>\n"
+        f"❤️ Здоровье: <b>{user.max_hp}</b>{_bonus_text(bonus.hp)}\n"
+        f"   └ Текущее: <b>{user.current_hp}/{user.max_hp}</b>\n"
+        f"💨 Проворность: <b>{stats.agility}</b>{_bonus_text(bonus.agility)}\n"
         f"   └ Шанс крита: <b>{crit_chance:.1f}%</b>\n"
         f"   └ Шанс уклонения: <b>{dodge_chance:.1f}%</b>\n"
-        f"🔮 Мана: <b>{user.mana}</b>\n"
-        f"   └ Текущая: <b>{user.current_mana}/{user.mana}</b>\n\n"
+        f"🔮 Мана: <b>{user.max_mana}</b>{_bonus_text(bonus.mana)}\n"
+        f"   └ Текущая: <b>{user.current_mana}/{user.max_mana}</b>\n\n"
         
         f"📈 <b>Производные характеристики:</b>\n"
         f"⚡ Общая сила: <b>{user.total_stats}</b>\n"
-        f"🎯 Базовый урон: <b>{user.strength + int(user.agility * 0.5)}</b>\n"
-        f"🛡️ Физическая защита: <b>{int(user.armor * 0.8)}</b>\n"
+        f"🎯 Базовый урон: <b>{stats.strength + int(stats.agility * 0.5)}</b>\n"
+        f"🛡️ Физическая защита: <b>{int(stats.armor * 0.8)}</b>\n"
     )
     
     if user.free_stat_points > 0:
         stats_text += f"\n⭐ <b>Свободных очков: {user.free_stat_points}</b>"
     
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔙 Назад к профилю", callback_data="profile")]
-    ])
+    keyboard = single_button_keyboard("🔙 Назад к профилю", "profile")
     
     await callback.message.edit_text(stats_text, reply_markup=keyboard)
     await callback.answer()
@@ -127,10 +135,7 @@ async def show_battle_stats(callback: CallbackQuery, user, is_registered: bool):
         avg_damage = user.total_damage_dealt // total_battles
         stats_text += f"📈 Средний урон за бой: <b>{avg_damage}</b>\n"
     
-    from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔙 Назад к профилю", callback_data="profile")]
-    ])
+    keyboard = single_button_keyboard("🔙 Назад к профилю", "profile")
     
     await callback.message.edit_text(stats_text, reply_markup=keyboard)
     await callback.answer()
@@ -1,9 +1,7 @@
 from aiogram import Router, F
-from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.types import CallbackQuery
 from services.shop_service import ShopService
-from models.item import ItemTypeEnum
-import math
+from services.shop_catalog import shop_catalog
 
 router = Router()
 
@@ -14,40 +12,14 @@ async def show_shop_menu(callback: CallbackQuery, user, is_registered: bool):
         await callback.answer("Сначала нужно зарегистрироваться!")
         return
     
-    shop_service = ShopService()
-    categories = await shop_service.get_shop_categories()
-    
-    builder = InlineKeyboardBuilder()
-    
-    # Shop categories
-    category_names = {
-        'weapon': '⚔️ Оружие',
-        'armor': '🛡️ Броня',
-        'consumable': '🧪 Зелья',
-        'material': '🔩 Материалы',
-        'scroll': '📜 Свитки'
-    }
-    
-    for category, count in categories.items():
-        if count > 0:
-            text = f"{category_names.get(category, category)} ({count})"
-            builder.row(InlineKeyboardButton(
-                text=text,
-                callback_data=f"shop_category_{category}_1"
-            ))
-    
-    builder.row(
-        InlineKeyboardButton(text="🛒 Все товары", callback_data="shop_category_all_1")
-    )
-    builder.row(
-        InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
-    )
+    # Category counts are cached with the catalog, the menu keyboard is prebuilt
+    catalog = await shop_catalog.get()
     
     await callback.message.edit_text(
         f"🛒 <b>Магазин</b>\n\n"
         f"💰 Ваши деньги: <b>{user.money}</b> золота\n\n"
         f"Выберите категорию товаров:",
-        reply_markup=builder.as_markup()
+        reply_markup=catalog.menu_keyboard
     )
     await callback.answer()
 
@@ -63,96 +35,23 @@ async def show_shop_category(callback: CallbackQuery, user, is_registered: bool)
     category = parts[2]
     page = int(parts[3])
     
-    shop_service = ShopService()
-    items = await shop_service.get_shop_items(category, page, 6)
+    # Prebuilt page from the in-memory catalog, no DB queries
+    catalog = await shop_catalog.get()
+    catalog_page = catalog.get_page(category, page)
     
-    if not items:
+    if not catalog_page:
         await callback.answer("В этой категории нет товаров!", show_alert=True)
         return
     
-    category_names = {
-        'weapon': '⚔️ Оружие',
-        'armor': '🛡️ Броня', 
-        'consumable': '🧪 Зелья',
-        'material': '🔩 Материалы',
-        'scroll': '📜 Свитки',
-        'all': '🛒 Все товары'
-    }
-    
-    category_name = category_names.get(category, category)
-    
-    # Build items text
-    items_text = f"🛒 <b>{category_name}</b>\n\n"
-    items_text += f"💰 Ваши деньги: <b>{user.money}</b> золота\n\n"
-    
-    builder = InlineKeyboardBuilder()
-    
-    for i, item in enumerate(items, 1):
-        # Item description
-        stats_text = ""
-        if item.strength_bonus > 0:
-            stats_text += f"⚔️+{item.strength_bonus} "
-        if item.armor_bonus > 0:
-            stats_text += f"🛡️+{item.armor_bonus} "
-        if item.hp_bonus > 0:
-            stats_text += f"❤️+{item.hp_bonus} "
-        if item.agility_bonus > 0:
-            stats_text += f"💨+{item.agility_bonus} "
-        if item.mana_bonus > 0:
-            stats_text += f"🔮+{item.mana_bonus} "
-        
-        level_req = f" (Ур.{item.level_required})" if item.level_required > 1 else ""
-        
-        items_text += (
-            f"{item.rarity_emoji} <b>{item.name}</b>{level_req}\n"
-            f"💰 {item.price} золота | {stats_text}\n"
-        )
-        if item.description:
-            items_text += f"📝 {item.description}\n"
-        items_text += "\n"
-        
-        # Buy button
-        can_afford = user.money >= item.price
-        can_use = user.level >= item.level_required
-        
-        if can_afford and can_use:
-            builder.row(InlineKeyboardButton(
-                text=f"💰 Купить {item.name}",
-                callback_data=f"buy_item_{item.id}"
-            ))
-        else:
-            reason = "Недостаточно денег" if not can_afford else "Низкий уровень"
-            builder.row(InlineKeyboardButton(
-                text=f"❌ {item.name} ({reason})",
-                callback_data="shop_unavailable"
-            ))
-    
-    # Pagination (simplified)
-    nav_buttons = []
-    if page > 1:
-        nav_buttons.append(InlineKeyboardButton(
-            text="⬅️ Назад",
-            callback_data=f"shop_category_{category}_{page-1}"
-        ))
-    
-    # Check if there are more items
-    more_items = await shop_service.get_shop_items(category, page + 1, 6)
-    if more_items:
-        nav_buttons.append(InlineKeyboardButton(
-            text="➡️ Далее",
-            callback_data=f"shop_category_{category}_{page+1}"
-        ))
-    
-    if nav_buttons:
-        builder.row(*nav_buttons)
-    
-    builder.row(
-        InlineKeyboardButton(text="🔙 К категориям", callback_data="shop_menu")
+    items_text = (
+        f"{catalog_page.title}"
+        f"💰 Ваши деньги: <b>{user.money}</b> золота\n\n"
+        f"{catalog_page.cards}"
     )
     
     await callback.message.edit_text(
         items_text,
-        reply_markup=builder.as_markup()
+        reply_markup=catalog_page.keyboard(user.money, user.level)
     )
     await callback.answer()
 
@@ -163,10 +62,11 @@ async def buy_item(callback: CallbackQuery, user, is_registered: bool):
         await callback.answer("Сначала нужно зарегистрироваться!")
         return
     
-    item_id = int(callback.data.replace("buy_item_", ""))
+    # buy_item_{id} or buy_item_{id}_{quantity}
+    item_id, _, quantity = callback.data.replace("buy_item_", "").partition("_")
     
     shop_service = ShopService()
-    success, message = await shop_service.buy_item(user.id, item_id, 1)
+    success, message = await shop_service.buy_item(user.id, int(item_id), int(quantity or 1))
     
     if success:
         await callback.answer(f"✅ {message}", show_alert=True)
@@ -2,11 +2,12 @@ from aiogram import Router, F
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.types import Message, CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from services.user_service import UserService
-from keyboards.main_menu import main_menu_keyboard, kingdom_selection_keyboard, gender_selection_keyboard
+from keyboards.main_menu import STATIC_KEYBOARDS, main_menu_keyboard, kingdom_selection_keyboard, gender_selection_keyboard
+from keyboards.static import single_button_keyboard
 from config.settings import GameConstants
 import re
 
@@ -40,9 +41,7 @@ async def cmd_start(message: Message, user, is_registered: bool):
             "🛒 Покупать снаряжение\n"
             "🏆 Участвовать в турнирах\n\n"
             "Для начала игры нужно создать персонажа!",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🚀 Создать персонажа", callback_data="register")]
-            ])
+            reply_markup=single_button_keyboard("🚀 Создать персонажа", "register")
         )
 
 @router.callback_query(F.data == "register")
@@ -148,10 +147,7 @@ async def process_kingdom(callback: CallbackQuery, state: FSMContext):
         f"Всё верно?"
     )
     
-    keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✅ Создать персонажа", callback_data="confirm_registration")],
-        [InlineKeyboardButton(text="❌ Начать заново", callback_data="register")]
-    ])
+    keyboard = STATIC_KEYBOARDS['registration_confirmation']
     
     await callback.message.edit_text(confirmation_text, reply_markup=keyboard)
     await callback.answer()
@@ -186,9 +182,7 @@ async def confirm_registration(callback: CallbackQuery, state: FSMContext):
     except Exception as e:
         await callback.message.edit_text(
             "❌ Произошла ошибка при создании персонажа. Попробуйте ещё раз.",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="register")]
-            ])
+            reply_markup=single_button_keyboard("🔄 Попробовать снова", "register")
         )
     
     await callback.answer()
@@ -0,0 +1,51 @@
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from functools import lru_cache
+from config.settings import GameConstants
+from keyboards.static import static_keyboard
+from typing import Tuple
+
+# (date label, time label, slot code) of an upcoming war, e.g. ("сегодня", "13:00", "20240101_13")
+WarSlot = Tuple[str, str, str]
+
+@lru_cache(maxsize=64)
+def war_attack_keyboard(user_kingdom: str, slots: Tuple[WarSlot, ...]) -> InlineKeyboardMarkup:
+    """Attack targets of the upcoming wars, the player's own kingdom excluded"""
+    rows = []
+    for date_str, time_str, slot_code in slots:
+        for kingdom_key, kingdom_info in GameConstants.KINGDOMS.items():
+            if kingdom_key != user_kingdom:
+                rows.append([InlineKeyboardButton(
+                    text=f"⚔️ {kingdom_info['emoji']} {kingdom_info['name']} [{date_str} {time_str}]",
+                    callback_data=f"attack_kingdom_{kingdom_key}_{slot_code}"
+                )])
+    rows.append([InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars")])
+    return static_keyboard(rows)
+
+@lru_cache(maxsize=64)
+def war_defense_keyboard(slots: Tuple[WarSlot, ...]) -> InlineKeyboardMarkup:
+    """Defense sign-up for the upcoming wars"""
+    rows = [
+        [InlineKeyboardButton(
+            text=f"🛡️ Защищать {date_str} в {time_str}",
+            callback_data=f"defend_kingdom_{slot_code}"
+        )]
+        for date_str, time_str, slot_code in slots
+    ]
+    rows.append([InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars")])
+    return static_keyboard(rows)
+
+@lru_cache(maxsize=None)
+def join_attack_keyboard(user_kingdom: str) -> InlineKeyboardMarkup:
+    """Kingdoms a player can join an attack on"""
+    kingdoms = {
+        'north': '❄️ Северное',
+        'west': '🌅 Западное',
+        'east': '🌸 Восточное',
+        'south': '🔥 Южное'
+    }
+    rows = [
+        [InlineKeyboardButton(text=f"🗡️ Атаковать {kingdom_name}", callback_data=f"join_attack_{kingdom_id}")]
+        for kingdom_id, kingdom_name in kingdoms.items() if kingdom_id != user_kingdom
+    ]
+    rows.append([InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars_menu")])
+    return static_keyboard(rows)
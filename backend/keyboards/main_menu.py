@@ -1,8 +1,13 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from functools import lru_cache
+from keyboards.static import StaticKeyboardMarkup, static_keyboard
 
-def main_menu_keyboard() -> InlineKeyboardMarkup:
-    """Main menu keyboard"""
+# Static menus are built once at import; keyboards that depend on a small
+# key (kingdom, flag) are memoized per key. Both are shared between messages
+# and frozen, so handlers must not modify them.
+
+def _build_main_menu() -> StaticKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     builder.row(
@@ -22,10 +27,9 @@ def main_menu_keyboard() -> InlineKeyboardMarkup:
         InlineKeyboardButton(text="📊 Рейтинги", callback_data="leaderboards")
     )
     
-    return builder.as_markup()
+    return static_keyboard(builder.export())
 
-def kingdom_selection_keyboard() -> InlineKeyboardMarkup:
-    """Kingdom selection keyboard"""
+def _build_kingdom_selection() -> StaticKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     kingdoms = [
@@ -38,10 +42,9 @@ def kingdom_selection_keyboard() -> InlineKeyboardMarkup:
     for name, callback in kingdoms:
         builder.row(InlineKeyboardButton(text=name, callback_data=callback))
     
-    return builder.as_markup()
+    return static_keyboard(builder.export())
 
-def gender_selection_keyboard() -> InlineKeyboardMarkup:
-    """Gender selection keyboard"""
+def _build_gender_selection() -> StaticKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     builder.row(
@@ -49,10 +52,9 @@ def gender_selection_keyboard() -> InlineKeyboardMarkup:
         InlineKeyboardButton(text="👩 Женский", callback_data="gender_female")
     )
     
-    return builder.as_markup()
+    return static_keyboard(builder.export())
 
-def battle_menu_keyboard() -> InlineKeyboardMarkup:
-    """Battle menu keyboard"""
+def _build_battle_menu() -> StaticKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     
     builder.row(
@@ -75,8 +77,129 @@ def battle_menu_keyboard() -> InlineKeyboardMarkup:
         InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
     )
     
-    return builder.as_markup()
+    return static_keyboard(builder.export())
+
+# Prebuilt static menus
+STATIC_KEYBOARDS = {
+    'main_menu': _build_main_menu(),
+    'kingdom_selection': _build_kingdom_selection(),
+    'gender_selection': _build_gender_selection(),
+    'battle_menu': _build_battle_menu(),
+    'pvp_no_challenges': static_keyboard([
+        [InlineKeyboardButton(text="🏰 Атака королевства", callback_data="kingdom_attack")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
+    ]),
+    'training_menu': static_keyboard([
+        [InlineKeyboardButton(text="⚔️ Быстрый бой", callback_data="quick_training")],
+        [InlineKeyboardButton(text="🎯 Интерактивный бой", callback_data="pve_encounter")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
+    ]),
+    'training_result': static_keyboard([
+        [InlineKeyboardButton(text="🔄 Ещё бой", callback_data="training_battle")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
+    ]),
+    'enhanced_pve_result': static_keyboard([
+        [InlineKeyboardButton(text="🔄 Новый бой", callback_data="enhanced_pve_encounter")],
+        [InlineKeyboardButton(text="🔙 В меню", callback_data="battle_menu")]
+    ]),
+    'war_blocked': static_keyboard([
+        [InlineKeyboardButton(text="🔄 Проверить статус", callback_data="enhanced_battle_menu")],
+        [InlineKeyboardButton(text="🔙 В главное меню", callback_data="main_menu")]
+    ]),
+    'enhanced_battle_menu': static_keyboard([
+        [
+            InlineKeyboardButton(text="🎯 Интерактивный PvE", callback_data="enhanced_pve_encounter"),
+            InlineKeyboardButton(text="⚔️ Интерактивный PvP", callback_data="interactive_pvp")
+        ],
+        [
+            InlineKeyboardButton(text="🤖 Быстрая тренировка", callback_data="quick_training"),
+            InlineKeyboardButton(text="🏰 Атака королевства", callback_data="kingdom_attack")
+        ],
+        [
+            InlineKeyboardButton(text="🛡️ Защита королевства", callback_data="kingdom_defense"),
+            InlineKeyboardButton(text="⚔️ Войны королевств", callback_data="kingdom_wars_menu")
+        ],
+        [
+            InlineKeyboardButton(text="📊 Статистика боев", callback_data="battle_stats"),
+            InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
+        ]
+    ]),
+    'enhanced_war_menu': static_keyboard([
+        [
+            InlineKeyboardButton(text="🗡️ Присоединиться к атаке", callback_data="join_attack_menu"),
+            InlineKeyboardButton(text="🛡️ Защищать королевство", callback_data="join_defense")
+        ],
+        [
+            InlineKeyboardButton(text="📊 Мои результаты войн", callback_data="my_war_results"),
+            InlineKeyboardButton(text="🏆 Статистика королевств", callback_data="kingdom_stats")
+        ],
+        [
+            InlineKeyboardButton(text="❓ Правила войн", callback_data="war_rules"),
+            InlineKeyboardButton(text="🔙 Назад", callback_data="enhanced_battle_menu")
+        ]
+    ]),
+    'war_joined': static_keyboard([
+        [InlineKeyboardButton(text="🏰 Статус войны", callback_data="kingdom_wars_menu")],
+        [InlineKeyboardButton(text="🔙 В главное меню", callback_data="main_menu")]
+    ]),
+    'join_attack_failed': static_keyboard([
+        [InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="join_attack_menu")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars_menu")]
+    ]),
+    'join_defense_failed': static_keyboard([
+        [InlineKeyboardButton(text="🔄 Попробовать снова", callback_data="join_defense")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars_menu")]
+    ]),
+    'pvp_result': static_keyboard([
+        [InlineKeyboardButton(text="🔄 Новый PvP", callback_data="interactive_pvp")],
+        [InlineKeyboardButton(text="🔙 В меню", callback_data="battle_menu")]
+    ]),
+    'pve_result': static_keyboard([
+        [InlineKeyboardButton(text="🔄 Новый бой", callback_data="pve_encounter")],
+        [InlineKeyboardButton(text="🔙 В меню", callback_data="battle_menu")]
+    ]),
+    'inventory_empty': static_keyboard([
+        [InlineKeyboardButton(text="🛒 Магазин", callback_data="shop_menu")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")]
+    ]),
+    'war_menu': static_keyboard([
+        [InlineKeyboardButton(text="⚔️ Атаковать королевство", callback_data="kingdom_war_attack")],
+        [InlineKeyboardButton(text="🛡️ Защищать своё королевство", callback_data="kingdom_war_defend")],
+        [InlineKeyboardButton(text="📊 Результаты войн", callback_data="war_results")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu")]
+    ]),
+    'war_results_menu': static_keyboard([
+        [InlineKeyboardButton(text="📈 Мои результаты", callback_data="my_war_results")],
+        [InlineKeyboardButton(text="🌍 Глобальные результаты", callback_data="global_war_results")],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="kingdom_wars")]
+    ]),
+    'war_result': static_keyboard([
+        [InlineKeyboardButton(text="🏰 Королевские битвы", callback_data="kingdom_wars")],
+        [InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")]
+    ]),
+    'registration_confirmation': static_keyboard([
+        [InlineKeyboardButton(text="✅ Создать персонажа", callback_data="confirm_registration")],
+        [InlineKeyboardButton(text="❌ Начать заново", callback_data="register")]
+    ])
+}
 
+def main_menu_keyboard() -> InlineKeyboardMarkup:
+    """Main menu keyboard"""
+    return STATIC_KEYBOARDS['main_menu']
+
+def kingdom_selection_keyboard() -> InlineKeyboardMarkup:
+    """Kingdom selection keyboard"""
+    return STATIC_KEYBOARDS['kingdom_selection']
+
+def gender_selection_keyboard() -> InlineKeyboardMarkup:
+    """Gender selection keyboard"""
+    return STATIC_KEYBOARDS['gender_selection']
+
+def battle_menu_keyboard() -> InlineKeyboardMarkup:
+    """Battle menu keyboard"""
+    return STATIC_KEYBOARDS['battle_menu']
+
+@lru_cache(maxsize=None)
 def kingdom_attack_keyboard(user_kingdom: str) -> InlineKeyboardMarkup:
     """Kingdom attack selection keyboard"""
     builder = InlineKeyboardBuilder()
@@ -96,7 +219,7 @@ def kingdom_attack_keyboard(user_kingdom: str) -> InlineKeyboardMarkup:
             ))
     
     builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="battle_menu"))
-    return builder.as_markup()
+    return static_keyboard(builder.export())
 
 def battle_accept_keyboard(battle_id: int) -> InlineKeyboardMarkup:
     """Battle accept/decline keyboard"""
@@ -109,6 +232,7 @@ def battle_accept_keyboard(battle_id: int) -> InlineKeyboardMarkup:
     
     return builder.as_markup()
 
+@lru_cache(maxsize=None)
 def profile_menu_keyboard(has_free_points: bool = False) -> InlineKeyboardMarkup:
     """Profile menu keyboard"""
     builder = InlineKeyboardBuilder()
@@ -132,4 +256,4 @@ def profile_menu_keyboard(has_free_points: bool = False) -> InlineKeyboardMarkup
         InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")
     )
     
-    return builder.as_markup()
\ No newline at end of file
+    return static_keyboard(builder.export())
\ No newline at end of file
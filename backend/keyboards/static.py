@@ -0,0 +1,17 @@
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from functools import lru_cache
+from pydantic import ConfigDict
+from typing import Iterable
+
+class StaticKeyboardMarkup(InlineKeyboardMarkup):
+    """Inline keyboard built once and shared by every message that shows it"""
+    model_config = ConfigDict(frozen=True)
+
+def static_keyboard(rows: Iterable[Iterable[InlineKeyboardButton]]) -> StaticKeyboardMarkup:
+    """Freeze keyboard rows into a shareable markup"""
+    return StaticKeyboardMarkup(inline_keyboard=[list(row) for row in rows])
+
+@lru_cache(maxsize=256)
+def single_button_keyboard(text: str, callback_data: str) -> StaticKeyboardMarkup:
+    """Keyboard with one button, e.g. "🔙 Назад" to a menu"""
+    return static_keyboard([[InlineKeyboardButton(text=text, callback_data=callback_data)]])
@@ -0,0 +1,29 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from utils.metrics import metrics
+
+updates_handled = metrics.counter('rpg_updates_total', 'Updates handled by the dispatcher', ['type'])
+update_errors = metrics.counter('rpg_update_errors_total', 'Updates whose handler raised', ['type'])
+update_duration = metrics.histogram('rpg_update_duration_seconds', 'Time to handle an update', ['type'])
+
+class MetricsMiddleware(BaseMiddleware):
+    """Outer update middleware: counts updates and times their handling"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            update_errors.inc(type=update_type)
+            raise
+        finally:
+            updates_handled.inc(type=update_type)
+            update_duration.observe(time.perf_counter() - started, type=update_type)
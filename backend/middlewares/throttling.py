@@ -2,6 +2,9 @@ import time
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
+from utils.metrics import metrics
+
+throttled_requests = metrics.counter('rpg_throttled_total', 'Requests rejected by the rate limit', ['type'])
 
 class ThrottlingMiddleware(BaseMiddleware):
     def __init__(self, rate_limit: int = 30):
@@ -30,6 +33,7 @@ class ThrottlingMiddleware(BaseMiddleware):
             
             # Check rate limit
             if len(self.user_requests[user_id]) >= self.rate_limit:
+                throttled_requests.inc(type=type(event).__name__)
                 if isinstance(event, Message):
                     await event.answer("⚠️ Слишком много запросов. Подождите немного.")
                 elif isinstance(event, CallbackQuery):
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Text, DateTime, Index
+from config.database import Base
+
+class FSMRecord(Base):
+    """FSM state and data of one storage key (bot, chat, user, thread, destiny)"""
+    __tablename__ = "fsm_states"
+    __table_args__ = (
+        Index('ix_fsm_states_updated_at', 'updated_at'),
+    )
+
+    key = Column(String, primary_key=True)
+    state = Column(String)
+    data = Column(Text, nullable=False, default="{}")  # JSON object
+
+    # Last change; rows untouched for FSM_STATE_TTL are abandoned and deleted
+    updated_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<FSMRecord(key={self.key}, state={self.state})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, ForeignKey, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from config.database import Base
@@ -71,6 +71,10 @@ class Item(Base):
 
 class UserItem(Base):
     __tablename__ = "user_items"
+    __table_args__ = (
+        # Inventory pages are keyset-paginated by id within a user
+        Index('ix_user_items_user_id', 'user_id', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
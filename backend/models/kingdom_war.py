@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, Boolean, Float, Index
 from sqlalchemy.sql import func
 from config.database import Base
 import enum
@@ -9,6 +9,7 @@ class WarStatusEnum(enum.Enum):
     scheduled = "scheduled"
     active = "active"
     finished = "finished"
+    cancelled = "cancelled"  # Missed while the bot was down, never fought
 
 class WarTypeEnum(enum.Enum):
     kingdom_attack = "kingdom_attack"
@@ -43,6 +44,12 @@ class KingdomWar(Base):
     battle_results = Column(Text, default="[]")  # JSON array of battle results
     money_transferred = Column(Text, default="{}")  # JSON dict: kingdom -> amount
     exp_distributed = Column(Text, default="{}")  # JSON dict: player_id -> exp
+    # HP/MP of the participants given back. When the column is added to an existing
+    # database, wars finished in the last six hours (the latest war slot) still get restored
+    participants_restored = Column(
+        Boolean, default=False, server_default='0', nullable=False,
+        info={'backfill': "status = 'finished' AND finished_at < datetime('now', '-6 hours')"}
+    )
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -142,6 +149,10 @@ class KingdomWar(Base):
 
 class WarParticipation(Base):
     __tablename__ = "war_participations"
+    __table_args__ = (
+        Index('ix_war_participations_war_user', 'war_id', 'user_id', unique=True),
+        Index('ix_war_participations_user', 'user_id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     war_id = Column(Integer, nullable=False)
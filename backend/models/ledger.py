@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, DateTime, Enum, Index
+from config.database import Base
+import enum
+
+class LedgerReasonEnum(enum.Enum):
+    opening = "opening"  # balance held before the ledger existed
+    registration = "registration"
+    shop_buy = "shop_buy"
+    shop_sell = "shop_sell"
+    pve_reward = "pve_reward"
+    pvp_reward = "pvp_reward"
+    war_loss = "war_loss"
+    war_penalty = "war_penalty"
+    war_reward = "war_reward"
+
+class MoneyLedgerEntry(Base):
+    """Append-only record of a money change; rows are never updated or deleted"""
+    __tablename__ = "money_ledger"
+    __table_args__ = (
+        Index('ix_money_ledger_user', 'user_id'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    delta = Column(Integer, nullable=False)
+    reason = Column(Enum(LedgerReasonEnum), nullable=False)
+    ref_id = Column(Integer)  # item, battle or war the change came from
+    
+    # Time of the money change, not of the (batched) insert
+    ts = Column(DateTime(timezone=True), nullable=False)
+    
+    def __repr__(self):
+        return f"<MoneyLedgerEntry(user_id={self.user_id}, delta={self.delta}, reason={self.reason.value})>"
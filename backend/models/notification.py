@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, DateTime, Text
+from sqlalchemy.sql import func
+from config.database import Base
+
+class PendingNotification(Base):
+    __tablename__ = "pending_notifications"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<PendingNotification(id={self.id}, chat_id={self.chat_id})>"
@@ -1,8 +1,22 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, event
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
 from config.database import Base
+from typing import NamedTuple
 import enum
 
+class StatBlock(NamedTuple):
+    """Five character stats (base, equipment bonus or effective)"""
+    strength: int
+    armor: int
+    hp: int
+    agility: int
+    mana: int
+    
+    @property
+    def total(self) -> int:
+        return self.strength + self.armor + self.agility + (self.hp // 10) + (self.mana // 5)
+
 class GenderEnum(enum.Enum):
     male = "male"
     female = "female"
@@ -42,6 +56,13 @@ class User(Base):
     mana = Column(Integer, default=50)
     current_mana = Column(Integer, default=50)
     
+    # Equipment bonuses: sum of equipped items, updated incrementally on equip/unequip
+    strength_bonus = Column(Integer, default=0, server_default='0', nullable=False)
+    armor_bonus = Column(Integer, default=0, server_default='0', nullable=False)
+    hp_bonus = Column(Integer, default=0, server_default='0', nullable=False)
+    agility_bonus = Column(Integer, default=0, server_default='0', nullable=False)
+    mana_bonus = Column(Integer, default=0, server_default='0', nullable=False)
+    
     # Additional fields
     inventory_size = Column(Integer, default=20)
     
@@ -61,16 +82,56 @@ class User(Base):
         return f"<User(id={self.id}, name='{self.name}', level={self.level})>"
     
     @property
+    def base_stats(self) -> StatBlock:
+        """Stats from level-ups only"""
+        return StatBlock(self.strength, self.armor, self.hp, self.agility, self.mana)
+    
+    @property
+    def equipment_bonus(self) -> StatBlock:
+        """Bonuses of equipped items"""
+        return StatBlock(
+            self.strength_bonus or 0, self.armor_bonus or 0, self.hp_bonus or 0,
+            self.agility_bonus or 0, self.mana_bonus or 0
+        )
+    
+    @property
+    def effective_stats(self) -> StatBlock:
+        """Base stats plus equipment bonuses, cached until either changes"""
+        cached = self.__dict__.get('_effective_stats_cache')
+        if cached is None:
+            cached = StatBlock(*(base + bonus for base, bonus in zip(self.base_stats, self.equipment_bonus)))
+            self.__dict__['_effective_stats_cache'] = cached
+        return cached
+    
+    @hybrid_property
     def max_hp(self):
         """Calculate max HP including bonuses"""
-        return self.hp
+        return self.effective_stats.hp
     
-    @property
+    @max_hp.expression
+    def max_hp(cls):
+        return cls.hp + cls.hp_bonus
+    
+    @hybrid_property
     def max_mana(self):
         """Calculate max mana including bonuses"""
-        return self.mana
+        return self.effective_stats.mana
+    
+    @max_mana.expression
+    def max_mana(cls):
+        return cls.mana + cls.mana_bonus
     
     @property
     def total_stats(self):
         """Calculate total stats"""
-        return self.strength + self.armor + self.agility + (self.hp // 10) + (self.mana // 5)
\ No newline at end of file
+        return self.effective_stats.total
+
+def _reset_effective_stats(target, *args):
+    """Drop the cached effective stats when a stat column is set, loaded or expired"""
+    target.__dict__.pop('_effective_stats_cache', None)
+
+for _stat in StatBlock._fields:
+    event.listen(getattr(User, _stat), 'set', _reset_effective_stats)
+    event.listen(getattr(User, f'{_stat}_bonus'), 'set', _reset_effective_stats)
+for _event in ('load', 'refresh', 'expire'):
+    event.listen(User, _event, _reset_effective_stats)
@@ -0,0 +1,63 @@
+"""
+Long polling ingestion: the bot asks Telegram for updates with getUpdates.
+
+As with the webhook, updates are handed to a KeyedTaskRunner instead of
+being awaited in the polling loop, so stopping the loop stops intake while
+the updates already accepted are still being handled; bot_main.shutdown
+then gives them SHUTDOWN_TIMEOUT to finish.
+"""
+import asyncio
+import logging
+from typing import Callable, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from config.settings import settings
+from utils.update_runner import KeyedTaskRunner
+from webhook import update_key
+
+logger = logging.getLogger(__name__)
+
+POLL_TIMEOUT = 30  # Long polling timeout of getUpdates (seconds)
+POLL_RETRY = 5.0  # Pause after a failed getUpdates
+CONFIRM_TIMEOUT = 5  # Request timeout of the getUpdates confirming the last batch on stop
+
+async def poll_updates(bot: Bot, allowed_updates: List[str], on_update: Callable[[Update], None]):
+    """Long-poll Telegram and pass each update to `on_update` until cancelled"""
+    # Polling needs the webhook removed; updates queued meanwhile are kept unless asked otherwise
+    await bot.delete_webhook(drop_pending_updates=settings.DROP_PENDING_UPDATES)
+    offset = None
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset, timeout=POLL_TIMEOUT, allowed_updates=allowed_updates,
+                    request_timeout=POLL_TIMEOUT + 10
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error getting updates: {e}")
+                await asyncio.sleep(POLL_RETRY)
+                continue
+            for update in updates:
+                on_update(update)
+                offset = update.update_id + 1
+    finally:
+        if offset is not None:
+            # Telegram only forgets updates once a later offset is asked for;
+            # without this the last batch would be delivered again after a restart
+            try:
+                await bot.get_updates(offset=offset, limit=1, timeout=0, request_timeout=CONFIRM_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Could not confirm the last polled updates: {e}")
+
+async def run_polling(dp: Dispatcher, bot: Bot, runner: KeyedTaskRunner):
+    """Feed polled updates to the dispatcher until cancelled"""
+
+    def handle_update(update: Update):
+        runner.submit(update_key(update), lambda: dp.feed_update(bot, update))
+
+    await dp.emit_startup(bot=bot, **dp.workflow_data)
+    await poll_updates(bot, dp.resolve_used_update_types(), handle_update)
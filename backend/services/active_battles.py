@@ -0,0 +1,68 @@
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from config.database import AsyncSessionLocal
+from models.interactive_battle import InteractiveBattle, BattlePhaseEnum
+from utils.metrics import metrics
+from typing import Dict, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'changed_battles'
+
+class ActiveBattles:
+    """Ids of the interactive battles that are not finished, for the metrics.
+
+    Loaded once, then kept up to date from committed ORM changes, so reading
+    the count never queries the database. With several workers each one
+    follows the battles of its own players (player1_id % workers == shard).
+    """
+
+    def __init__(self):
+        self._ids: Set[int] = set()
+        self.shard = 0
+        self.workers = 1
+
+    @property
+    def count(self) -> int:
+        return len(self._ids)
+
+    def _follows(self, battle: InteractiveBattle) -> bool:
+        # A PvP defender's moves are committed on their own worker; only player1's worker counts the battle
+        return self.workers == 1 or battle.player1_id % self.workers == self.shard
+    
+    async def load(self, shard: int = 0, workers: int = 1):
+        self.shard, self.workers = shard, workers
+        query = select(InteractiveBattle.id).where(InteractiveBattle.phase != BattlePhaseEnum.finished)
+        if workers > 1:
+            query = query.where(InteractiveBattle.player1_id % workers == shard)
+        async with AsyncSessionLocal() as session:
+            self._ids = set((await session.scalars(query)).all())
+        logger.info(f"Active battles loaded: {self.count}")
+
+    def _on_flush(self, session: Session, flush_context):
+        for instance in list(session.new) + list(session.dirty):
+            if isinstance(instance, InteractiveBattle) and self._follows(instance):
+                changed: Dict[int, bool] = session.info.setdefault(PENDING_KEY, {})
+                changed[instance.id] = instance.phase != BattlePhaseEnum.finished
+
+    def _on_commit(self, session: Session):
+        for battle_id, active in session.info.pop(PENDING_KEY, {}).items():
+            if active:
+                self._ids.add(battle_id)
+            else:
+                self._ids.discard(battle_id)
+
+    def _on_rollback(self, session: Session):
+        session.info.pop(PENDING_KEY, None)
+
+# Глобальный счётчик активных боёв
+active_battles = ActiveBattles()
+
+event.listen(Session, "after_flush", active_battles._on_flush)
+event.listen(Session, "after_commit", active_battles._on_commit)
+event.listen(Session, "after_rollback", active_battles._on_rollback)
+
+metrics.gauge('rpg_active_interactive_battles', 'Interactive battles not finished yet').set_function(
+    lambda: active_battles.count
+)
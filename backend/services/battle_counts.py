@@ -0,0 +1,78 @@
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from config.database import AsyncSessionLocal
+from models.battle import Battle, BattleStatusEnum
+from utils.metrics import metrics
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'battle_status_changes'
+
+class BattleCounts:
+    """Rows of the battles table by status, for the metrics.
+
+    Counted with one query at startup, then kept up to date from committed
+    ORM changes. With several workers each one follows the battles of its own
+    challengers (challenger_id % workers == shard), so the counts of all
+    workers add up to the table.
+    """
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {status.value: 0 for status in BattleStatusEnum}
+        self.shard = 0
+        self.workers = 1
+
+    def _follows(self, battle: Battle) -> bool:
+        return self.workers == 1 or battle.challenger_id % self.workers == self.shard
+
+    async def load(self, shard: int = 0, workers: int = 1):
+        self.shard, self.workers = shard, workers
+        query = select(Battle.status, func.count(Battle.id)).group_by(Battle.status)
+        if workers > 1:
+            query = query.where(Battle.challenger_id % workers == shard)
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(query)).all()
+
+        self.counts = {status.value: 0 for status in BattleStatusEnum}
+        for status, count in rows:
+            self.counts[status.value] = count
+        logger.info(f"Battle counts loaded: {self.counts}")
+
+    def _on_flush(self, session: Session, flush_context):
+        changes: List[Tuple[Optional[BattleStatusEnum], Optional[BattleStatusEnum]]] = []
+        for instance in session.new:
+            if isinstance(instance, Battle) and self._follows(instance):
+                changes.append((None, instance.status))
+        for instance in session.dirty:
+            if isinstance(instance, Battle) and self._follows(instance):
+                history = inspect(instance).attrs.status.history
+                if history.deleted and history.added:
+                    changes.append((history.deleted[0], history.added[0]))
+        for instance in session.deleted:
+            if isinstance(instance, Battle) and self._follows(instance):
+                changes.append((instance.status, None))
+        if changes:
+            session.info.setdefault(PENDING_KEY, []).extend(changes)
+
+    def _on_commit(self, session: Session):
+        for old, new in session.info.pop(PENDING_KEY, []):
+            if old is not None:
+                self.counts[old.value] -= 1
+            if new is not None:
+                self.counts[new.value] += 1
+
+    def _on_rollback(self, session: Session):
+        session.info.pop(PENDING_KEY, None)
+
+# Глобальные счётчики боёв
+battle_counts = BattleCounts()
+
+event.listen(Session, "after_flush", battle_counts._on_flush)
+event.listen(Session, "after_commit", battle_counts._on_commit)
+event.listen(Session, "after_rollback", battle_counts._on_rollback)
+
+_battles_gauge = metrics.gauge('rpg_battles', 'Rows of the battles table by status', ['status'])
+for _status in BattleStatusEnum:
+    _battles_gauge.set_function(lambda status=_status.value: battle_counts.counts[status], status=_status.value)
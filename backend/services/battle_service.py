@@ -3,11 +3,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from config.database import AsyncSessionLocal
 from models.battle import Battle, BattleTypeEnum, BattleStatusEnum
 from models.user import User
+from models.ledger import LedgerReasonEnum
+from services.ledger_service import money_ledger
 from utils.formulas import GameFormulas
+from utils.task_registry import background_tasks
 from typing import Dict, List, Optional
 import logging
 import random
-import asyncio
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -42,7 +44,7 @@ class BattleService:
             await session.commit()
             
             # Process battle in background
-            asyncio.create_task(self.process_battle(battle_id))
+            background_tasks.spawn(self.process_battle(battle_id), name=f"battle-{battle_id}")
             return True
     
     async def process_battle(self, battle_id: int) -> Battle:
@@ -73,7 +75,7 @@ class BattleService:
             
             while turn <= 50 and challenger_hp > 0 and defender_hp > 0:
                 # Determine who attacks first based on agility
-                if challenger.agility >= defender.agility:
+                if challenger.effective_stats.agility >= defender.effective_stats.agility:
                     attacker, defender_target = challenger, defender
                     attacker_hp, defender_hp_ref = challenger_hp, 'defender_hp'
                 else:
@@ -82,16 +84,16 @@ class BattleService:
                 
                 # Calculate damage
                 attacker_stats = {
-                    'strength': attacker.strength,
-                    'agility': attacker.agility
+                    'strength': attacker.effective_stats.strength,
+                    'agility': attacker.effective_stats.agility
                 }
                 defender_stats = {
-                    'armor': defender_target.armor,
-                    'agility': defender_target.agility
+                    'armor': defender_target.effective_stats.armor,
+                    'agility': defender_target.effective_stats.agility
                 }
                 
                 # Check for dodge
-                if GameFormulas.is_dodge(defender_target.agility):
+                if GameFormulas.is_dodge(defender_target.effective_stats.agility):
                     battle_log.append({
                         'turn': turn,
                         'attacker': attacker.name,
@@ -104,7 +106,7 @@ class BattleService:
                     damage = GameFormulas.calculate_damage(attacker_stats, defender_stats)
                     
                     # Check for critical hit
-                    if GameFormulas.is_critical_hit(attacker.agility):
+                    if GameFormulas.is_critical_hit(attacker.effective_stats.agility):
                         damage = int(damage * 1.5)
                         result = 'critical'
                     else:
@@ -153,18 +155,18 @@ class BattleService:
             
             # Calculate and apply rewards
             winner_stats = {
-                'strength': winner.strength,
-                'armor': winner.armor,
-                'agility': winner.agility,
-                'hp': winner.hp,
-                'mana': winner.mana
+                'strength': winner.effective_stats.strength,
+                'armor': winner.effective_stats.armor,
+                'agility': winner.effective_stats.agility,
+                'hp': winner.max_hp,
+                'mana': winner.max_mana
             }
             loser_stats = {
-                'strength': loser.strength,
-                'armor': loser.armor,
-                'agility': loser.agility,
-                'hp': loser.hp,
-                'mana': loser.mana
+                'strength': loser.effective_stats.strength,
+                'armor': loser.effective_stats.armor,
+                'agility': loser.effective_stats.agility,
+                'hp': loser.max_hp,
+                'mana': loser.max_mana
             }
             
             rewards = GameFormulas.calculate_battle_rewards(winner_stats, loser_stats)
@@ -174,6 +176,7 @@ class BattleService:
             # Update winner stats
             winner.experience += rewards['experience']
             winner.money += rewards['money']
+            money_ledger.add(session, winner.id, rewards['money'], LedgerReasonEnum.pvp_reward, battle.id)
             
             # Update battle statistics
             if winner == challenger:
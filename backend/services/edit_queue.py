@@ -0,0 +1,163 @@
+from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest, TelegramForbiddenError, TelegramNotFound
+from aiogram.types import Message
+from config.settings import settings
+from utils.metrics import metrics
+from utils.rate_limiter import TokenBucket
+from collections import OrderedDict
+from typing import Dict, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+EditKey = Tuple[int, int]  # (chat_id, message_id)
+
+class EditQueue:
+    """Outbound message edits, coalesced per message and paced per chat.
+
+    An edit is sent right away while the chat has budget. Edits of the same
+    message queued meanwhile replace each other, so only the latest content
+    is sent, and content equal to what the message already shows is skipped.
+    A message counts as showing our last edit only while its edit_date is the
+    one Telegram returned for that edit, so edits made elsewhere are noticed.
+    """
+
+    MAX_REMEMBERED = 10000  # Messages whose last sent content is kept for deduplication
+
+    def __init__(self, chat_rate: float = None, chat_burst: int = None):
+        self.chat_rate = chat_rate or settings.EDIT_CHAT_RATE
+        self.chat_burst = chat_burst or settings.EDIT_CHAT_BURST
+
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._paused_until: Dict[int, float] = {}  # chat_id -> flood control deadline
+        self._latest: Dict[EditKey, tuple] = {}  # Latest unsent (bot, content) of a message
+        self._shown: "OrderedDict[EditKey, tuple]" = OrderedDict()  # Last sent (content, edit_date)
+        self._senders: Dict[EditKey, asyncio.Task] = {}
+
+        # Metrics
+        self.requested = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self.retried = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._latest)
+
+    async def edit(self, message: Message, text: str, reply_markup=None, **kwargs):
+        """Queue an edit_text of a bot message; returns without waiting for the API call"""
+        key = (message.chat.id, message.message_id)
+        content = (text, reply_markup, kwargs)
+        self.requested += 1
+
+        if key in self._latest:
+            self.coalesced += 1
+        elif key not in self._senders and self._shown.get(key) == (content, message.edit_date):
+            self.deduplicated += 1
+            return
+        self._latest[key] = (message.bot, content)
+
+        if key not in self._senders:
+            task = asyncio.create_task(self._send(key))
+            self._senders[key] = task
+
+    async def stop(self, timeout: float = 5.0):
+        """Wait for queued edits to be sent"""
+        if self._senders:
+            await asyncio.wait(list(self._senders.values()), timeout=timeout)
+
+    def get_stats(self) -> dict:
+        return {
+            'pending': self.pending_count,
+            'requested': self.requested,
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'deduplicated': self.deduplicated,
+            'failed': self.failed,
+            'retried': self.retried
+        }
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, capacity=self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _send(self, key: EditKey):
+        """Send the latest content of a message until nothing newer is queued"""
+        chat_id, message_id = key
+        last_sent = None
+        try:
+            while key in self._latest:
+                now = time.monotonic()
+                wait = self._paused_until.get(chat_id, 0.0) - now
+                if wait <= 0:
+                    wait = self._chat_bucket(chat_id).take(now)
+                if wait > 0:
+                    await asyncio.sleep(wait)  # later edits keep replacing the queued one
+                    continue
+
+                bot, content = self._latest.pop(key)
+                if content == last_sent:
+                    self.deduplicated += 1
+                    continue
+
+                text, reply_markup, kwargs = content
+                try:
+                    edited = await bot.edit_message_text(
+                        text=text, chat_id=chat_id, message_id=message_id,
+                        reply_markup=reply_markup, **kwargs
+                    )
+                    last_sent = content
+                    self.sent += 1
+                    self._remember(key, content, getattr(edited, 'edit_date', None))
+                except TelegramRetryAfter as e:
+                    # Flood control: hold the chat, the newest content is sent afterwards
+                    self.retried += 1
+                    self._paused_until[chat_id] = time.monotonic() + e.retry_after
+                    self._latest.setdefault(key, (bot, content))
+                    logger.warning(f"Flood control on chat {chat_id}, retry after {e.retry_after}s")
+                except TelegramBadRequest as e:
+                    if "message is not modified" in str(e):
+                        last_sent = content
+                        self.deduplicated += 1
+                    else:
+                        self.failed += 1
+                        logger.warning(f"Dropped edit of message {message_id} in chat {chat_id}: {e}")
+                except (TelegramForbiddenError, TelegramNotFound) as e:
+                    self.failed += 1
+                    logger.warning(f"Dropped edit of message {message_id} in chat {chat_id}: {e}")
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Error editing message {message_id} in chat {chat_id}: {e}")
+        finally:
+            del self._senders[key]
+            if self._paused_until.get(chat_id, 0.0) <= time.monotonic():
+                self._paused_until.pop(chat_id, None)
+            if len(self._chat_buckets) > self.MAX_REMEMBERED:
+                self._drop_idle_buckets()
+
+    def _drop_idle_buckets(self):
+        """Idle chats with full buckets behave exactly like fresh ones"""
+        busy = {chat_id for chat_id, _ in self._senders}
+        for chat_id in [c for c, b in self._chat_buckets.items() if c not in busy and b.is_full()]:
+            del self._chat_buckets[chat_id]
+
+    def _remember(self, key: EditKey, content: tuple, edit_date):
+        if edit_date is None:
+            self._shown.pop(key, None)
+            return
+        self._shown[key] = (content, edit_date)
+        self._shown.move_to_end(key)
+        if len(self._shown) > self.MAX_REMEMBERED:
+            self._shown.popitem(last=False)
+
+# Глобальная очередь редактирования сообщений
+edit_queue = EditQueue()
+metrics.gauge('rpg_outbound_queue_depth', 'Items waiting in an outbound queue', ['queue']).set_function(
+    lambda: edit_queue.pending_count, queue='edits'
+)
@@ -5,6 +5,8 @@ from models.interactive_battle import InteractiveBattle, BattleModeEnum, BattleP
 from models.monster import Monster
 from models.user import User
 from models.skill import UserSkill, SkillTypeEnum
+from models.ledger import LedgerReasonEnum
+from services.ledger_service import money_ledger
 from utils.formulas import GameFormulas
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Tuple, List
@@ -25,7 +27,7 @@ class EnhancedBattleService:
             if not player:
                 return None
             
-            if player.current_hp < player.hp * 0.3:
+            if player.current_hp < player.max_hp * 0.3:
                 return None
             
             # Generate random monster
@@ -48,6 +50,21 @@ class EnhancedBattleService:
             logger.info(f"Enhanced PvE encounter: Player {player_id} vs {monster.name}")
             return battle
     
+    async def accept_pve_battle(self, battle_id: int, player_id: int) -> bool:
+        """Accept the encounter and start the first round"""
+        async with AsyncSessionLocal() as session:
+            battle = await session.get(InteractiveBattle, battle_id)
+            if not battle or battle.player1_id != player_id:
+                return False
+            
+            if battle.phase == BattlePhaseEnum.monster_encounter:
+                battle.phase = BattlePhaseEnum.attack_selection
+                battle.reset_round_choices()
+                await session.commit()
+            
+            # After a failed flee the first round is already running
+            return battle.phase == BattlePhaseEnum.attack_selection
+    
     async def attempt_flee(self, battle_id: int, player_id: int) -> Tuple[bool, str, int]:
         """
         Attempt to flee from battle with chance calculation
@@ -64,7 +81,7 @@ class EnhancedBattleService:
             # Calculate flee chance based on agility and level difference
             level_diff = player.level - monster_data['level']
             base_chance = 0.6  # 60% base chance
-            agility_bonus = (player.agility - 10) * 0.02  # 2% per agility point above 10
+            agility_bonus = (player.effective_stats.agility - 10) * 0.02  # 2% per agility point above 10
             level_bonus = level_diff * 0.05  # 5% per level difference
             
             flee_chance = max(0.1, min(0.9, base_chance + agility_bonus + level_bonus))
@@ -108,7 +125,7 @@ class EnhancedBattleService:
     def _calculate_monster_attack(self, monster_data: dict, player: User) -> int:
         """Calculate monster's free attack damage"""
         base_damage = monster_data['strength'] + int(monster_data['agility'] * 0.5)
-        defense = int(player.armor * 0.8)
+        defense = int(player.effective_stats.armor * 0.8)
         return max(base_damage - defense, int(base_damage * 0.1))
     
     async def make_attack_choice(self, battle_id: int, player_id: int, attack_type: str) -> bool:
@@ -204,11 +221,8 @@ class EnhancedBattleService:
             monster_dodge_direction, skills_effects
         )
         
-        # Log player attack results
-        if player_damage > 0:
-            round_log['events'].extend(player_damage['events'])
-        else:
-            round_log['events'].append("💨 Игрок промахнулся!")
+        # Log player attack results (a hit or a miss, both are described)
+        round_log['events'].extend(player_damage['events'])
         
         # Apply damage to monster
         actual_damage = player_damage.get('damage', 0)
@@ -288,7 +302,7 @@ class EnhancedBattleService:
             # Check skill conditions
             should_use = False
             
-            if skill.skill_type == SkillTypeEnum.heal and battle.player1_hp < player.hp * 0.5:
+            if skill.skill_type == SkillTypeEnum.heal and battle.player1_hp < player.max_hp * 0.5:
                 should_use = True
             elif skill.skill_type == SkillTypeEnum.buff and battle.current_round <= 2:
                 should_use = True
@@ -304,7 +318,7 @@ class EnhancedBattleService:
                 if skill.skill_type == SkillTypeEnum.heal:
                     heal_amount = skill.heal_amount
                     old_hp = battle.player1_hp
-                    battle.player1_hp = min(battle.player1_hp + heal_amount, player.hp)
+                    battle.player1_hp = min(battle.player1_hp + heal_amount, player.max_hp)
                     actual_heal = battle.player1_hp - old_hp
                     
                     skills_used.append({
@@ -346,7 +360,7 @@ class EnhancedBattleService:
         
         if direction_hit and random.random() < hit_chance:
             # Direct hit
-            base_damage = player.strength + int(player.agility * 0.5)
+            base_damage = player.effective_stats.strength + int(player.effective_stats.agility * 0.5)
             
             # Apply attack type modifiers
             if attack_type == 'power':
@@ -358,7 +372,7 @@ class EnhancedBattleService:
             damage = max(base_damage - defense, int(base_damage * 0.1))
             
             # Check for critical hit (enhanced chance for precise attacks)
-            crit_chance = GameFormulas.critical_hit_chance(player.agility)
+            crit_chance = GameFormulas.critical_hit_chance(player.effective_stats.agility)
             if attack_type == 'precise':
                 crit_chance *= 1.5  # 50% higher crit chance for precise attacks
             
@@ -371,7 +385,7 @@ class EnhancedBattleService:
             
         else:
             # Missed, but check for glancing hit
-            if GameFormulas.is_critical_hit(player.agility) and random.random() < 0.15:
+            if GameFormulas.is_critical_hit(player.effective_stats.agility) and random.random() < 0.15:
                 result['damage'] = 2
                 result['events'].append("✨ Промах, но мастерство позволило нанести 2 урона!")
             else:
@@ -388,11 +402,11 @@ class EnhancedBattleService:
         
         # Monster hit, calculate damage
         base_damage = monster_data['strength'] + int(monster_data['agility'] * 0.5)
-        defense = int(player.armor * 0.8)
+        defense = int(player.effective_stats.armor * 0.8)
         damage = max(base_damage - defense, int(base_damage * 0.1))
         
         # Check for perfect dodge (very low chance)
-        perfect_dodge_chance = min(player.agility / 500.0, 0.07)  # Max 7%
+        perfect_dodge_chance = min(player.effective_stats.agility / 500.0, 0.07)  # Max 7%
         if random.random() < perfect_dodge_chance:
             return 0  # Perfect dodge
         
@@ -420,6 +434,7 @@ class EnhancedBattleService:
         player.current_hp = battle.player1_hp
         player.current_mana = battle.player1_mana
         player.money += battle.money_gained
+        money_ledger.add(session, player.id, battle.money_gained, LedgerReasonEnum.pve_reward, battle.id)
         player.pve_wins += 1
         
         # Add experience
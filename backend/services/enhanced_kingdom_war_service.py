@@ -1,10 +1,14 @@
-from sqlalchemy import select, and_, func, update
+from sqlalchemy import select, insert, exists, literal, and_, or_, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from config.database import AsyncSessionLocal
 from config.settings import settings
 from models.kingdom_war import KingdomWar, WarParticipation, WarStatusEnum, WarTypeEnum
 from models.user import User, KingdomEnum
+from models.ledger import LedgerReasonEnum
 from services.user_service import UserService
+from services.ledger_service import money_ledger
+from services.opponent_index import opponent_index
+from utils.war_rules import WarRules
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 import logging
@@ -32,12 +36,11 @@ class EnhancedKingdomWarService:
                 # Convert to UTC for storage
                 war_time_utc = war_time.astimezone(pytz.UTC)
                 
-                # Check if war already scheduled
+                # Check if war already scheduled (finished or cancelled wars count too)
                 existing = await session.scalar(
-                    select(KingdomWar).where(
-                        KingdomWar.scheduled_time == war_time_utc,
-                        KingdomWar.status == WarStatusEnum.scheduled
-                    )
+                    select(KingdomWar.id).where(
+                        KingdomWar.scheduled_time == war_time_utc
+                    ).limit(1)
                 )
                 
                 if not existing:
@@ -63,64 +66,14 @@ class EnhancedKingdomWarService:
             if user.kingdom.value == target_kingdom:
                 return False, "Нельзя атаковать своё королевство"
             
-            # Check if user is already in war mode
-            if await self._is_user_in_war_mode(user_id, session):
-                return False, "Вы уже заявлены на участие в войне королевств!"
-            
             # Find the war
-            war = await session.scalar(
-                select(KingdomWar).where(
-                    and_(
-                        KingdomWar.defending_kingdom == target_kingdom,
-                        KingdomWar.scheduled_time == war_time,
-                        KingdomWar.status == WarStatusEnum.scheduled
-                    )
-                )
-            )
-            
-            if not war:
+            war_id = await self._find_scheduled_war_id(target_kingdom, war_time, session)
+            if not war_id:
                 return False, "Война не найдена"
             
-            # Block user from other actions
-            await self._set_user_war_mode(user_id, war.id, 'attacker', session)
-            
-            # Add to attack squad
-            attack_squads = war.get_attack_squads()
-            user_kingdom = user.kingdom.value
-            
-            if user_kingdom not in attack_squads:
-                attack_squads[user_kingdom] = []
-            
-            attack_squads[user_kingdom].append(user_id)
-            war.set_attack_squads(attack_squads)
-            
-            # Add attacking kingdom to list
-            attacking_kingdoms = war.get_attacking_kingdoms()
-            if user_kingdom not in attacking_kingdoms:
-                attacking_kingdoms.append(user_kingdom)
-                war.set_attacking_kingdoms(attacking_kingdoms)
-            
-            # Create participation record
-            participation = WarParticipation(
-                war_id=war.id,
-                user_id=user_id,
-                kingdom=user_kingdom,
-                role='attacker'
-            )
-            
-            # Store player stats
-            player_stats = {
-                'strength': user.strength,
-                'armor': user.armor,
-                'hp': user.hp,
-                'agility': user.agility,
-                'mana': user.mana,
-                'level': user.level
-            }
-            participation.set_player_stats(player_stats)
-            
-            session.add(participation)
-            await session.commit()
+            # Participation row is the single source of truth; squads are built at war start
+            if not await self._register_participation(user, war_id, 'attacker', session):
+                return False, "Вы уже заявлены на участие в войне королевств!"
             
             logger.info(f"User {user_id} joined enhanced attack on {target_kingdom}")
             return True, f"Вы заявлены на атаку {target_kingdom}! Дождитесь начала войны. Другие действия заблокированы."
@@ -132,62 +85,97 @@ class EnhancedKingdomWarService:
             if not user:
                 return False, "Пользователь не найден"
             
-            # Check if user is already in war mode
-            if await self._is_user_in_war_mode(user_id, session):
-                return False, "Вы уже заявлены на участие в войне королевств!"
-            
             # Find the war for user's kingdom
-            war = await session.scalar(
-                select(KingdomWar).where(
-                    and_(
-                        KingdomWar.defending_kingdom == user.kingdom.value,
-                        KingdomWar.scheduled_time == war_time,
-                        KingdomWar.status == WarStatusEnum.scheduled
-                    )
-                )
-            )
-            
-            if not war:
+            war_id = await self._find_scheduled_war_id(user.kingdom.value, war_time, session)
+            if not war_id:
                 return False, "Война не найдена"
             
-            # Block user from other actions
-            await self._set_user_war_mode(user_id, war.id, 'defender', session)
-            
-            # Add to defense squad
-            defense_squad = war.get_defense_squad()
-            defense_squad.append(user_id)
-            war.set_defense_squad(defense_squad)
-            
-            # Create participation record
-            participation = WarParticipation(
-                war_id=war.id,
-                user_id=user_id,
-                kingdom=user.kingdom.value,
-                role='defender'
-            )
-            
-            # Store player stats
-            player_stats = {
-                'strength': user.strength,
-                'armor': user.armor,
-                'hp': user.hp,
-                'agility': user.agility,
-                'mana': user.mana,
-                'level': user.level
-            }
-            participation.set_player_stats(player_stats)
-            
-            session.add(participation)
-            await session.commit()
+            if not await self._register_participation(user, war_id, 'defender', session):
+                return False, "Вы уже заявлены на участие в войне королевств!"
             
             logger.info(f"User {user_id} joined enhanced defense of {user.kingdom.value}")
             return True, "Вы заявлены на защиту королевства! Дождитесь начала войны. Другие действия заблокированы."
     
-    async def _set_user_war_mode(self, user_id: int, war_id: int, role: str, session: AsyncSession):
-        """Set user in war mode (block other actions)"""
-        # This could be implemented as a separate table or user field
-        # For now, we'll use the participation record as the indicator
-        pass
+    async def _find_scheduled_war_id(self, defending_kingdom: str, war_time: datetime, session: AsyncSession) -> Optional[int]:
+        """Find scheduled war id for a kingdom and time"""
+        return await session.scalar(
+            select(KingdomWar.id).where(
+                and_(
+                    KingdomWar.defending_kingdom == defending_kingdom,
+                    KingdomWar.scheduled_time == war_time,
+                    KingdomWar.status == WarStatusEnum.scheduled
+                )
+            )
+        )
+    
+    async def _register_participation(self, user: User, war_id: int, role: str, session: AsyncSession) -> bool:
+        """Atomically register user for a war with a single INSERT ... SELECT
+        
+        The row is only inserted while the war is still scheduled and the user has no
+        other pending participation, so concurrent registrations can neither be lost
+        nor duplicated. Returns False if nothing was inserted.
+        """
+        # Store player stats
+        player_stats = {
+            **user.effective_stats._asdict(),  # Including equipment bonuses
+            'level': user.level
+        }
+        
+        already_registered = exists().where(
+            and_(
+                WarParticipation.user_id == user.id,
+                WarParticipation.war_id.in_(
+                    select(KingdomWar.id).where(KingdomWar.status == WarStatusEnum.scheduled)
+                )
+            )
+        )
+        
+        result = await session.execute(
+            insert(WarParticipation).from_select(
+                ['war_id', 'user_id', 'kingdom', 'role', 'player_stats'],
+                select(
+                    KingdomWar.id,
+                    literal(user.id),
+                    literal(user.kingdom.value),
+                    literal(role, WarParticipation.role.type),
+                    literal(json.dumps(player_stats))
+                ).where(
+                    and_(
+                        KingdomWar.id == war_id,
+                        KingdomWar.status == WarStatusEnum.scheduled,
+                        ~already_registered
+                    )
+                )
+            )
+        )
+        await session.commit()
+        
+        return result.rowcount > 0
+    
+    async def _load_squads(self, war: KingdomWar, session: AsyncSession):
+        """Build squad lists on the war row from its participation records"""
+        participations = await session.execute(
+            select(WarParticipation.user_id, WarParticipation.kingdom, WarParticipation.role)
+            .where(WarParticipation.war_id == war.id)
+            .order_by(WarParticipation.id)
+        )
+        
+        attack_squads = {}
+        attacking_kingdoms = []
+        defense_squad = []
+        
+        for user_id, kingdom, role in participations:
+            if role.name == 'attacker':
+                if kingdom not in attack_squads:
+                    attack_squads[kingdom] = []
+                    attacking_kingdoms.append(kingdom)
+                attack_squads[kingdom].append(user_id)
+            else:
+                defense_squad.append(user_id)
+        
+        war.set_attack_squads(attack_squads)
+        war.set_attacking_kingdoms(attacking_kingdoms)
+        war.set_defense_squad(defense_squad)
     
     async def _is_user_in_war_mode(self, user_id: int, session: AsyncSession) -> bool:
         """Check if user is currently in war mode"""
@@ -220,6 +208,8 @@ class EnhancedKingdomWarService:
             if not war or war.status != WarStatusEnum.scheduled:
                 return False
             
+            await self._load_squads(war, session)
+            
             attacking_kingdoms = war.get_attacking_kingdoms()
             defense_squad = war.get_defense_squad()
             
@@ -241,11 +231,7 @@ class EnhancedKingdomWarService:
             await self._calculate_enhanced_kingdom_stats(war, session)
             
             # Calculate defense buff
-            num_attacking = len(attacking_kingdoms)
-            if num_attacking > 1:
-                war.defense_buff = 1.3  # 30% defense buff
-            else:
-                war.defense_buff = 1.0
+            war.defense_buff = WarRules.defense_buff(len(attacking_kingdoms))
             
             await session.commit()
             
@@ -288,11 +274,7 @@ class EnhancedKingdomWarService:
             )
             
             player_stats = {
-                'strength': player.strength,
-                'armor': player.armor,
-                'hp': player.hp,
-                'agility': player.agility,
-                'mana': player.mana,
+                **player.effective_stats._asdict(),  # Including equipment bonuses
                 'level': player.level
             }
             participation.set_player_stats(player_stats)
@@ -377,71 +359,19 @@ class EnhancedKingdomWarService:
         attack_stats = war.get_total_attack_stats()
         defense_stats = war.get_defense_stats()
         
-        # Sort attacking kingdoms by total stats (weakest first)
-        sorted_attackers = sorted(
-            attack_stats.items(),
-            key=lambda x: x[1]['total_strength'] + x[1]['total_armor'] + x[1]['total_agility']
+        battle_results, winners = WarRules.resolve_battles(
+            war.defending_kingdom, attack_stats, defense_stats, war.defense_buff
         )
         
-        # Apply defense buff
-        buffed_defense_stats = defense_stats.copy()
-        buffed_defense_stats['total_armor'] = int(defense_stats['total_armor'] * war.defense_buff)
-        
         money_transfers = {}
-        battle_results = []
-        current_defense_hp = buffed_defense_stats['total_hp']
         successful_attacker = None
         
-        # Process attacks in order (weakest to strongest)
-        for kingdom, kingdom_stats in sorted_attackers:
-            if current_defense_hp <= 0:
-                # Defense already broken, this kingdom gets nothing
-                battle_results.append({
-                    'attacker': kingdom,
-                    'defender': war.defending_kingdom,
-                    'result': 'too_late',
-                    'message': f'{kingdom} опоздало - город уже разграблен!'
-                })
-                continue
+        for kingdom in winners:
+            successful_attacker = kingdom
             
-            # Calculate battle outcome
-            attack_power = kingdom_stats['total_strength'] + kingdom_stats['total_agility']
-            defense_power = buffed_defense_stats['total_strength'] + buffed_defense_stats['total_agility']
-            
-            # Enhanced damage calculation
-            damage_to_defense = max(attack_power - buffed_defense_stats['total_armor'], attack_power * 0.1)
-            damage_to_attacker = max(defense_power - kingdom_stats['total_armor'], defense_power * 0.1)
-            
-            current_defense_hp -= damage_to_defense
-            
-            if current_defense_hp <= 0:
-                # Attacker breaks through defense
-                successful_attacker = kingdom
-                battle_results.append({
-                    'attacker': kingdom,
-                    'defender': war.defending_kingdom,
-                    'result': 'victory',
-                    'damage_dealt': damage_to_defense,
-                    'message': f'{kingdom} сломало защиту {war.defending_kingdom}!'
-                })
-                
-                # Calculate money transfer (40% of defenders' money)
-                money_to_transfer = await self._calculate_enhanced_money_transfer(war, kingdom, session)
-                money_transfers[kingdom] = money_to_transfer
-                
-            else:
-                # Defense holds
-                battle_results.append({
-                    'attacker': kingdom,
-                    'defender': war.defending_kingdom,
-                    'result': 'defeat',
-                    'damage_dealt': damage_to_defense,
-                    'damage_received': damage_to_attacker,
-                    'message': f'{kingdom} не смогло сломать защиту {war.defending_kingdom}'
-                })
-            
-            # Restore defense HP to full for next wave
-            current_defense_hp = buffed_defense_stats['total_hp']
+            # Calculate money transfer (40% of defenders' money)
+            money_to_transfer = await self._calculate_enhanced_money_transfer(war, kingdom, session)
+            money_transfers[kingdom] = money_to_transfer
         
         # Apply enhanced penalties and rewards
         await self._apply_enhanced_war_consequences(war, successful_attacker, session)
@@ -473,8 +403,9 @@ class EnhancedKingdomWarService:
         total_money_taken = 0
         
         for user in defending_players.scalars():
-            money_lost = int(user.money * 0.4)
+            money_lost = int(user.money * WarRules.MONEY_LOSS_RATE)
             user.money = max(0, user.money - money_lost)
+            money_ledger.add(session, user.id, -money_lost, LedgerReasonEnum.war_loss, war.id)
             total_money_taken += money_lost
             
             # Mark money loss in participation if exists
@@ -505,8 +436,9 @@ class EnhancedKingdomWarService:
             for user in all_defenders.scalars():
                 if user.id not in defense_squad:
                     # Non-participant penalty: additional 40% loss (total 80% loss)
-                    additional_penalty = int(user.money * 0.4)
+                    additional_penalty = int(user.money * WarRules.NON_PARTICIPANT_PENALTY_RATE)
                     user.money = max(0, user.money - additional_penalty)
+                    money_ledger.add(session, user.id, -additional_penalty, LedgerReasonEnum.war_penalty, war.id)
                     logger.info(f"Non-participant penalty applied to user {user.id}: -{additional_penalty}")
     
     async def _apply_enhanced_war_rewards(self, war: KingdomWar, session: AsyncSession):
@@ -515,6 +447,8 @@ class EnhancedKingdomWarService:
         attack_stats = war.get_total_attack_stats()
         
         exp_distribution = {}
+        rewarded_users = []
+        rewarded_exp = []
         
         for kingdom, money_gained in money_transfers.items():
             if kingdom not in attack_stats:
@@ -527,45 +461,46 @@ class EnhancedKingdomWarService:
                 continue
             
             # Calculate total stats for distribution
-            total_kingdom_stats = (kingdom_stats['total_strength'] + 
-                                 kingdom_stats['total_armor'] + 
-                                 kingdom_stats['total_agility'])
+            total_kingdom_stats = WarRules.squad_power(kingdom_stats)
             
-            # Distribute money and exp based on individual stats
-            for user_id in squad:
-                participation = await session.scalar(
-                    select(WarParticipation).where(
-                        and_(
-                            WarParticipation.war_id == war.id,
-                            WarParticipation.user_id == user_id,
-                            WarParticipation.role == 'attacker'
-                        )
+            # Participations and players of the squad in two queries
+            participations = await session.scalars(
+                select(WarParticipation).where(
+                    and_(
+                        WarParticipation.war_id == war.id,
+                        WarParticipation.user_id.in_(squad),
+                        WarParticipation.role == 'attacker'
                     )
                 )
-                
+            )
+            participations = {participation.user_id: participation for participation in participations}
+            users = await session.scalars(select(User).where(User.id.in_(list(participations))))
+            users = {user.id: user for user in users}
+            
+            # Distribute money and exp based on individual stats
+            for user_id in squad:
+                participation = participations.get(user_id)
                 if not participation:
                     continue
                 
                 user_stats = participation.get_player_stats()
-                user_total_stats = (user_stats['strength'] + 
-                                   user_stats['armor'] + 
-                                   user_stats['agility'])
                 
                 # Calculate share based on stats
-                if total_kingdom_stats > 0:
-                    share = user_total_stats / total_kingdom_stats
-                else:
-                    share = 1.0 / len(squad)
+                share = WarRules.reward_share(
+                    WarRules.player_power(user_stats), total_kingdom_stats, len(squad)
+                )
                 
                 # Calculate enhanced rewards
                 money_reward = int(money_gained * share)
-                exp_reward = int(75 * share * user_stats['level'])  # Increased base exp
+                exp_reward = WarRules.war_experience(share, user_stats['level'])
                 
                 # Apply rewards to user
-                user = await session.get(User, user_id)
+                user = users.get(user_id)
                 if user:
                     user.money += money_reward
-                    await self.user_service.add_experience(user_id, exp_reward)
+                    money_ledger.add(session, user.id, money_reward, LedgerReasonEnum.war_reward, war.id)
+                    rewarded_users.append(user)
+                    rewarded_exp.append(exp_reward)
                 
                 # Store in participation record
                 participation.money_gained = money_reward
@@ -573,6 +508,9 @@ class EnhancedKingdomWarService:
                 
                 exp_distribution[str(user_id)] = exp_reward
         
+        # Level ups of all attackers resolved in one batch, inside the war session
+        UserService.apply_experience(rewarded_users, rewarded_exp)
+        
         war.set_exp_distributed(exp_distribution)
     
     async def _release_war_participants(self, war: KingdomWar, session: AsyncSession):
@@ -587,6 +525,89 @@ class EnhancedKingdomWarService:
         # For now, we'll just log it
         logger.info(f"War {war.id} participants will be restored in 5 minutes")
     
+    async def restore_war_participants(self) -> int:
+        """Restore HP/MP of participants of finished wars not restored yet, returns restored count"""
+        async with AsyncSessionLocal() as session:
+            # By state rather than by time: a war resolved late by a misfired run is still found
+            finished_war_ids = (await session.scalars(
+                select(KingdomWar.id).where(
+                    and_(
+                        KingdomWar.status == WarStatusEnum.finished,
+                        KingdomWar.participants_restored == False
+                    )
+                )
+            )).all()
+            if not finished_war_ids:
+                return 0
+            
+            participant_ids = select(WarParticipation.user_id).where(
+                WarParticipation.war_id.in_(finished_war_ids)
+            )
+            
+            # Single UPDATE; users already at full HP/MP are skipped
+            restored_ids = (await session.scalars(
+                update(User).where(
+                    and_(
+                        User.id.in_(participant_ids),
+                        or_(User.current_hp != User.max_hp, User.current_mana != User.max_mana)
+                    )
+                ).values(current_hp=User.max_hp, current_mana=User.max_mana)
+                .returning(User.id)
+                .execution_options(synchronize_session=False)
+            )).all()
+            await session.execute(
+                update(KingdomWar).where(KingdomWar.id.in_(finished_war_ids))
+                .values(participants_restored=True)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        
+        await opponent_index.refresh_players(restored_ids)
+        return len(restored_ids)
+    
+    async def cancel_overdue_wars(self, overdue_before: datetime) -> int:
+        """Cancel wars still scheduled before the given UTC time, returns cancelled count.
+        
+        Cancelled wars were never fought: they are left out of war results and
+        their participants were never damaged, so nothing is restored.
+        """
+        async with AsyncSessionLocal() as session:
+            # Releases the war mode block of registered players, like a finished war
+            result = await session.execute(
+                update(KingdomWar).where(
+                    and_(
+                        KingdomWar.status == WarStatusEnum.scheduled,
+                        KingdomWar.scheduled_time < overdue_before
+                    )
+                ).values(status=WarStatusEnum.cancelled, finished_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+    
+            return result.rowcount
+    
+    async def resume_interrupted_wars(self, started_before: datetime) -> List[int]:
+        """Resolve wars left active since before the given UTC time, returns their ids.
+        
+        A war is committed as active with its squads and stats before its
+        battles are resolved, so a crash in between leaves everything needed
+        to resolve it again.
+        """
+        async with AsyncSessionLocal() as session:
+            wars = (await session.scalars(
+                select(KingdomWar).where(
+                    and_(
+                        KingdomWar.status == WarStatusEnum.active,
+                        KingdomWar.started_at < started_before
+                    )
+                )
+            )).all()
+            
+            for war in wars:
+                await self._process_enhanced_war_battles(war, session)
+            
+            return [war.id for war in wars]
+    
     async def get_enhanced_user_war_results(self, user_id: int, war_id: int) -> Optional[Dict]:
         """Get enhanced war results for specific user"""
         async with AsyncSessionLocal() as session:
@@ -620,6 +641,18 @@ class EnhancedKingdomWarService:
                 'defense_buff_applied': war.defense_buff > 1.0
             }
     
+    async def get_war_participations(self, war_ids: List[int]) -> List[WarParticipation]:
+        """Get all participations of the given wars in one query"""
+        if not war_ids:
+            return []
+        
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(WarParticipation).where(WarParticipation.war_id.in_(war_ids))
+                .order_by(WarParticipation.war_id, WarParticipation.id)
+            )
+            return result.scalars().all()
+    
     async def get_war_summary_for_channel(self, war_ids: List[int]) -> str:
         """Generate war summary for war channel"""
         async with AsyncSessionLocal() as session:
@@ -4,6 +4,8 @@ from config.database import AsyncSessionLocal
 from models.interactive_battle import InteractiveBattle, BattleModeEnum, BattlePhaseEnum
 from models.user import User
 from models.skill import UserSkill, SkillTypeEnum
+from models.ledger import LedgerReasonEnum
+from services.ledger_service import money_ledger
 from utils.formulas import GameFormulas
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Tuple, List
@@ -28,7 +30,7 @@ class EnhancedPvPService:
                 return None
             
             # Check HP requirements
-            if challenger.current_hp < challenger.hp * 0.3 or defender.current_hp < defender.hp * 0.3:
+            if challenger.current_hp < challenger.max_hp * 0.3 or defender.current_hp < defender.max_hp * 0.3:
                 return None
             
             # Create interactive battle
@@ -215,7 +217,7 @@ class EnhancedPvPService:
             
             should_use = False
             
-            if skill.skill_type == SkillTypeEnum.heal and current_hp < player.hp * 0.5:
+            if skill.skill_type == SkillTypeEnum.heal and current_hp < player.max_hp * 0.5:
                 should_use = True
             elif skill.skill_type == SkillTypeEnum.buff and battle.current_round <= 2:
                 should_use = True
@@ -234,7 +236,7 @@ class EnhancedPvPService:
                 if skill.skill_type == SkillTypeEnum.heal:
                     heal_amount = skill.heal_amount
                     old_hp = current_hp
-                    current_hp = min(current_hp + heal_amount, player.hp)
+                    current_hp = min(current_hp + heal_amount, player.max_hp)
                     actual_heal = current_hp - old_hp
                     
                     if player_key == 'player1':
@@ -274,7 +276,7 @@ class EnhancedPvPService:
         
         if direction_hit and random.random() < hit_chance:
             # Calculate damage
-            base_damage = attacker.strength + int(attacker.agility * 0.5)
+            base_damage = attacker.effective_stats.strength + int(attacker.effective_stats.agility * 0.5)
             
             # Apply attack type modifiers
             if attack_type == 'power':
@@ -282,11 +284,11 @@ class EnhancedPvPService:
             elif attack_type == 'precise':
                 base_damage = int(base_damage * 1.1)
             
-            defense = int(defender.armor * 0.8)
+            defense = int(defender.effective_stats.armor * 0.8)
             damage = max(base_damage - defense, int(base_damage * 0.1))
             
             # Check for critical hit
-            crit_chance = GameFormulas.critical_hit_chance(attacker.agility)
+            crit_chance = GameFormulas.critical_hit_chance(attacker.effective_stats.agility)
             if attack_type == 'precise':
                 crit_chance *= 1.5
             
@@ -295,7 +297,7 @@ class EnhancedPvPService:
                 result['events'].append(f"🔥 Критический {attack_type} удар!")
             
             # Check for perfect dodge (defender's last chance)
-            perfect_dodge_chance = min(defender.agility / 500.0, 0.07)
+            perfect_dodge_chance = min(defender.effective_stats.agility / 500.0, 0.07)
             if random.random() < perfect_dodge_chance:
                 damage = 0
                 result['events'].append("💨 Мастерское уклонение!")
@@ -305,7 +307,7 @@ class EnhancedPvPService:
         
         else:
             # Missed, check for glancing hit
-            if GameFormulas.is_critical_hit(attacker.agility) and random.random() < 0.15:
+            if GameFormulas.is_critical_hit(attacker.effective_stats.agility) and random.random() < 0.15:
                 result['damage'] = 2
                 result['events'].append("✨ Промах, но мастерство позволило нанести 2 урона!")
             else:
@@ -331,18 +333,18 @@ class EnhancedPvPService:
         
         # Calculate rewards
         winner_stats = {
-            'strength': winner.strength,
-            'armor': winner.armor,
-            'agility': winner.agility,
-            'hp': winner.hp,
-            'mana': winner.mana
+            'strength': winner.effective_stats.strength,
+            'armor': winner.effective_stats.armor,
+            'agility': winner.effective_stats.agility,
+            'hp': winner.max_hp,
+            'mana': winner.max_mana
         }
         loser_stats = {
-            'strength': loser.strength,
-            'armor': loser.armor,
-            'agility': loser.agility,
-            'hp': loser.hp,
-            'mana': loser.mana
+            'strength': loser.effective_stats.strength,
+            'armor': loser.effective_stats.armor,
+            'agility': loser.effective_stats.agility,
+            'hp': loser.max_hp,
+            'mana': loser.max_mana
         }
         
         rewards = GameFormulas.calculate_battle_rewards(winner_stats, loser_stats)
@@ -351,6 +353,7 @@ class EnhancedPvPService:
         
         # Update player stats
         winner.money += battle.money_gained
+        money_ledger.add(session, winner.id, battle.money_gained, LedgerReasonEnum.pvp_reward, battle.id)
         if winner.id == player1.id:
             player1.current_hp = battle.player1_hp
             player1.current_mana = battle.player1_mana
@@ -407,6 +410,7 @@ class EnhancedPvPService:
         battle.money_gained = 5
         
         winner.money += battle.money_gained
+        money_ledger.add(session, winner.id, battle.money_gained, LedgerReasonEnum.pvp_reward, battle.id)
         
         # Update stats
         if winner.id == player1.id:
@@ -0,0 +1,225 @@
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from config.database import AsyncSessionLocal
+from config.settings import settings
+from models.fsm import FSMRecord
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _Entry:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    updated_at: Optional[datetime] = None  # Last write, what the TTL counts from
+    used_at: float = 0.0  # Last read or write (monotonic), what cache eviction counts from
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage in the game database with a write-back cache.
+
+    Reads and writes go to an in-memory cache; a key is loaded from the
+    `fsm_states` table on its first use. Changed keys are written by a
+    background task in batches, so a dialog step never waits for the disk
+    and survives a restart once flushed (at most FLUSH_INTERVAL is lost on a
+    crash). States left untouched for FSM_STATE_TTL are treated as abandoned:
+    they read as empty and their rows are deleted.
+    """
+
+    BATCH_SIZE = 200  # Flush as soon as this many keys are changed
+    FLUSH_INTERVAL = 1.0  # ...or at least this often (seconds)
+    PURGE_INTERVAL = 600  # Seconds between deletions of abandoned rows
+
+    def __init__(self, state_ttl: int = None, cache_idle: int = None,
+                 batch_size: int = None, flush_interval: float = None):
+        self.state_ttl = timedelta(seconds=state_ttl or settings.FSM_STATE_TTL)
+        self.cache_idle = cache_idle or settings.FSM_CACHE_IDLE
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.flush_interval = flush_interval or self.FLUSH_INTERVAL
+
+        self._cache: Dict[StorageKey, _Entry] = {}
+        self._dirty: Set[StorageKey] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._running = False
+        self._last_purge = time.monotonic()
+
+        # Metrics
+        self.hits = 0
+        self.loads = 0
+        self.written = 0
+        self.deleted = 0
+        self.flushes = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._dirty)
+
+    @staticmethod
+    def _db_key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+    def _expired(self, updated_at: Optional[datetime]) -> bool:
+        return updated_at is not None and datetime.utcnow() - updated_at > self.state_ttl
+
+    async def _entry(self, key: StorageKey) -> _Entry:
+        entry = self._cache.get(key)
+        if entry is None:
+            entry = await self._load(key)
+        else:
+            self.hits += 1
+        if not entry.empty and self._expired(entry.updated_at):
+            entry.state, entry.data = None, {}
+        entry.used_at = time.monotonic()
+        return entry
+
+    async def _load(self, key: StorageKey) -> _Entry:
+        """Read a key from the table; missing keys are cached too, as empty entries"""
+        self.loads += 1
+        async with AsyncSessionLocal() as session:
+            row = (await session.execute(
+                select(FSMRecord.state, FSMRecord.data, FSMRecord.updated_at)
+                .where(FSMRecord.key == self._db_key(key))
+            )).first()
+
+        loaded = _Entry()
+        if row is not None:
+            loaded = _Entry(state=row.state, data=json.loads(row.data), updated_at=row.updated_at)
+        # A write made while the row was being read wins over the row
+        return self._cache.setdefault(key, loaded)
+
+    def _changed(self, key: StorageKey):
+        self._dirty.add(key)
+        self._ensure_worker()
+        if len(self._dirty) >= self.batch_size:
+            self._wakeup.set()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        entry.updated_at = datetime.utcnow()
+        self._changed(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._entry(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        entry = await self._entry(key)
+        entry.data = data.copy()
+        entry.updated_at = datetime.utcnow()
+        self._changed(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._entry(key)).data.copy()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            self._wakeup = asyncio.Event()
+            self._running = True
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            self._evict_idle()
+            if time.monotonic() - self._last_purge >= self.PURGE_INTERVAL:
+                await self.purge_expired()
+
+    async def flush(self) -> int:
+        """Write the changed keys in one transaction, returns how many were written"""
+        if not self._dirty:
+            return 0
+
+        keys, self._dirty = self._dirty, set()
+        upserts: List[dict] = []
+        removals: List[str] = []
+        for key in keys:
+            entry = self._cache[key]
+            if entry.empty:
+                removals.append(self._db_key(key))
+            else:
+                upserts.append({
+                    'key': self._db_key(key),
+                    'state': entry.state,
+                    'data': json.dumps(entry.data, ensure_ascii=False),
+                    'updated_at': entry.updated_at
+                })
+
+        try:
+            async with AsyncSessionLocal() as session:
+                if upserts:
+                    query = sqlite_insert(FSMRecord)
+                    await session.execute(
+                        query.on_conflict_do_update(
+                            index_elements=[FSMRecord.key],
+                            set_={
+                                'state': query.excluded.state,
+                                'data': query.excluded.data,
+                                'updated_at': query.excluded.updated_at
+                            }
+                        ),
+                        upserts
+                    )
+                if removals:
+                    await session.execute(delete(FSMRecord).where(FSMRecord.key.in_(removals)))
+                await session.commit()
+        except Exception as e:
+            # Keys changed again meanwhile are already dirty; the rest retry on the next flush
+            self._dirty |= keys
+            logger.error(f"Error writing {len(keys)} FSM states: {e}")
+            return 0
+
+        self.written += len(keys)
+        self.flushes += 1
+        return len(keys)
+
+    def _evict_idle(self):
+        """Drop unchanged keys nobody used for cache_idle seconds; they reload from the table"""
+        cutoff = time.monotonic() - self.cache_idle
+        idle = [key for key, entry in self._cache.items() if entry.used_at < cutoff and key not in self._dirty]
+        for key in idle:
+            del self._cache[key]
+
+    async def purge_expired(self) -> int:
+        """Delete rows of abandoned states, returns how many were deleted"""
+        self._last_purge = time.monotonic()
+        cutoff = datetime.utcnow() - self.state_ttl
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(delete(FSMRecord).where(FSMRecord.updated_at < cutoff))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Error deleting abandoned FSM states: {e}")
+            return 0
+
+        self.deleted += result.rowcount
+        return result.rowcount
+
+    async def close(self) -> None:
+        """Stop the flusher and write what is left"""
+        self._running = False
+        if self._worker:
+            self._wakeup.set()
+            await self._worker
+            self._worker = None
+        await self.flush()
+        logger.info(f"FSM storage closed: {self.written} writes in {self.flushes} batches")
+
+# Глобальное хранилище состояний FSM
+fsm_storage = SQLiteStorage()
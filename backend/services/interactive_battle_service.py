@@ -4,6 +4,8 @@ from config.database import AsyncSessionLocal
 from models.interactive_battle import InteractiveBattle, BattleModeEnum, BattlePhaseEnum
 from models.monster import Monster
 from models.user import User
+from models.ledger import LedgerReasonEnum
+from services.ledger_service import money_ledger
 from utils.formulas import GameFormulas
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Tuple
@@ -26,7 +28,7 @@ class InteractiveBattleService:
                 return None
             
             # Check if player has enough HP
-            if player.current_hp < player.hp * 0.3:
+            if player.current_hp < player.max_hp * 0.3:
                 return None
             
             # Generate random monster
@@ -172,19 +174,19 @@ class InteractiveBattleService:
         player_damage = 0
         if battle.player1_attack_choice == monster_dodge:
             # Direct hit
-            base_damage = player.strength + int(player.agility * 0.5)
+            base_damage = player.effective_stats.strength + int(player.effective_stats.agility * 0.5)
             defense = int(monster_data['armor'] * 0.8)
             player_damage = max(base_damage - defense, int(base_damage * 0.1))
             
             # Check for critical hit
-            if GameFormulas.is_critical_hit(player.agility):
+            if GameFormulas.is_critical_hit(player.effective_stats.agility):
                 player_damage = int(player_damage * 1.5)
                 round_log['events'].append("🔥 Критический удар игрока!")
             
             round_log['events'].append(f"⚔️ Игрок нанёс {player_damage} урона")
         else:
             # Missed, but check for crit chance to still hit
-            if GameFormulas.is_critical_hit(player.agility):
+            if GameFormulas.is_critical_hit(player.effective_stats.agility):
                 player_damage = 2  # Minimal damage from crit
                 round_log['events'].append("✨ Промах, но критический навык позволил нанести 2 урона!")
             else:
@@ -203,11 +205,11 @@ class InteractiveBattleService:
         if monster_attack == battle.player1_dodge_choice:
             # Monster hit
             base_damage = monster_data['strength'] + int(monster_data['agility'] * 0.5)
-            defense = int(player.armor * 0.8)
+            defense = int(player.effective_stats.armor * 0.8)
             monster_damage = max(base_damage - defense, int(base_damage * 0.1))
             
             # Check if player can dodge with agility
-            if GameFormulas.is_dodge(player.agility):
+            if GameFormulas.is_dodge(player.effective_stats.agility):
                 monster_damage = 0
                 round_log['events'].append("💨 Игрок уклонился от атаки!")
             else:
@@ -272,6 +274,7 @@ class InteractiveBattleService:
         # Update player stats
         player.current_hp = battle.player1_hp
         player.money += battle.money_gained
+        money_ledger.add(session, player.id, battle.money_gained, LedgerReasonEnum.pve_reward, battle.id)
         player.pve_wins += 1
         
         # Add experience
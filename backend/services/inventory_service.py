@@ -1,44 +1,138 @@
 from sqlalchemy import select, and_, update, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, contains_eager
 from config.database import AsyncSessionLocal
 from models.item import Item, UserItem, ItemTypeEnum
-from models.user import User
+from models.user import User, StatBlock
+from services.shop_catalog import shop_catalog, CatalogItem
+from models.ledger import LedgerReasonEnum
+from services.ledger_service import money_ledger
+from services.leaderboard_service import leaderboards
+from services.opponent_index import opponent_index
+from dataclasses import dataclass
+from datetime import datetime
 from typing import List, Optional, Dict
 import logging
 
 logger = logging.getLogger(__name__)
 
+SELL_PRICE_RATE = 0.5
+INVENTORY_PAGE_SIZE = 10
+
+# Inventory category views: which entries each one shows
+INVENTORY_CATEGORIES = {
+    'weapons': and_(Item.item_type == ItemTypeEnum.weapon, UserItem.is_equipped == False),
+    'armor': and_(Item.item_type == ItemTypeEnum.armor, UserItem.is_equipped == False),
+    'consumables': Item.item_type == ItemTypeEnum.consumable,
+    'other': and_(
+        Item.item_type.notin_([ItemTypeEnum.weapon, ItemTypeEnum.armor, ItemTypeEnum.consumable]),
+        UserItem.is_equipped == False
+    ),
+    'equipped': UserItem.is_equipped == True
+}
+
+@dataclass(frozen=True)
+class InventoryItem:
+    """Detached inventory entry with its item data, safe to use after the session is closed"""
+    id: int
+    user_id: int
+    item_id: int
+    quantity: int
+    is_equipped: bool
+    current_durability: int
+    obtained_at: Optional[datetime]
+    item: CatalogItem
+    
+    @classmethod
+    def from_user_item(cls, user_item: UserItem) -> 'InventoryItem':
+        return cls(
+            id=user_item.id,
+            user_id=user_item.user_id,
+            item_id=user_item.item_id,
+            quantity=user_item.quantity,
+            is_equipped=user_item.is_equipped,
+            current_durability=user_item.current_durability,
+            obtained_at=user_item.obtained_at,
+            item=CatalogItem.from_item(user_item.item)
+        )
+
+@dataclass(frozen=True)
+class InventoryPage:
+    """One page of an inventory category, newest entries first"""
+    items: List[InventoryItem]
+    has_prev: bool
+    has_next: bool
+    
+    @property
+    def first_id(self) -> Optional[int]:
+        return self.items[0].id if self.items else None
+    
+    @property
+    def last_id(self) -> Optional[int]:
+        return self.items[-1].id if self.items else None
+
 class InventoryService:
     def __init__(self):
         pass
     
-    async def get_user_inventory(self, user_id: int) -> List[UserItem]:
-        """Get user's inventory"""
+    async def get_user_inventory(self, user_id: int) -> List[InventoryItem]:
+        """Get user's inventory with item data in a single query"""
         async with AsyncSessionLocal() as session:
             result = await session.execute(
-                select(UserItem).where(UserItem.user_id == user_id)
+                select(UserItem).options(joinedload(UserItem.item))
+                .where(UserItem.user_id == user_id)
                 .order_by(UserItem.is_equipped.desc(), UserItem.obtained_at.desc())
             )
-            return result.scalars().all()
+            return [InventoryItem.from_user_item(user_item) for user_item in result.scalars()]
     
-    async def get_equipped_items(self, user_id: int) -> Dict[str, UserItem]:
+    async def get_category_page(self, user_id: int, category: str, after_id: int = None,
+                                before_id: int = None, page_size: int = INVENTORY_PAGE_SIZE) -> InventoryPage:
+        """Page of a category in one query: entries older than after_id, or newer than before_id"""
+        condition = INVENTORY_CATEGORIES.get(category)
+        if condition is None:
+            return InventoryPage(items=[], has_prev=False, has_next=False)
+        
+        query = (
+            select(UserItem).join(UserItem.item).options(contains_eager(UserItem.item))
+            .where(and_(UserItem.user_id == user_id, condition))
+        )
+        
+        # Keyset pagination on id: the page never scans the entries before it
+        backwards = before_id is not None
+        if backwards:
+            query = query.where(UserItem.id > before_id).order_by(UserItem.id.asc())
+        else:
+            if after_id is not None:
+                query = query.where(UserItem.id < after_id)
+            query = query.order_by(UserItem.id.desc())
+        
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(query.limit(page_size + 1))
+            entries = [InventoryItem.from_user_item(user_item) for user_item in result.scalars()]
+        
+        has_more = len(entries) > page_size
+        entries = entries[:page_size]
+        if backwards:
+            entries.reverse()
+            return InventoryPage(items=entries, has_prev=has_more, has_next=True)
+        return InventoryPage(items=entries, has_prev=after_id is not None, has_next=has_more)
+    
+    async def get_equipped_items(self, user_id: int) -> Dict[str, InventoryItem]:
         """Get equipped items by type"""
         async with AsyncSessionLocal() as session:
             result = await session.execute(
-                select(UserItem).where(
+                select(UserItem).options(joinedload(UserItem.item)).where(
                     and_(
                         UserItem.user_id == user_id,
                         UserItem.is_equipped == True
                     )
                 )
             )
-            equipped_items = result.scalars().all()
             
             # Group by item type
             equipped_by_type = {}
-            for user_item in equipped_items:
-                await session.refresh(user_item, ['item'])
-                equipped_by_type[user_item.item.item_type.value] = user_item
+            for user_item in result.scalars():
+                equipped_by_type[user_item.item.item_type.value] = InventoryItem.from_user_item(user_item)
             
             return equipped_by_type
     
@@ -46,11 +140,10 @@ class InventoryService:
         """Equip an item"""
         async with AsyncSessionLocal() as session:
             # Get the item to equip
-            user_item = await session.get(UserItem, user_item_id)
+            user_item = await session.get(UserItem, user_item_id, options=[joinedload(UserItem.item)])
             if not user_item or user_item.user_id != user_id:
                 return False, "Предмет не найден"
             
-            await session.refresh(user_item, ['item'])
             item = user_item.item
             
             # Check if item can be equipped
@@ -62,26 +155,48 @@ class InventoryService:
             if user.level < item.level_required:
                 return False, f"Требуемый уровень: {item.level_required}"
             
+            # Equip only if not equipped yet, so a double click cannot add the bonuses twice
+            result = await session.execute(
+                update(UserItem).where(
+                    and_(
+                        UserItem.id == user_item_id,
+                        UserItem.is_equipped == False
+                    )
+                ).values(is_equipped=True)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                return False, "Предмет уже экипирован"
+            
             # Unequip existing item of the same type
-            await session.execute(
+            replaced_item_ids = (await session.execute(
                 update(UserItem).where(
                     and_(
                         UserItem.user_id == user_id,
                         UserItem.is_equipped == True,
-                        UserItem.id != user_item_id
+                        UserItem.id != user_item_id,
+                        UserItem.item_id.in_(select(Item.id).where(Item.item_type == item.item_type))
                     )
                 ).values(is_equipped=False)
-                .execution_options(synchronize_session="fetch")
-            )
+                .returning(UserItem.item_id)
+                .execution_options(synchronize_session=False)
+            )).scalars().all()
             
-            # Equip the new item
-            user_item.is_equipped = True
+            # Bonus change: the new item minus whatever it replaced
+            delta = self._item_bonus(item)
+            if replaced_item_ids:
+                replaced = await session.execute(select(Item).where(Item.id.in_(set(replaced_item_ids))))
+                replaced_by_id = {replaced_item.id: replaced_item for replaced_item in replaced.scalars()}
+                for item_id in replaced_item_ids:
+                    delta = StatBlock(*(a - b for a, b in zip(delta, self._item_bonus(replaced_by_id[item_id]))))
             
-            # Update user stats
-            await self._update_user_stats(user_id, session)
+            await self._apply_equipment_delta(user_id, delta, session)
             
             await session.commit()
             
+            # Power and max HP changed in a plain UPDATE
+            await opponent_index.refresh_players([user_id])
+            
             logger.info(f"User {user_id} equipped {item.name}")
             return True, f"Экипировано: {item.name}"
     
@@ -89,69 +204,136 @@ class InventoryService:
         """Unequip an item"""
         async with AsyncSessionLocal() as session:
             # Get the item to unequip
-            user_item = await session.get(UserItem, user_item_id)
+            user_item = await session.get(UserItem, user_item_id, options=[joinedload(UserItem.item)])
             if not user_item or user_item.user_id != user_id:
                 return False, "Предмет не найден"
             
             if not user_item.is_equipped:
                 return False, "Предмет не экипирован"
             
-            await session.refresh(user_item, ['item'])
             item = user_item.item
             
-            # Unequip the item
-            user_item.is_equipped = False
+            # Unequip the item (guarded against a concurrent unequip)
+            result = await session.execute(
+                update(UserItem).where(
+                    and_(
+                        UserItem.id == user_item_id,
+                        UserItem.is_equipped == True
+                    )
+                ).values(is_equipped=False)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                return False, "Предмет не экипирован"
             
-            # Update user stats
-            await self._update_user_stats(user_id, session)
+            await self._apply_equipment_delta(
+                user_id, StatBlock(*(-bonus for bonus in self._item_bonus(item))), session
+            )
             
             await session.commit()
             
+            await opponent_index.refresh_players([user_id])
+            
             logger.info(f"User {user_id} unequipped {item.name}")
             return True, f"Снято: {item.name}"
     
+    @staticmethod
+    def sell_price(item: CatalogItem, quantity: int = 1) -> int:
+        """Sell price (50% of buy price)"""
+        return int(item.price * SELL_PRICE_RATE * quantity)
+    
     async def sell_item(self, user_id: int, user_item_id: int, quantity: int = 1) -> tuple[bool, str]:
         """Sell an item"""
+        if quantity < 1:
+            return False, "Неверное количество"
+        
         async with AsyncSessionLocal() as session:
-            user_item = await session.get(UserItem, user_item_id)
-            if not user_item or user_item.user_id != user_id:
-                return False, "Предмет не найден"
-            
-            if user_item.is_equipped:
-                return False, "Нельзя продать экипированный предмет"
-            
-            if user_item.quantity < quantity:
-                return False, f"Недостаточно предметов. Есть: {user_item.quantity}"
-            
-            await session.refresh(user_item, ['item'])
-            item = user_item.item
-            
-            # Calculate sell price (50% of buy price)
-            sell_price = int(item.price * 0.5 * quantity)
-            
-            # Update user money
-            user = await session.get(User, user_id)
-            user.money += sell_price
-            
-            # Remove or reduce quantity
-            if user_item.quantity <= quantity:
-                await session.delete(user_item)
-            else:
-                user_item.quantity -= quantity
+            # Quantity is checked and taken in one guarded statement, so a double tap cannot sell twice
+            sold = (await session.execute(
+                update(UserItem)
+                .where(and_(
+                    UserItem.id == user_item_id,
+                    UserItem.user_id == user_id,
+                    UserItem.is_equipped == False,
+                    UserItem.quantity >= quantity
+                ))
+                .values(quantity=UserItem.quantity - quantity)
+                .returning(UserItem.item_id, UserItem.quantity)
+            )).first()
+            
+            if not sold:
+                await session.rollback()
+                return False, await self._sale_error(user_id, user_item_id, session)
+            
+            item_id, remaining = sold
+            if remaining == 0:
+                await session.execute(delete(UserItem).where(UserItem.id == user_item_id))
+            
+            item = (await shop_catalog.get()).get_item(item_id)
+            sell_price = self.sell_price(item, quantity)
+            money = await session.scalar(
+                update(User).where(User.id == user_id).values(money=User.money + sell_price).returning(User.money)
+            )
+            money_ledger.add(session, user_id, sell_price, LedgerReasonEnum.shop_sell, item_id)
             
             await session.commit()
+        
+        leaderboards.update_player(user_id, money=money)
+        
+        logger.info(f"User {user_id} sold {quantity}x {item.name} for {sell_price} gold")
+        return True, f"Продано: {quantity}x {item.name} за {sell_price} золота"
+    
+    async def sell_all(self, user_id: int, item_id: int) -> tuple[bool, str]:
+        """Sell every unequipped piece of an item"""
+        async with AsyncSessionLocal() as session:
+            quantities = (await session.scalars(
+                delete(UserItem)
+                .where(and_(
+                    UserItem.user_id == user_id,
+                    UserItem.item_id == item_id,
+                    UserItem.is_equipped == False
+                ))
+                .returning(UserItem.quantity)
+            )).all()
+            
+            if not quantities:
+                await session.rollback()
+                return False, "Нет предметов для продажи"
+            
+            quantity = sum(quantities)
+            item = (await shop_catalog.get()).get_item(item_id)
+            sell_price = self.sell_price(item, quantity)
+            money = await session.scalar(
+                update(User).where(User.id == user_id).values(money=User.money + sell_price).returning(User.money)
+            )
+            money_ledger.add(session, user_id, sell_price, LedgerReasonEnum.shop_sell, item_id)
             
-            logger.info(f"User {user_id} sold {quantity}x {item.name} for {sell_price} gold")
-            return True, f"Продано: {quantity}x {item.name} за {sell_price} золота"
+            await session.commit()
+        
+        leaderboards.update_player(user_id, money=money)
+        
+        logger.info(f"User {user_id} sold all {quantity}x {item.name} for {sell_price} gold")
+        return True, f"Продано: {quantity}x {item.name} за {sell_price} золота"
+    
+    @staticmethod
+    async def _sale_error(user_id: int, user_item_id: int, session: AsyncSession) -> str:
+        """Reason a guarded sale did not go through"""
+        user_item = await session.get(UserItem, user_item_id)
+        if not user_item or user_item.user_id != user_id:
+            return "Предмет не найден"
+        
+        if user_item.is_equipped:
+            return "Нельзя продать экипированный предмет"
+        
+        return f"Недостаточно предметов. Есть: {user_item.quantity}"
     
     async def use_item(self, user_id: int, user_item_id: int) -> tuple[bool, str]:
         """Use a consumable item"""
         async with AsyncSessionLocal() as session:
-            user_item = await session.get(UserItem, user_item_id)
+            user_item = await session.get(UserItem, user_item_id, options=[joinedload(UserItem.item)])
             if not user_item or user_item.user_id != user_id:
                 return False, "Предмет не найден"
             
-            await session.refresh(user_item, ['item'])
             item = user_item.item
             
             if item.item_type != ItemTypeEnum.consumable:
@@ -166,7 +348,7 @@ class InventoryService:
             if "зелье здоровья" in item.name.lower() or "health" in item.name.lower():
                 heal_amount = item.hp_bonus or 30
                 old_hp = user.current_hp
-                user.current_hp = min(user.current_hp + heal_amount, user.hp)
+                user.current_hp = min(user.current_hp + heal_amount, user.max_hp)
                 actual_heal = user.current_hp - old_hp
                 effect_text = f"Восстановлено {actual_heal} HP"
                 effect_applied = True
@@ -174,7 +356,7 @@ class InventoryService:
             elif "зелье маны" in item.name.lower() or "mana" in item.name.lower():
                 mana_amount = item.mana_bonus or 25
                 old_mana = user.current_mana
-                user.current_mana = min(user.current_mana + mana_amount, user.mana)
+                user.current_mana = min(user.current_mana + mana_amount, user.max_mana)
                 actual_mana = user.current_mana - old_mana
                 effect_text = f"Восстановлено {actual_mana} маны"
                 effect_applied = True
@@ -193,102 +375,54 @@ class InventoryService:
             logger.info(f"User {user_id} used {item.name}")
             return True, f"Использовано: {item.name}. {effect_text}"
     
-    async def _update_user_stats(self, user_id: int, session: AsyncSession):
-        """Update user stats based on equipped items"""
-        user = await session.get(User, user_id)
-        
-        # Get all equipped items
-        result = await session.execute(
-            select(UserItem).where(
-                and_(
-                    UserItem.user_id == user_id,
-                    UserItem.is_equipped == True
-                )
-            )
-        )
-        equipped_items = result.scalars().all()
-        
-        # Calculate total bonuses from equipped items
-        total_strength_bonus = 0
-        total_armor_bonus = 0
-        total_hp_bonus = 0
-        total_agility_bonus = 0
-        total_mana_bonus = 0
-        
-        for user_item in equipped_items:
-            await session.refresh(user_item, ['item'])
-            item = user_item.item
-            
-            total_strength_bonus += item.strength_bonus or 0
-            total_armor_bonus += item.armor_bonus or 0
-            total_hp_bonus += item.hp_bonus or 0
-            total_agility_bonus += item.agility_bonus or 0
-            total_mana_bonus += item.mana_bonus or 0
-        
-        # For now, we need to extend the User model to store base stats and equipment bonuses
-        # Since this is a complex change, let's implement a simple solution:
-        # We'll store the current total stats (base + equipment) in the existing fields
-        
-        # Get base stats from level and distributed points
-        from config.settings import GameConstants
-        from utils.formulas import GameFormulas
-        
-        base_stats = GameConstants.BASE_STATS.copy()
-        stat_points = GameFormulas.stat_points_for_level(user.level)
-        
-        # This is simplified - in a real system you'd track base stats separately
-        # For now, we just ensure minimum stats with equipment bonuses
-        min_strength = base_stats['strength'] + total_strength_bonus
-        min_armor = base_stats['armor'] + total_armor_bonus
-        min_hp = base_stats['hp'] + total_hp_bonus
-        min_agility = base_stats['agility'] + total_agility_bonus
-        min_mana = base_stats['mana'] + total_mana_bonus
+    @staticmethod
+    def _item_bonus(item: Item) -> StatBlock:
+        """Stat bonuses of an item"""
+        return StatBlock(*(getattr(item, f'{stat}_bonus') or 0 for stat in StatBlock._fields))
+    
+    async def _apply_equipment_delta(self, user_id: int, delta: StatBlock, session: AsyncSession):
+        """Add a change to the user's equipment bonus vector in one atomic UPDATE"""
+        values = {
+            f'{stat}_bonus': getattr(User, f'{stat}_bonus') + change
+            for stat, change in zip(StatBlock._fields, delta) if change
+        }
+        if not values:
+            return
         
-        # Apply bonuses if they would increase stats
-        if user.strength < min_strength:
-            user.strength = min_strength
-        if user.armor < min_armor:
-            user.armor = min_armor
-        if user.hp < min_hp:
-            old_max_hp = user.hp
-            user.hp = min_hp
-            # Proportionally adjust current HP
-            if old_max_hp > 0:
-                hp_ratio = user.current_hp / old_max_hp
-                user.current_hp = int(user.hp * hp_ratio)
-        if user.agility < min_agility:
-            user.agility = min_agility
-        if user.mana < min_mana:
-            old_max_mana = user.mana
-            user.mana = min_mana
-            # Proportionally adjust current mana
-            if old_max_mana > 0:
-                mana_ratio = user.current_mana / old_max_mana
-                user.current_mana = int(user.mana * mana_ratio)
+        # Current HP/mana cannot stay above a lowered maximum (SET expressions see the old row)
+        if delta.hp < 0:
+            values['current_hp'] = func.min(User.current_hp, User.max_hp + delta.hp)
+        if delta.mana < 0:
+            values['current_mana'] = func.min(User.current_mana, User.max_mana + delta.mana)
         
-        logger.info(f"Updated stats for user {user_id}: STR+{total_strength_bonus}, ARM+{total_armor_bonus}, HP+{total_hp_bonus}, AGI+{total_agility_bonus}, MANA+{total_mana_bonus}")
+        await session.execute(
+            update(User).where(User.id == user_id).values(**values)
+            .execution_options(synchronize_session=False)
+        )
         
+        logger.info(f"Equipment bonus change for user {user_id}: {dict(zip(StatBlock._fields, delta))}")
+    
     async def get_inventory_stats(self, user_id: int) -> dict:
         """Get inventory statistics"""
         async with AsyncSessionLocal() as session:
-            total_items = await session.scalar(
-                select(func.count(UserItem.id)).where(UserItem.user_id == user_id)
-            )
+            total_items = select(func.count(UserItem.id)).where(
+                UserItem.user_id == user_id
+            ).scalar_subquery()
             
-            equipped_items = await session.scalar(
-                select(func.count(UserItem.id)).where(
-                    and_(
-                        UserItem.user_id == user_id,
-                        UserItem.is_equipped == True
-                    )
+            equipped_items = select(func.count(UserItem.id)).where(
+                and_(
+                    UserItem.user_id == user_id,
+                    UserItem.is_equipped == True
                 )
-            )
+            ).scalar_subquery()
             
-            user = await session.get(User, user_id)
+            inventory_size, total_items, equipped_items = (await session.execute(
+                select(User.inventory_size, total_items, equipped_items).where(User.id == user_id)
+            )).one()
             
             return {
                 'total_items': total_items or 0,
                 'equipped_items': equipped_items or 0,
-                'inventory_size': user.inventory_size,
-                'free_slots': user.inventory_size - (total_items or 0)
+                'inventory_size': inventory_size,
+                'free_slots': inventory_size - (total_items or 0)
             }
\ No newline at end of file
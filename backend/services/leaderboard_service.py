@@ -0,0 +1,211 @@
+from sqlalchemy import select
+from config.database import AsyncSessionLocal
+from models.user import User, KingdomEnum
+from services import user_changes
+from services.worker_bus import worker_bus
+from utils.metrics import metrics
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Board name -> player fields that make up its score, most significant first
+BOARDS = {
+    'level': ('level', 'experience'),
+    'pvp': ('pvp_wins',),
+    'wealth': ('money',)
+}
+TRACKED_FIELDS = ('name', 'kingdom', 'level', 'experience', 'pvp_wins', 'pvp_losses', 'money')
+EXPORTED_TOP = 5  # Best players by level handed to the web monitor
+
+class Leaderboard:
+    """Players sorted by a score tuple, best first; rank lookups are O(log n)"""
+
+    def __init__(self):
+        self._keys: List[tuple] = []  # (negated score, user_id), ascending
+        self._key_by_user: Dict[int, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _key(user_id: int, score: tuple) -> tuple:
+        # Ties are broken by registration order (lower id first)
+        return tuple(-value for value in score), user_id
+
+    def build(self, scores: Dict[int, tuple]):
+        """Replace the board contents in one sort"""
+        self._key_by_user = {user_id: self._key(user_id, score) for user_id, score in scores.items()}
+        self._keys = sorted(self._key_by_user.values())
+
+    def update(self, user_id: int, score: tuple):
+        key = self._key(user_id, score)
+        old_key = self._key_by_user.get(user_id)
+        if old_key == key:
+            return
+        if old_key is not None:
+            del self._keys[bisect_left(self._keys, old_key)]
+        insort(self._keys, key)
+        self._key_by_user[user_id] = key
+
+    def remove(self, user_id: int):
+        old_key = self._key_by_user.pop(user_id, None)
+        if old_key is not None:
+            del self._keys[bisect_left(self._keys, old_key)]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based position of a player, None if not on the board"""
+        key = self._key_by_user.get(user_id)
+        if key is None:
+            return None
+        return bisect_left(self._keys, key) + 1
+
+    def top(self, limit: int) -> List[Tuple[int, tuple]]:
+        """Best (user_id, score) pairs"""
+        return [(user_id, tuple(-value for value in negated)) for negated, user_id in self._keys[:limit]]
+
+@dataclass
+class LeaderboardPlayer:
+    name: str
+    kingdom: str
+    level: int
+    experience: int
+    pvp_wins: int
+    pvp_losses: int
+    money: int
+
+class LeaderboardService:
+    """Global and per-kingdom leaderboards kept in memory.
+
+    Seeded with one query at startup. ORM changes to users are picked up when
+    their session commits; services that change money with a plain UPDATE call
+    update_player() themselves. Players changed by other worker processes are
+    read again from the table.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._players: Dict[int, LeaderboardPlayer] = {}
+        self._boards: Dict[Tuple[str, str], Leaderboard] = {}
+        self._reset_boards()
+
+    def _reset_boards(self):
+        scopes = ['all'] + [kingdom.value for kingdom in KingdomEnum]
+        self._boards = {(board, scope): Leaderboard() for board in BOARDS for scope in scopes}
+
+    @staticmethod
+    def _select_players():
+        return select(User.id, User.name, User.kingdom, User.level, User.experience,
+                      User.pvp_wins, User.pvp_losses, User.money)
+
+    async def load(self):
+        """Rebuild every board from the users table"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(self._select_players())
+            players = {
+                user_id: LeaderboardPlayer(name, kingdom.value, level, experience, pvp_wins, pvp_losses, money)
+                for user_id, name, kingdom, level, experience, pvp_wins, pvp_losses, money in result
+            }
+
+        self._players = players
+        self._reset_boards()
+        for board, fields in BOARDS.items():
+            scores = {user_id: self._score(player, fields) for user_id, player in players.items()}
+            self._boards[(board, 'all')].build(scores)
+            for kingdom in KingdomEnum:
+                self._boards[(board, kingdom.value)].build({
+                    user_id: score for user_id, score in scores.items()
+                    if players[user_id].kingdom == kingdom.value
+                })
+        self.loaded = True
+        logger.info(f"Leaderboards loaded: {len(players)} players")
+
+    @staticmethod
+    def _score(player: LeaderboardPlayer, fields: tuple) -> tuple:
+        return tuple(getattr(player, field) for field in fields)
+
+    def update_player(self, user_id: int, **fields):
+        """Apply committed changes of a player's tracked fields (see TRACKED_FIELDS)"""
+        worker_bus.publish('users', [user_id])
+        self._update(user_id, **fields)
+
+    def _update(self, user_id: int, **fields):
+        if not self.loaded:
+            return
+
+        player = self._players.get(user_id)
+        if player is None:
+            if any(fields.get(field) is None for field in TRACKED_FIELDS):
+                return  # unknown player and not enough data to place them
+            player = LeaderboardPlayer(**{field: fields[field] for field in TRACKED_FIELDS})
+            self._players[user_id] = player
+            changed = set(TRACKED_FIELDS)
+            old_kingdom = None
+        else:
+            changed = {field for field, value in fields.items()
+                       if value is not None and getattr(player, field) != value}
+            if not changed:
+                return
+            old_kingdom = player.kingdom
+            for field in changed:
+                setattr(player, field, fields[field])
+
+        for board, board_fields in BOARDS.items():
+            if old_kingdom is not None and old_kingdom != player.kingdom:
+                self._boards[(board, old_kingdom)].remove(user_id)
+            elif not changed.intersection(board_fields) and 'kingdom' not in changed:
+                continue
+            score = self._score(player, board_fields)
+            self._boards[(board, 'all')].update(user_id, score)
+            self._boards[(board, player.kingdom)].update(user_id, score)
+
+    def top(self, board: str, scope: str = 'all', limit: int = 10) -> List[Tuple[int, LeaderboardPlayer]]:
+        """Best players of a board, globally or in one kingdom"""
+        leaderboard = self._boards.get((board, scope))
+        if leaderboard is None:
+            return []
+        return [(user_id, self._players[user_id]) for user_id, _ in leaderboard.top(limit)]
+
+    def rank(self, board: str, user_id: int, scope: str = 'all') -> Optional[int]:
+        leaderboard = self._boards.get((board, scope))
+        return leaderboard.rank(user_id) if leaderboard else None
+
+    def size(self, board: str, scope: str = 'all') -> int:
+        leaderboard = self._boards.get((board, scope))
+        return len(leaderboard) if leaderboard else 0
+
+    def apply_user_changes(self, users: Dict[int, User]):
+        """Apply users changed through the ORM, once their session has committed"""
+        for user_id, user in users.items():
+            fields = user_changes.loaded_values(user, TRACKED_FIELDS)
+            if isinstance(fields.get('kingdom'), KingdomEnum):
+                fields['kingdom'] = fields['kingdom'].value
+            self._update(user_id, **fields)
+
+    async def refresh_players(self, user_ids: Iterable[int]):
+        """Read players changed by another worker process again"""
+        if not self.loaded:
+            return
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(self._select_players().where(User.id.in_(list(user_ids))))
+            rows = result.all()
+        for user_id, *values in rows:
+            fields = dict(zip(TRACKED_FIELDS, values))
+            fields['kingdom'] = fields['kingdom'].value
+            self._update(user_id, **fields)
+
+# Глобальные таблицы лидеров
+leaderboards = LeaderboardService()
+user_changes.subscribe(leaderboards.apply_user_changes)
+worker_bus.subscribe('users', leaderboards.refresh_players)
+
+metrics.gauge('rpg_registered_players', 'Players on the leaderboards').set_function(
+    lambda: leaderboards.size('level')
+)
+metrics.field('top_players', lambda: [
+    {'name': player.name, 'kingdom': player.kingdom, 'level': player.level,
+     'pvp_wins': player.pvp_wins, 'pvp_losses': player.pvp_losses}
+    for _, player in leaderboards.top('level', limit=EXPORTED_TOP)
+])
@@ -0,0 +1,176 @@
+from sqlalchemy import select, insert, event, func
+from sqlalchemy.orm import Session
+from config.database import AsyncSessionLocal
+from models.ledger import MoneyLedgerEntry, LedgerReasonEnum
+from models.user import User
+from utils.metrics import metrics
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'money_ledger_pending'
+
+class MoneyLedger:
+    """Buffered writer for the money ledger.
+
+    Money changes are attached to the session that makes them and move to an
+    in-memory buffer when that session commits (they are dropped on rollback).
+    A background task inserts the buffer in batches, so the hot path never
+    waits for the ledger. Entries still buffered when the process dies are
+    lost; reconcile() reports the users they belonged to.
+    """
+
+    BATCH_SIZE = 500  # Flush as soon as this many entries are buffered
+    FLUSH_INTERVAL = 1.0  # ...or at least this often (seconds)
+
+    def __init__(self, batch_size: int = None, flush_interval: float = None):
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.flush_interval = flush_interval or self.FLUSH_INTERVAL
+        self.enabled = True
+
+        self._buffer: List[dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._running = False
+
+        # Metrics
+        self.written = 0
+        self.flushes = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._buffer)
+
+    def add(self, session, user_id: int, delta: int, reason: LedgerReasonEnum, ref_id: int = None):
+        """Record a money change made in `session`; it is buffered once the session commits"""
+        if not self.enabled or not delta:
+            return
+        session.info.setdefault(PENDING_KEY, []).append(self._entry(user_id, delta, reason, ref_id))
+
+    def record(self, user_id: int, delta: int, reason: LedgerReasonEnum, ref_id: int = None):
+        """Buffer an already committed money change"""
+        if not self.enabled or not delta:
+            return
+        self._extend([self._entry(user_id, delta, reason, ref_id)])
+
+    @staticmethod
+    def _entry(user_id: int, delta: int, reason: LedgerReasonEnum, ref_id: Optional[int]) -> dict:
+        return {
+            'user_id': user_id,
+            'delta': delta,
+            'reason': reason,
+            'ref_id': ref_id,
+            'ts': datetime.utcnow()
+        }
+
+    def _extend(self, entries: List[dict]):
+        self._buffer.extend(entries)
+        if self._wakeup and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _on_commit(self, session: Session):
+        entries = session.info.pop(PENDING_KEY, None)
+        if entries:
+            self._extend(entries)
+
+    def _on_rollback(self, session: Session):
+        session.info.pop(PENDING_KEY, None)
+
+    async def start(self):
+        """Start the background flusher"""
+        self._wakeup = asyncio.Event()
+        self._running = True
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Money ledger writer started")
+
+    async def stop(self):
+        """Stop the flusher and write what is left in the buffer"""
+        self._running = False
+        if self._wakeup:
+            self._wakeup.set()
+        if self._worker:
+            await self._worker
+            self._worker = None
+        await self.flush()
+        logger.info(f"Money ledger writer stopped: {self.written} entries in {self.flushes} batches")
+
+    async def _run(self):
+        while self._running:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Insert the buffered entries in one transaction, returns how many were written"""
+        if not self._buffer:
+            return 0
+
+        batch, self._buffer = self._buffer, []
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(insert(MoneyLedgerEntry), batch)
+                await session.commit()
+        except Exception as e:
+            # Keep the entries for the next attempt, in their original order
+            self._buffer[:0] = batch
+            logger.error(f"Error writing {len(batch)} ledger entries: {e}")
+            return 0
+
+        self.written += len(batch)
+        self.flushes += 1
+        return len(batch)
+
+    async def reconcile(self, yield_per: int = 1000) -> AsyncIterator[Tuple[int, int, int]]:
+        """Stream (user_id, money, ledger_balance) for users whose money does not match their ledger"""
+        await self.flush()
+
+        balances = (
+            select(MoneyLedgerEntry.user_id, func.sum(MoneyLedgerEntry.delta).label('balance'))
+            .group_by(MoneyLedgerEntry.user_id)
+            .subquery()
+        )
+        ledger_balance = func.coalesce(balances.c.balance, 0)
+        query = (
+            select(User.id, User.money, ledger_balance)
+            .outerjoin(balances, balances.c.user_id == User.id)
+            .where(User.money != ledger_balance)
+            .order_by(User.id)
+            .execution_options(yield_per=yield_per)
+        )
+
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(query)
+            async for user_id, money, balance in result:
+                yield user_id, money, balance
+
+    async def aggregate_by_reason(self, since: datetime = None) -> AsyncIterator[Tuple[LedgerReasonEnum, int, int]]:
+        """Stream (reason, entries, total delta) over the ledger, optionally from `since` on"""
+        await self.flush()
+
+        query = (
+            select(MoneyLedgerEntry.reason, func.count(MoneyLedgerEntry.id), func.sum(MoneyLedgerEntry.delta))
+            .group_by(MoneyLedgerEntry.reason)
+            .order_by(MoneyLedgerEntry.reason)
+        )
+        if since is not None:
+            query = query.where(MoneyLedgerEntry.ts >= since)
+
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(query)
+            async for reason, count, total in result:
+                yield reason, count, total
+
+# Глобальный журнал движения денег
+money_ledger = MoneyLedger()
+
+event.listen(Session, "after_commit", money_ledger._on_commit)
+event.listen(Session, "after_rollback", money_ledger._on_rollback)
+metrics.gauge('rpg_outbound_queue_depth', 'Items waiting in an outbound queue', ['queue']).set_function(
+    lambda: money_ledger.pending_count, queue='ledger'
+)
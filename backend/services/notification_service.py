@@ -0,0 +1,269 @@
+from sqlalchemy import select, delete
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest, TelegramNotFound
+from config.database import AsyncSessionLocal
+from config.settings import settings
+from models.notification import PendingNotification
+from utils.metrics import metrics
+from utils.rate_limiter import TokenBucket
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class NotificationQueue:
+    """Persistent outbound queue for personal messages paced by global and per-chat token buckets"""
+
+    FLUSH_BATCH = 100  # Delete delivered rows in batches of this size
+    FLUSH_INTERVAL = 1.0  # ...or at least this often (seconds)
+    THROUGHPUT_WINDOW = 60.0  # Seconds of history used for the throughput metric
+
+    def __init__(self, bot=None, global_rate: float = None, chat_rate: float = None,
+                 max_in_flight: int = None, max_attempts: int = None):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate or settings.NOTIFY_GLOBAL_RATE)
+        self.chat_rate = chat_rate or settings.NOTIFY_CHAT_RATE
+        self.max_in_flight = max_in_flight or settings.NOTIFY_MAX_IN_FLIGHT
+        self.max_attempts = max_attempts or settings.NOTIFY_MAX_ATTEMPTS
+
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._pending: Dict[int, deque] = {}  # chat_id -> deque of [notification_id, text, attempts]
+        self._ready: List[tuple] = []  # heap of (ready_at, seq, chat_id), one entry per idle chat
+        self._scheduled = set()  # chats that are in the heap or being delivered
+        self._seq = itertools.count()
+        self._delivered_ids: List[int] = []
+        self._paused_until = 0.0
+        self._last_flush = time.monotonic()
+
+        self._wakeup = asyncio.Event()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight = set()
+        self._running = False
+
+        # Metrics
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self._sent_times = deque()
+
+    def set_bot(self, bot):
+        """Установить бота для отправки сообщений"""
+        self.bot = bot
+
+    @property
+    def pending_count(self) -> int:
+        return sum(len(messages) for messages in self._pending.values())
+
+    async def start(self):
+        """Load undelivered notifications and start the sender"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(PendingNotification).order_by(PendingNotification.id)
+            )
+            restored = 0
+            for notification in result.scalars():
+                self._push(notification.id, notification.chat_id, notification.text)
+                restored += 1
+
+        if restored:
+            logger.info(f"Restored {restored} pending notifications")
+
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._running = True
+        self._worker = asyncio.create_task(self._run())
+        logger.info("Notification queue started")
+
+    async def stop(self, timeout: float = 5.0):
+        """Stop sending, wait for in-flight messages and persist progress"""
+        self._running = False
+        self._wakeup.set()
+        if self._worker:
+            await self._worker
+            self._worker = None
+        if self._in_flight:
+            await asyncio.wait(self._in_flight, timeout=timeout)
+        await self._flush()
+
+        stats = self.get_stats()
+        logger.info(
+            f"Notification queue stopped: sent {stats['sent']}, failed {stats['failed']}, "
+            f"retried {stats['retried']}, pending {stats['pending']}"
+        )
+
+    async def enqueue(self, chat_id: int, text: str):
+        """Queue a single personal message"""
+        await self.enqueue_many([(chat_id, text)])
+
+    async def enqueue_many(self, messages: List[Tuple[int, str]]):
+        """Persist a batch of (chat_id, text) messages in one transaction and queue them"""
+        if not messages:
+            return
+
+        async with AsyncSessionLocal() as session:
+            notifications = [PendingNotification(chat_id=chat_id, text=text) for chat_id, text in messages]
+            session.add_all(notifications)
+            await session.commit()
+
+        for notification in notifications:
+            self._push(notification.id, notification.chat_id, notification.text)
+
+        self._wakeup.set()
+
+    def get_stats(self) -> dict:
+        """Queue depth, counters and current throughput (messages per second)"""
+        now = time.monotonic()
+        self._trim_sent_times(now)
+        if self._sent_times:
+            span = max(now - self._sent_times[0], 1.0)
+            throughput = len(self._sent_times) / span
+        else:
+            throughput = 0.0
+
+        return {
+            'pending': self.pending_count,
+            'in_flight': len(self._in_flight),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'throughput': throughput
+        }
+
+    def _push(self, notification_id: int, chat_id: int, text: str, attempts: int = 0):
+        self._pending.setdefault(chat_id, deque()).append([notification_id, text, attempts])
+        if chat_id not in self._scheduled:
+            self._schedule(chat_id, time.monotonic())
+
+    def _schedule(self, chat_id: int, ready_at: float):
+        self._scheduled.add(chat_id)
+        heapq.heappush(self._ready, (ready_at, next(self._seq), chat_id))
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, capacity=1)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _sleep(self, seconds: float):
+        """Sleep, waking up early when new messages arrive"""
+        self._wakeup.clear()
+        if not self._running:
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        while self._running:
+            now = time.monotonic()
+            if self._delivered_ids and (len(self._delivered_ids) >= self.FLUSH_BATCH
+                                        or now - self._last_flush >= self.FLUSH_INTERVAL):
+                await self._flush()
+
+            if not self._ready or not self.bot:
+                await self._sleep(self.FLUSH_INTERVAL)
+                continue
+
+            ready_at, _, chat_id = self._ready[0]
+            wait = max(ready_at, self._paused_until, now + self.global_bucket.delay(now)) - now
+            if wait > 0:
+                await self._sleep(wait)
+                continue
+
+            # Per-chat limit: push the chat back until its bucket refills
+            chat_wait = self._chat_bucket(chat_id).take(now)
+            if chat_wait > 0:
+                heapq.heapreplace(self._ready, (now + chat_wait, next(self._seq), chat_id))
+                continue
+
+            heapq.heappop(self._ready)
+            self.global_bucket.take(now)
+
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._deliver(chat_id))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _deliver(self, chat_id: int):
+        """Send the oldest message of a chat; the chat is rescheduled afterwards to keep ordering"""
+        messages = self._pending[chat_id]
+        entry = messages[0]
+        notification_id, text, attempts = entry
+        ready_at = time.monotonic()
+
+        try:
+            await self.bot.send_message(chat_id, text)
+            messages.popleft()
+            self._delivered_ids.append(notification_id)
+            self.sent += 1
+            self._sent_times.append(time.monotonic())
+            self._trim_sent_times(self._sent_times[-1])
+        except TelegramRetryAfter as e:
+            # Flood control: pause all sending for the requested time
+            self.retried += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            ready_at = self._paused_until
+            logger.warning(f"Flood control on chat {chat_id}, retry after {e.retry_after}s")
+        except (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound) as e:
+            # Blocked bot, deleted chat, etc.: retrying will not help
+            messages.popleft()
+            self._delivered_ids.append(notification_id)
+            self.failed += 1
+            logger.warning(f"Dropped notification {notification_id} for chat {chat_id}: {e}")
+        except Exception as e:
+            entry[2] = attempts + 1
+            if entry[2] >= self.max_attempts:
+                messages.popleft()
+                self._delivered_ids.append(notification_id)
+                self.failed += 1
+                logger.error(f"Giving up on notification {notification_id} for chat {chat_id}: {e}")
+            else:
+                self.retried += 1
+                ready_at = time.monotonic() + min(2 ** entry[2], 60)
+                logger.warning(f"Error sending notification {notification_id} to chat {chat_id}: {e}")
+        finally:
+            self._semaphore.release()
+            if messages:
+                self._schedule(chat_id, ready_at)
+            else:
+                del self._pending[chat_id]
+                self._scheduled.discard(chat_id)
+            self._wakeup.set()
+
+    async def _flush(self):
+        """Delete delivered (or abandoned) notifications in one statement"""
+        self._last_flush = time.monotonic()
+
+        # Idle chats with full buckets behave exactly like fresh ones
+        for chat_id in [c for c, b in self._chat_buckets.items() if c not in self._pending and b.is_full()]:
+            del self._chat_buckets[chat_id]
+
+        if not self._delivered_ids:
+            return
+
+        ids, self._delivered_ids = self._delivered_ids, []
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    delete(PendingNotification).where(PendingNotification.id.in_(ids))
+                )
+                await session.commit()
+        except Exception as e:
+            self._delivered_ids.extend(ids)
+            logger.error(f"Error flushing delivered notifications: {e}")
+
+    def _trim_sent_times(self, now: float):
+        while self._sent_times and now - self._sent_times[0] > self.THROUGHPUT_WINDOW:
+            self._sent_times.popleft()
+
+# Глобальная очередь уведомлений
+notification_queue = NotificationQueue()
+metrics.gauge('rpg_outbound_queue_depth', 'Items waiting in an outbound queue', ['queue']).set_function(
+    lambda: notification_queue.pending_count, queue='notifications'
+)
@@ -0,0 +1,164 @@
+from sqlalchemy import select
+from config.database import AsyncSessionLocal
+from models.user import User, KingdomEnum
+from services import user_changes
+from services.worker_bus import worker_bus
+from utils.metrics import metrics
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+LEVEL_RANGE = 5  # Opponents are within ±LEVEL_RANGE levels
+LEVEL_BUCKET_SIZE = 5
+
+RECORD_FIELDS = (
+    'name', 'kingdom', 'level', 'is_active', 'current_hp', 'hp', 'hp_bonus',
+    'strength', 'strength_bonus', 'armor', 'armor_bonus', 'agility', 'agility_bonus',
+    'pvp_wins', 'pvp_losses'
+)
+
+class OpponentRecord(NamedTuple):
+    """What a PvP opponent list needs to know about a player"""
+    id: int
+    name: str
+    kingdom: str
+    level: int
+    current_hp: int
+    max_hp: int
+    power: int  # strength + armor + agility, equipment included
+    pvp_wins: int
+    pvp_losses: int
+
+    @classmethod
+    def from_values(cls, user_id: int, values: dict) -> 'OpponentRecord':
+        kingdom = values['kingdom']
+        return cls(
+            id=user_id,
+            name=values['name'],
+            kingdom=kingdom.value if isinstance(kingdom, KingdomEnum) else kingdom,
+            level=values['level'],
+            current_hp=values['current_hp'],
+            max_hp=values['hp'] + (values['hp_bonus'] or 0),
+            power=(values['strength'] + (values['strength_bonus'] or 0)
+                   + values['armor'] + (values['armor_bonus'] or 0)
+                   + values['agility'] + (values['agility_bonus'] or 0)),
+            pvp_wins=values['pvp_wins'],
+            pvp_losses=values['pvp_losses']
+        )
+
+class OpponentIndex:
+    """Active players by kingdom and level bucket, for PvP opponent lists.
+
+    Loaded with one query at startup. ORM changes are applied when their
+    session commits; plain UPDATEs of HP or equipment call refresh_players().
+    Players changed by other worker processes are read again from the table.
+    """
+
+    def __init__(self, bucket_size: int = LEVEL_BUCKET_SIZE):
+        self.bucket_size = bucket_size
+        self.loaded = False
+        self._records: Dict[int, OpponentRecord] = {}
+        self._buckets: Dict[Tuple[str, int], Dict[int, OpponentRecord]] = {}
+        self._refresh_tasks = set()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _bucket(self, kingdom: str, level: int) -> Tuple[str, int]:
+        return kingdom, level // self.bucket_size
+
+    def _select_records(self):
+        return select(User.id, *[getattr(User, field) for field in RECORD_FIELDS])
+
+    async def load(self):
+        """Rebuild the index from the users table"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(self._select_records())
+            rows = result.all()
+
+        self._records = {}
+        self._buckets = {}
+        for row in rows:
+            self._apply(row[0], dict(zip(RECORD_FIELDS, row[1:])))
+        self.loaded = True
+        logger.info(f"Opponent index loaded: {len(self._records)} active players")
+
+    async def refresh_players(self, user_ids: Iterable[int]):
+        """Reload players changed with plain UPDATEs (equipment, HP restore)"""
+        user_ids = list(user_ids)
+        worker_bus.publish('users', user_ids)
+        await self._read_players(user_ids)
+
+    async def _read_players(self, user_ids: List[int]):
+        if not self.loaded or not user_ids:
+            return
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(self._select_records().where(User.id.in_(user_ids)))
+            rows = result.all()
+        for row in rows:
+            self._apply(row[0], dict(zip(RECORD_FIELDS, row[1:])))
+
+    def _apply(self, user_id: int, values: dict):
+        self._remove(user_id)
+        if not values['is_active']:
+            return
+        record = OpponentRecord.from_values(user_id, values)
+        self._records[user_id] = record
+        self._buckets.setdefault(self._bucket(record.kingdom, record.level), {})[user_id] = record
+
+    def _remove(self, user_id: int):
+        record = self._records.pop(user_id, None)
+        if record is not None:
+            bucket = self._buckets.get(self._bucket(record.kingdom, record.level))
+            if bucket is not None:
+                bucket.pop(user_id, None)
+
+    def apply_user_changes(self, users: Dict[int, User]):
+        """Apply users changed through the ORM, once their session has committed"""
+        if not self.loaded:
+            return
+        stale = []
+        for user_id, user in users.items():
+            values = user_changes.loaded_values(user, RECORD_FIELDS)
+            if len(values) < len(RECORD_FIELDS):
+                stale.append(user_id)  # some columns were expired, read the row again
+            else:
+                self._apply(user_id, values)
+        if stale:
+            task = asyncio.get_running_loop().create_task(self._read_players(stale))
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+
+    def get(self, user_id: int) -> Optional[OpponentRecord]:
+        return self._records.get(user_id)
+
+    def sample(self, kingdom: str, level: int, exclude_id: int = None, limit: int = 10,
+               min_hp_ratio: float = 0.0, level_range: int = LEVEL_RANGE,
+               rng: random.Random = None) -> List[OpponentRecord]:
+        """Random eligible opponents of a kingdom within ±level_range, sorted by level"""
+        min_level = max(1, level - level_range)
+        max_level = level + level_range
+
+        candidates = []
+        for bucket in range(min_level // self.bucket_size, max_level // self.bucket_size + 1):
+            for record in self._buckets.get((kingdom, bucket), {}).values():
+                if (min_level <= record.level <= max_level and record.id != exclude_id
+                        and record.current_hp >= record.max_hp * min_hp_ratio):
+                    candidates.append(record)
+
+        # A different pick on every call spreads challenges over all eligible players
+        if len(candidates) > limit:
+            candidates = (rng or random).sample(candidates, limit)
+        return sorted(candidates, key=lambda record: (-record.level, record.name))
+
+# Глобальный индекс противников
+opponent_index = OpponentIndex()
+user_changes.subscribe(opponent_index.apply_user_changes)
+worker_bus.subscribe('users', opponent_index._read_players)
+
+metrics.gauge('rpg_active_players', 'Active players in the opponent index').set_function(
+    lambda: len(opponent_index)
+)
@@ -0,0 +1,292 @@
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from sqlalchemy import select, func
+from config.database import AsyncSessionLocal
+from keyboards.static import static_keyboard
+from models.item import Item, ItemTypeEnum, RarityEnum
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+SHOP_PAGE_SIZE = 6
+SHOP_BULK_QUANTITY = 5
+
+# Items of these types share one inventory row with a quantity
+STACKABLE_ITEM_TYPES = (ItemTypeEnum.consumable, ItemTypeEnum.material)
+
+CATEGORY_NAMES = {
+    'weapon': '⚔️ Оружие',
+    'armor': '🛡️ Броня',
+    'consumable': '🧪 Зелья',
+    'material': '🔩 Материалы',
+    'scroll': '📜 Свитки',
+    'all': '🛒 Все товары'
+}
+
+BACK_TO_CATEGORIES_BUTTON = InlineKeyboardButton(text="🔙 К категориям", callback_data="shop_menu")
+
+@dataclass(frozen=True)
+class CatalogItem:
+    """Read-only copy of an items row with its prebuilt shop card and buttons"""
+    id: int
+    name: str
+    description: Optional[str]
+    item_type: ItemTypeEnum
+    rarity: RarityEnum
+    rarity_emoji: str
+    weight: int
+    price: int
+    level_required: int
+    strength_bonus: int
+    armor_bonus: int
+    hp_bonus: int
+    agility_bonus: int
+    mana_bonus: int
+    durability: int
+    max_durability: int
+    special_effect: Optional[str]
+    is_available_in_shop: bool
+    card: str
+    buy_button: InlineKeyboardButton
+    no_money_button: InlineKeyboardButton
+    low_level_button: InlineKeyboardButton
+    bulk_buy_button: Optional[InlineKeyboardButton]
+
+    @classmethod
+    def from_item(cls, item: Item) -> 'CatalogItem':
+        return cls(
+            id=item.id,
+            name=item.name,
+            description=item.description,
+            item_type=item.item_type,
+            rarity=item.rarity,
+            rarity_emoji=item.rarity_emoji,
+            weight=item.weight,
+            price=item.price,
+            level_required=item.level_required,
+            strength_bonus=item.strength_bonus,
+            armor_bonus=item.armor_bonus,
+            hp_bonus=item.hp_bonus,
+            agility_bonus=item.agility_bonus,
+            mana_bonus=item.mana_bonus,
+            durability=item.durability,
+            max_durability=item.max_durability,
+            special_effect=item.special_effect,
+            is_available_in_shop=item.is_available_in_shop,
+            card=_item_card(item),
+            buy_button=InlineKeyboardButton(text=f"💰 Купить {item.name}", callback_data=f"buy_item_{item.id}"),
+            no_money_button=InlineKeyboardButton(
+                text=f"❌ {item.name} (Недостаточно денег)", callback_data="shop_unavailable"
+            ),
+            low_level_button=InlineKeyboardButton(
+                text=f"❌ {item.name} (Низкий уровень)", callback_data="shop_unavailable"
+            ),
+            bulk_buy_button=InlineKeyboardButton(
+                text=f"💰 x{SHOP_BULK_QUANTITY}", callback_data=f"buy_item_{item.id}_{SHOP_BULK_QUANTITY}"
+            ) if item.item_type in STACKABLE_ITEM_TYPES else None
+        )
+    
+    @property
+    def is_stackable(self) -> bool:
+        return self.item_type in STACKABLE_ITEM_TYPES
+
+    def button_for(self, money: int, level: int) -> InlineKeyboardButton:
+        """Buy button, or the reason the player cannot buy"""
+        if money < self.price:
+            return self.no_money_button
+        if level < self.level_required:
+            return self.low_level_button
+        return self.buy_button
+    
+    def buttons_for(self, money: int, level: int) -> List[InlineKeyboardButton]:
+        """Keyboard row of an item: buy button plus bulk buy when affordable"""
+        row = [self.button_for(money, level)]
+        if (self.bulk_buy_button and level >= self.level_required
+                and money >= self.price * SHOP_BULK_QUANTITY):
+            row.append(self.bulk_buy_button)
+        return row
+
+@dataclass(frozen=True)
+class CatalogPage:
+    """One prebuilt page of a shop category"""
+    category: str
+    number: int
+    items: Tuple[CatalogItem, ...]
+    title: str
+    cards: str
+    nav_row: Tuple[InlineKeyboardButton, ...]
+    # Money and levels at which some buy button of the page changes
+    money_thresholds: Tuple[int, ...] = ()
+    level_thresholds: Tuple[int, ...] = ()
+    _keyboards: Dict[Tuple[int, int], InlineKeyboardMarkup] = field(
+        default_factory=dict, compare=False, repr=False
+    )
+
+    def keyboard(self, money: int, level: int) -> InlineKeyboardMarkup:
+        """Page keyboard; only the buy buttons depend on the player.
+
+        Players between the same money and level thresholds see the same
+        buttons, so one keyboard is built per threshold band and reused.
+        """
+        key = (bisect_right(self.money_thresholds, money), bisect_right(self.level_thresholds, level))
+        keyboard = self._keyboards.get(key)
+        if keyboard is None:
+            rows = [item.buttons_for(money, level) for item in self.items]
+            if self.nav_row:
+                rows.append(list(self.nav_row))
+            rows.append([BACK_TO_CATEGORIES_BUTTON])
+            keyboard = self._keyboards[key] = static_keyboard(rows)
+        return keyboard
+
+def _item_card(item: Item) -> str:
+    """Shop card text of an item"""
+    stats_text = ""
+    if item.strength_bonus > 0:
+        stats_text += f"⚔️+{item.strength_bonus} "
+    if item.armor_bonus > 0:
+        stats_text += f"🛡️+{item.armor_bonus} "
+    if item.hp_bonus > 0:
+        stats_text += f"❤️+{item.hp_bonus} "
+    if item.agility_bonus > 0:
+        stats_text += f"💨+{item.agility_bonus} "
+    if item.mana_bonus > 0:
+        stats_text += f"🔮+{item.mana_bonus} "
+
+    level_req = f" (Ур.{item.level_required})" if item.level_required > 1 else ""
+
+    card = (
+        f"{item.rarity_emoji} <b>{item.name}</b>{level_req}\n"
+        f"💰 {item.price} золота | {stats_text}\n"
+    )
+    if item.description:
+        card += f"📝 {item.description}\n"
+    return card + "\n"
+
+class ShopCatalog:
+    """Immutable snapshot of the static items table, paginated per shop category"""
+
+    def __init__(self, items: List[Item], category_counts: Dict[str, int] = None, page_size: int = SHOP_PAGE_SIZE):
+        self.page_size = page_size
+
+        catalog_items = [CatalogItem.from_item(item) for item in sorted(items, key=lambda item: item.id)]
+        self._items: Dict[int, CatalogItem] = MappingProxyType({item.id: item for item in catalog_items})
+
+        shop_items = tuple(item for item in catalog_items if item.is_available_in_shop)
+        categories = {'all': shop_items}
+        for item_type in ItemTypeEnum:
+            categories[item_type.value] = tuple(item for item in shop_items if item.item_type == item_type)
+        self._categories: Dict[str, Tuple[CatalogItem, ...]] = MappingProxyType(categories)
+
+        self._pages: Dict[str, Tuple[CatalogPage, ...]] = MappingProxyType({
+            category: self._paginate(category, category_items)
+            for category, category_items in categories.items()
+        })
+
+        # Every item type is listed, in enum order, even when empty
+        category_counts = category_counts or {}
+        self.category_counts: Dict[str, int] = MappingProxyType({
+            item_type.value: category_counts.get(item_type.value, 0) for item_type in ItemTypeEnum
+        })
+        self.menu_keyboard = self._build_menu_keyboard()
+
+    def _build_menu_keyboard(self) -> InlineKeyboardMarkup:
+        """Shop main menu: non-empty categories with their item counts"""
+        rows = [
+            [InlineKeyboardButton(
+                text=f"{CATEGORY_NAMES.get(category, category)} ({count})",
+                callback_data=f"shop_category_{category}_1"
+            )]
+            for category, count in self.category_counts.items() if count > 0
+        ]
+        rows.append([InlineKeyboardButton(text="🛒 Все товары", callback_data="shop_category_all_1")])
+        rows.append([InlineKeyboardButton(text="🔙 Назад", callback_data="main_menu")])
+        return static_keyboard(rows)
+
+    def _paginate(self, category: str, items: Tuple[CatalogItem, ...]) -> Tuple[CatalogPage, ...]:
+        chunks = [items[start:start + self.page_size] for start in range(0, len(items), self.page_size)]
+        title = f"🛒 <b>{CATEGORY_NAMES.get(category, category)}</b>\n\n"
+
+        pages = []
+        for number, chunk in enumerate(chunks, 1):
+            nav_row = []
+            if number > 1:
+                nav_row.append(InlineKeyboardButton(
+                    text="⬅️ Назад", callback_data=f"shop_category_{category}_{number - 1}"
+                ))
+            if number < len(chunks):
+                nav_row.append(InlineKeyboardButton(
+                    text="➡️ Далее", callback_data=f"shop_category_{category}_{number + 1}"
+                ))
+            pages.append(CatalogPage(
+                category=category,
+                number=number,
+                items=chunk,
+                title=title,
+                cards="".join(item.card for item in chunk),
+                nav_row=tuple(nav_row),
+                money_thresholds=tuple(sorted(
+                    {item.price for item in chunk}
+                    | {item.price * SHOP_BULK_QUANTITY for item in chunk if item.is_stackable}
+                )),
+                level_thresholds=tuple(sorted({item.level_required for item in chunk}))
+            ))
+        return tuple(pages)
+
+    @classmethod
+    async def load(cls) -> 'ShopCatalog':
+        """Read the items table and the per-category shop counts"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(Item))
+            items = result.scalars().all()
+            
+            # One grouped aggregate instead of a COUNT(*) per item type
+            counts = await session.execute(
+                select(Item.item_type, func.count(Item.id))
+                .where(Item.is_available_in_shop == True)
+                .group_by(Item.item_type)
+            )
+            category_counts = {item_type.value: count for item_type, count in counts}
+            
+            return cls(items, category_counts)
+
+    def get_item(self, item_id: int) -> Optional[CatalogItem]:
+        return self._items.get(item_id)
+
+    def get_items(self, category: str = 'all') -> Tuple[CatalogItem, ...]:
+        """Shop items of a category ('all' for every category)"""
+        return self._categories.get(category, ())
+
+    def get_page(self, category: str, page: int) -> Optional[CatalogPage]:
+        pages = self._pages.get(category, ())
+        if 1 <= page <= len(pages):
+            return pages[page - 1]
+        return None
+
+class ShopCatalogCache:
+    """Holds the current catalog snapshot; reload() swaps in a fresh one"""
+
+    def __init__(self):
+        self._catalog: Optional[ShopCatalog] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> ShopCatalog:
+        """Current catalog, loaded on first use"""
+        if self._catalog is None:
+            async with self._lock:
+                if self._catalog is None:
+                    self._catalog = await ShopCatalog.load()
+        return self._catalog
+
+    async def reload(self) -> ShopCatalog:
+        """Reload after items were changed (data_init, admin edits)"""
+        async with self._lock:
+            self._catalog = await ShopCatalog.load()
+        logger.info(f"Shop catalog loaded: {len(self._catalog.get_items())} items in shop")
+        return self._catalog
+
+# Глобальный каталог магазина
+shop_catalog = ShopCatalogCache()
@@ -1,9 +1,13 @@
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, insert, update, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from config.database import AsyncSessionLocal
-from models.item import Item, UserItem, ItemTypeEnum, RarityEnum
+from models.item import UserItem
 from models.user import User
 from services.user_service import UserService
+from services.shop_catalog import shop_catalog, CatalogItem
+from models.ledger import LedgerReasonEnum
+from services.ledger_service import money_ledger
+from services.leaderboard_service import leaderboards
 from typing import List, Optional
 import logging
 
@@ -13,106 +17,121 @@ class ShopService:
     def __init__(self):
         self.user_service = UserService()
     
-    async def get_shop_items(self, item_type: str = None, page: int = 1, items_per_page: int = 8) -> List[Item]:
+    async def get_shop_items(self, item_type: str = None, page: int = 1, items_per_page: int = 8) -> List[CatalogItem]:
         """Get items available in shop"""
-        async with AsyncSessionLocal() as session:
-            query = select(Item).where(Item.is_available_in_shop == True)
-            
-            if item_type and item_type != "all":
-                query = query.where(Item.item_type == item_type)
-            
-            # Add pagination
-            offset = (page - 1) * items_per_page
-            query = query.offset(offset).limit(items_per_page)
-            
-            result = await session.execute(query)
-            return result.scalars().all()
+        catalog = await shop_catalog.get()
+        items = catalog.get_items(item_type or "all")
+        
+        # Add pagination
+        offset = (page - 1) * items_per_page
+        return list(items[offset:offset + items_per_page])
     
     async def get_shop_categories(self) -> dict:
         """Get shop categories with item counts"""
-        async with AsyncSessionLocal() as session:
-            categories = {}
-            
-            for item_type in ItemTypeEnum:
-                count = await session.scalar(
-                    select(func.count(Item.id)).where(
-                        and_(
-                            Item.is_available_in_shop == True,
-                            Item.item_type == item_type
-                        )
-                    )
-                )
-                categories[item_type.value] = count or 0
-            
-            return categories
+        catalog = await shop_catalog.get()
+        return dict(catalog.category_counts)
     
     async def buy_item(self, user_id: int, item_id: int, quantity: int = 1) -> tuple[bool, str]:
         """Buy item from shop"""
+        item = (await shop_catalog.get()).get_item(item_id)
+        
+        if not item:
+            return False, "Предмет не найден"
+        
+        if not item.is_available_in_shop:
+            return False, "Предмет недоступен для покупки"
+        
+        if quantity < 1:
+            return False, "Неверное количество"
+        
+        # Calculate total cost
+        total_cost = item.price * quantity
+        
         async with AsyncSessionLocal() as session:
-            # Get user and item
-            user = await session.get(User, user_id)
-            item = await session.get(Item, item_id)
-            
-            if not user:
-                return False, "Пользователь не найден"
-            
-            if not item:
-                return False, "Предмет не найден"
-            
-            if not item.is_available_in_shop:
-                return False, "Предмет недоступен для покупки"
-            
-            # Check level requirement
-            if user.level < item.level_required:
-                return False, f"Требуемый уровень: {item.level_required}"
-            
-            # Calculate total cost
-            total_cost = item.price * quantity
-            
-            if user.money < total_cost:
-                return False, f"Недостаточно денег. Нужно: {total_cost}, есть: {user.money}"
-            
-            # Check inventory space for non-stackable items
-            if item.item_type in [ItemTypeEnum.weapon, ItemTypeEnum.armor]:
-                inventory_count = await session.scalar(
-                    select(func.count(UserItem.id)).where(UserItem.user_id == user_id)
+            # Money, level and inventory space are checked and paid in one guarded statement,
+            # so concurrent purchases can never spend the same gold twice
+            conditions = [
+                User.id == user_id,
+                User.money >= total_cost,
+                User.level >= item.level_required
+            ]
+            if not item.is_stackable:
+                inventory_count = (
+                    select(func.count(UserItem.id)).where(UserItem.user_id == user_id).scalar_subquery()
                 )
-                if inventory_count + quantity > user.inventory_size:
-                    return False, f"Недостаточно места в инвентаре"
+                conditions.append(inventory_count + quantity <= User.inventory_size)
             
-            # Check if user already has this item (for stackable items)
-            existing_item = await session.scalar(
-                select(UserItem).where(
-                    and_(
-                        UserItem.user_id == user_id,
-                        UserItem.item_id == item_id
-                    )
-                )
+            paid = await session.scalar(
+                update(User)
+                .where(and_(*conditions))
+                .values(money=User.money - total_cost)
+                .returning(User.money)
             )
             
-            # Add item to inventory
-            if existing_item and item.item_type in [ItemTypeEnum.consumable, ItemTypeEnum.material]:
-                # Stack with existing item
-                existing_item.quantity += quantity
-            else:
-                # Create new inventory entry
-                user_item = UserItem(
-                    user_id=user_id,
-                    item_id=item_id,
-                    quantity=quantity,
-                    current_durability=item.durability
-                )
-                session.add(user_item)
-            
-            # Deduct money
-            user.money -= total_cost
+            if paid is None:
+                await session.rollback()
+                return False, await self._purchase_error(user_id, item, quantity, session)
             
+            if item.is_stackable:
+                await self._add_to_stack(session, user_id, item, quantity)
+            else:
+                # Equipment: one inventory row per piece
+                await session.execute(insert(UserItem), [
+                    {
+                        'user_id': user_id,
+                        'item_id': item.id,
+                        'quantity': 1,
+                        'current_durability': item.durability
+                    }
+                    for _ in range(quantity)
+                ])
+            
+            money_ledger.add(session, user_id, -total_cost, LedgerReasonEnum.shop_buy, item.id)
             await session.commit()
-            
-            logger.info(f"User {user.name} bought {quantity}x {item.name} for {total_cost} gold")
-            return True, f"Куплено: {quantity}x {item.name}"
+        
+        leaderboards.update_player(user_id, money=paid)
+        
+        logger.info(f"User {user_id} bought {quantity}x {item.name} for {total_cost} gold")
+        return True, f"Куплено: {quantity}x {item.name}"
     
-    async def get_item_info(self, item_id: int) -> Optional[Item]:
+    @staticmethod
+    async def _add_to_stack(session: AsyncSession, user_id: int, item: CatalogItem, quantity: int):
+        """Upsert a stackable item; runs after the payment, inside its write transaction"""
+        stack_id = (
+            select(func.min(UserItem.id))
+            .where(and_(UserItem.user_id == user_id, UserItem.item_id == item.id))
+            .scalar_subquery()
+        )
+        stacked = await session.execute(
+            update(UserItem)
+            .where(UserItem.id == stack_id)
+            .values(quantity=UserItem.quantity + quantity)
+        )
+        if stacked.rowcount == 0:
+            await session.execute(insert(UserItem).values(
+                user_id=user_id,
+                item_id=item.id,
+                quantity=quantity,
+                current_durability=item.durability
+            ))
+    
+    @staticmethod
+    async def _purchase_error(user_id: int, item: CatalogItem, quantity: int, session: AsyncSession) -> str:
+        """Reason a guarded purchase did not go through"""
+        user = await session.get(User, user_id)
+        if not user:
+            return "Пользователь не найден"
+        
+        # Check level requirement
+        if user.level < item.level_required:
+            return f"Требуемый уровень: {item.level_required}"
+        
+        total_cost = item.price * quantity
+        if user.money < total_cost:
+            return f"Недостаточно денег. Нужно: {total_cost}, есть: {user.money}"
+        
+        return "Недостаточно места в инвентаре"
+    
+    async def get_item_info(self, item_id: int) -> Optional[CatalogItem]:
         """Get detailed item information"""
-        async with AsyncSessionLocal() as session:
-            return await session.get(Item, item_id)
\ No newline at end of file
+        return (await shop_catalog.get()).get_item(item_id)
\ No newline at end of file
@@ -0,0 +1,47 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models.user import User
+from services.worker_bus import worker_bus
+from typing import Callable, Dict, Iterable, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'changed_users'
+
+# In-memory views of users (leaderboards, opponent index) subscribe here to
+# follow ORM changes; they only see changes that were committed. Other worker
+# processes learn the changed ids through the worker bus
+_subscribers: List[Callable[[Dict[int, User]], None]] = []
+
+def subscribe(callback: Callable[[Dict[int, User]], None]):
+    """Call `callback({user_id: user})` after each commit that inserted or changed users"""
+    _subscribers.append(callback)
+
+def loaded_values(user: User, fields: Iterable[str]) -> dict:
+    """Values of the given columns that are loaded; expired ones cannot be fetched after commit"""
+    state = inspect(user).dict
+    return {field: state[field] for field in fields if field in state}
+
+def _on_flush(session: Session, flush_context):
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, User):
+            session.info.setdefault(PENDING_KEY, {})[instance.id] = instance
+
+def _on_commit(session: Session):
+    users = session.info.pop(PENDING_KEY, None)
+    if not users:
+        return
+    worker_bus.publish('users', users)
+    for callback in _subscribers:
+        try:
+            callback(users)
+        except Exception as e:
+            logger.error(f"Error applying user changes in {callback}: {e}")
+
+def _on_rollback(session: Session):
+    session.info.pop(PENDING_KEY, None)
+
+event.listen(Session, "after_flush", _on_flush)
+event.listen(Session, "after_commit", _on_commit)
+event.listen(Session, "after_rollback", _on_rollback)
@@ -2,9 +2,12 @@ from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from config.database import AsyncSessionLocal
 from models.user import User
-from utils.formulas import GameFormulas
+from models.ledger import LedgerReasonEnum
+from services.ledger_service import money_ledger
+from services.leaderboard_service import leaderboards, TRACKED_FIELDS
+from utils.experience import experience_table
 from config.settings import settings
-from typing import Optional
+from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,6 +36,7 @@ class UserService:
                 inventory_size=settings.STARTING_INVENTORY_SIZE
             )
             session.add(user)
+            money_ledger.add(session, telegram_id, settings.STARTING_MONEY, LedgerReasonEnum.registration)
             await session.commit()
             await session.refresh(user)
             logger.info(f"Created new user: {user.name} (ID: {telegram_id})")
@@ -45,7 +49,23 @@ class UserService:
                 update(User).where(User.id == telegram_id).values(**kwargs)
             )
             await session.commit()
-            return result.rowcount > 0
+        
+        leaderboards.update_player(telegram_id, **{field: kwargs[field] for field in TRACKED_FIELDS if field in kwargs})
+        return result.rowcount > 0
+    
+    async def add_money(self, user_id: int, amount: int, reason: LedgerReasonEnum, ref_id: int = None) -> bool:
+        """Atomically change user money and record it in the ledger"""
+        async with AsyncSessionLocal() as session:
+            money = await session.scalar(
+                update(User).where(User.id == user_id).values(money=User.money + amount).returning(User.money)
+            )
+            if money is None:
+                return False
+            money_ledger.add(session, user_id, amount, reason, ref_id)
+            await session.commit()
+        
+        leaderboards.update_player(user_id, money=money)
+        return True
     
     async def add_experience(self, user_id: int, exp: int) -> bool:
         """Add experience and check for level up"""
@@ -54,18 +74,32 @@ class UserService:
             if not user:
                 return False
             
-            user.experience += exp
-            
-            # Check for level up
-            while user.experience >= GameFormulas.experience_for_level(user.level + 1):
-                user.experience -= GameFormulas.experience_for_level(user.level + 1)
-                user.level += 1
-                user.free_stat_points += settings.STAT_POINTS_PER_LEVEL
+            new_level, user.experience = experience_table.resolve(user.level, user.experience + exp)
+            if new_level > user.level:
+                user.free_stat_points += (new_level - user.level) * settings.STAT_POINTS_PER_LEVEL
+                user.level = new_level
                 logger.info(f"User {user.name} leveled up to {user.level}")
             
             await session.commit()
             return True
     
+    @staticmethod
+    def apply_experience(users: List[User], exp: List[int]):
+        """Add experience to users loaded in the caller's session, resolving all level ups at once"""
+        if not users:
+            return
+        
+        levels, experience = experience_table.resolve_many(
+            [user.level for user in users],
+            [user.experience + gained for user, gained in zip(users, exp)]
+        )
+        for user, new_level, leftover in zip(users, levels.tolist(), experience.tolist()):
+            if new_level > user.level:
+                user.free_stat_points += (new_level - user.level) * settings.STAT_POINTS_PER_LEVEL
+                user.level = new_level
+                logger.info(f"User {user.name} leveled up to {user.level}")
+            user.experience = leftover
+    
     async def distribute_stat_points(self, user_id: int, stats: dict) -> bool:
         """Distribute stat points"""
         async with AsyncSessionLocal() as session:
@@ -0,0 +1,86 @@
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+class WorkerBus:
+    """Tells the other worker processes which cached entries changed.
+
+    Each worker keeps its own in-memory views (leaderboards, opponent index).
+    A view publishes the ids it changed under a topic; the supervisor relays
+    the message to every other worker, whose subscribers reload those ids.
+    Ids published during one loop iteration go out as a single message.
+    Without a channel attached (single-process mode) publish() does nothing.
+    """
+
+    def __init__(self):
+        self._send: Optional[Callable[[dict], None]] = None
+        self._handlers: Dict[str, List[Callable]] = {}
+        self._pending: Dict[str, Set[int]] = {}
+        self._tasks = set()
+
+        # Metrics
+        self.published = 0
+        self.received = 0
+
+    @property
+    def attached(self) -> bool:
+        return self._send is not None
+
+    def attach(self, send: Callable[[dict], None]):
+        """Send published messages through `send` (the worker's supervisor connection)"""
+        self._send = send
+
+    def detach(self):
+        self._send = None
+        self._pending.clear()
+
+    def subscribe(self, topic: str, handler: Callable[[List[int]], None]):
+        """Call `handler(ids)` (plain or async) for ids another worker published under `topic`"""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic: str, ids: Iterable[int]):
+        """Announce changed ids to the other workers"""
+        if self._send is None:
+            return
+        pending = self._pending.get(topic)
+        if pending is None:
+            pending = self._pending[topic] = set()
+            asyncio.get_running_loop().call_soon(self._send_pending, topic)
+        pending.update(ids)
+
+    def _send_pending(self, topic: str):
+        ids = self._pending.pop(topic, None)
+        if not ids or self._send is None:
+            return
+        try:
+            self._send({'type': 'bus', 'topic': topic, 'ids': sorted(ids)})
+            self.published += 1
+        except Exception as e:
+            logger.error(f"Error publishing {len(ids)} changed {topic}: {e}")
+
+    def receive(self, message: dict):
+        """Apply a message relayed from another worker"""
+        self.received += 1
+        for handler in self._handlers.get(message['topic'], []):
+            try:
+                result = handler(message['ids'])
+            except Exception as e:
+                logger.error(f"Error applying changed {message['topic']} in {handler}: {e}")
+                continue
+            if inspect.isawaitable(result):
+                task = asyncio.get_running_loop().create_task(self._await(handler, result))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _await(handler, result):
+        try:
+            await result
+        except Exception as e:
+            logger.error(f"Error applying changes in {handler}: {e}")
+
+# Глобальный канал между воркерами
+worker_bus = WorkerBus()
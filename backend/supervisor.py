@@ -0,0 +1,251 @@
+"""
+Multi-process mode: a supervisor receives the updates (polling or webhook)
+and shards them by user over WORKERS worker processes on the same box.
+
+Each worker has its own event loop, dispatcher, in-memory views and
+background writers, so a heavy war resolution only stalls the players of
+one worker. All updates of a user go to the same worker and are handled in
+order there. Exactly one worker, elected through a file lock, runs the war
+scheduler and the notification queue; if it dies, another one takes over.
+
+Supervisor and workers talk over a Unix socket, one JSON message per line:
+updates go down to the workers, worker bus messages (changed players) go up
+and are relayed to every other worker.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from aiogram import Bot
+from aiogram.types import Update
+
+from config.settings import settings
+from services.worker_bus import worker_bus
+from utils.leader import LeaderLock
+from utils.metrics import metrics_server
+from utils.update_runner import KeyedTaskRunner
+from polling import poll_updates
+from webhook import create_update_app, serve_webhook, update_key
+
+logger = logging.getLogger(__name__)
+
+LEADER_RETRY = 5.0  # How often a follower tries to take over the war scheduler
+WATCH_INTERVAL = 1.0  # How often dead workers are looked for and restarted
+MAX_BACKLOG = 10000  # Updates kept for a worker that is (re)starting
+
+def encode(message: dict) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode() + b"\n"
+
+def shard_of(update: Update, workers: int) -> int:
+    """Worker of an update: all updates of a user (else chat) go to the same one"""
+    return update_key(update)[1] % workers
+
+class Supervisor:
+    """Starts the workers, routes updates to them and relays their bus messages"""
+
+    def __init__(self, workers: int, socket_path: str):
+        self.workers = workers
+        self.socket_path = socket_path
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Dict[int, asyncio.StreamWriter] = {}
+        self._backlog: Dict[int, Deque[bytes]] = {shard: deque() for shard in range(workers)}
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._watcher: Optional[asyncio.Task] = None
+        self._running = False
+
+        # Metrics
+        self.forwarded = 0
+        self.relayed = 0
+        self.dropped = 0
+        self.restarts = 0
+
+    def forward(self, update: Update):
+        """Send an update to the worker of its user"""
+        shard = shard_of(update, self.workers)
+        line = encode({'type': 'update', 'update': update.model_dump(mode='json', by_alias=True, exclude_none=True)})
+        self.forwarded += 1
+
+        writer = self._writers.get(shard)
+        if writer is not None and not writer.is_closing():
+            writer.write(line)
+            return
+
+        backlog = self._backlog[shard]
+        if len(backlog) >= MAX_BACKLOG:
+            backlog.popleft()
+            self.dropped += 1
+        backlog.append(line)
+
+    async def listen(self):
+        """Accept worker connections"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # left over by a crashed supervisor
+        self._server = await asyncio.start_unix_server(self._serve_worker, path=self.socket_path)
+
+    async def _serve_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        hello = json.loads(await reader.readline() or b'{}')
+        shard = hello.get('shard')
+        if shard not in self._backlog:
+            writer.close()
+            return
+
+        self._writers[shard] = writer
+        backlog = self._backlog[shard]
+        if backlog:
+            logger.info(f"Worker {shard} connected, sending {len(backlog)} queued updates")
+        while backlog:
+            writer.write(backlog.popleft())
+
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message['type'] == 'bus':
+                    self.relayed += 1
+                    for other, other_writer in list(self._writers.items()):
+                        if other != shard and not other_writer.is_closing():
+                            other_writer.write(line)
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Worker {shard} connection lost: {e}")
+        finally:
+            if self._writers.get(shard) is writer:
+                del self._writers[shard]
+            writer.close()
+
+    def start_workers(self):
+        self._running = True
+        for shard in range(self.workers):
+            self._spawn(shard)
+        self._watcher = asyncio.create_task(self._watch_workers())
+
+    def _spawn(self, shard: int):
+        # Fresh interpreters: nothing of the supervisor's state is inherited
+        context = multiprocessing.get_context('spawn')
+        process = context.Process(
+            target=worker_main, args=(shard, self.workers, self.socket_path), name=f"rpg-worker-{shard}"
+        )
+        process.start()
+        self._processes[shard] = process
+        logger.info(f"Started worker {shard} (pid {process.pid})")
+
+    async def _watch_workers(self):
+        while self._running:
+            await asyncio.sleep(WATCH_INTERVAL)
+            for shard, process in list(self._processes.items()):
+                if self._running and not process.is_alive():
+                    logger.error(f"Worker {shard} exited with code {process.exitcode}, restarting")
+                    self.restarts += 1
+                    self._spawn(shard)
+
+    async def stop(self, timeout: float = settings.SHUTDOWN_TIMEOUT + 5):
+        """Ask the workers to finish their updates and exit; kill the ones that do not"""
+        self._running = False
+        if self._watcher:
+            self._watcher.cancel()
+
+        for writer in list(self._writers.values()):
+            if not writer.is_closing():
+                writer.write(encode({'type': 'stop'}))
+
+        deadline = time.monotonic() + timeout
+        while any(process.is_alive() for process in self._processes.values()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        for shard, process in self._processes.items():
+            if process.is_alive():
+                logger.warning(f"Worker {shard} did not stop in {timeout}s, killing it")
+                process.kill()
+            process.join()
+
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        logger.info(f"Supervisor stopped: {self.forwarded} updates forwarded, "
+                    f"{self.relayed} bus messages relayed, {self.restarts} worker restarts")
+
+async def run_supervisor(workers: int):
+    """Serve the bot with `workers` worker processes until cancelled"""
+    from bot_main import create_bot, create_dispatcher
+
+    bot = create_bot()
+    allowed_updates = create_dispatcher().resolve_used_update_types()
+    supervisor = Supervisor(workers, settings.WORKER_SOCKET)
+    await supervisor.listen()
+    supervisor.start_workers()
+    logger.info(f"Supervisor started {workers} workers ({settings.BOT_MODE})")
+
+    try:
+        if settings.BOT_MODE == "webhook":
+            app = create_update_app(bot, settings.WEBHOOK_PATH, settings.WEBHOOK_SECRET, supervisor.forward)
+            await serve_webhook(bot, app, allowed_updates)
+        else:
+            await poll_updates(bot, allowed_updates, supervisor.forward)
+    finally:
+        await supervisor.stop()
+        await bot.session.close()
+
+async def run_for_leader(bot: Bot, lock: LeaderLock, shard: int):
+    """Wait to be elected, then run the war scheduler and the notification queue"""
+    from bot_main import start_leader_duties
+
+    while not lock.try_acquire():
+        await asyncio.sleep(LEADER_RETRY)
+    logger.info(f"Worker {shard} elected to run the war scheduler")
+    await start_leader_duties(bot)
+
+async def run_worker(shard: int, workers: int, socket_path: str):
+    """Handle the updates the supervisor sends until it says stop or goes away"""
+    from bot_main import create_bot, create_dispatcher, load_caches, shutdown
+    from services.ledger_service import money_ledger
+
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+
+    bot = create_bot()
+    dp = create_dispatcher()
+    await load_caches(shard, workers)
+    await money_ledger.start()
+    await metrics_server.start(f"{settings.METRICS_SOCKET}.{shard}")
+
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    worker_bus.attach(lambda message: writer.write(encode(message)))
+    writer.write(encode({'type': 'hello', 'shard': shard}))
+
+    lock = LeaderLock(settings.SCHEDULER_LOCK_PATH)
+    election = asyncio.create_task(run_for_leader(bot, lock, shard))
+    runner = KeyedTaskRunner(settings.MAX_CONCURRENT_UPDATES)
+    await dp.emit_startup(bot=bot, **dp.workflow_data)
+    logger.info(f"Worker {shard}/{workers} ready (pid {os.getpid()})")
+
+    try:
+        while line := await reader.readline():
+            message = json.loads(line)
+            if message['type'] == 'update':
+                update = Update.model_validate(message['update'], context={"bot": bot})
+                runner.submit(update_key(update), lambda update=update: dp.feed_update(bot, update))
+            elif message['type'] == 'bus':
+                worker_bus.receive(message)
+            elif message['type'] == 'stop':
+                break
+    finally:
+        worker_bus.detach()
+        election.cancel()
+        await shutdown(bot, dp, runner)
+        lock.release()
+        writer.close()
+
+def worker_main(shard: int, workers: int, socket_path: str):
+    """Entry point of a worker process"""
+    from utils.logging_config import setup_logging
+
+    setup_logging()
+    try:
+        asyncio.run(run_worker(shard, workers, socket_path))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass  # Ctrl+C reaches the whole process group; the supervisor restarts or stops us
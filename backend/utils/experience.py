@@ -0,0 +1,56 @@
+from bisect import bisect_right
+from typing import TYPE_CHECKING, List, Tuple
+from config.settings import settings
+from utils.formulas import GameFormulas
+
+if TYPE_CHECKING:
+    import numpy as np
+
+class ExperienceTable:
+    """Cumulative experience curve, built once; level lookups are O(log n)
+
+    User.experience is the progress inside the current level: reaching
+    level + 1 costs GameFormulas.experience_for_level(level + 1).
+    """
+
+    def __init__(self, max_level: int):
+        self.max_level = max_level
+
+        # cumulative[level - 1] = total experience needed to reach `level` from level 1
+        cumulative = [0]
+        for level in range(2, max_level + 1):
+            cumulative.append(cumulative[-1] + GameFormulas.experience_for_level(level))
+        self.cumulative = cumulative
+        self._cumulative_array = None  # numpy copy, built by the first resolve_many()
+
+    def total_for_level(self, level: int) -> int:
+        """Total experience needed to reach a level"""
+        return self.cumulative[min(max(level, 1), self.max_level) - 1]
+
+    def for_next_level(self, level: int) -> int:
+        """Experience needed to go from `level` to the next one"""
+        if level >= self.max_level:
+            return GameFormulas.experience_for_level(level + 1)
+        return self.cumulative[level] - self.cumulative[level - 1]
+
+    def resolve(self, level: int, experience: int) -> Tuple[int, int]:
+        """Level and in-level experience after gaining experience at `level`"""
+        total = self.total_for_level(level) + experience
+        new_level = max(level, min(bisect_right(self.cumulative, total), self.max_level))
+        return new_level, total - self.total_for_level(new_level)
+
+    def resolve_many(self, levels: List[int], experience: List[int]) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Vectorized resolve() for a batch of players"""
+        # numpy is only needed for batch rewards, keep it off the startup path
+        import numpy as np
+        if self._cumulative_array is None:
+            self._cumulative_array = np.array(self.cumulative, dtype=np.int64)
+
+        levels = np.clip(np.asarray(levels, dtype=np.int64), 1, self.max_level)
+        totals = self._cumulative_array[levels - 1] + np.asarray(experience, dtype=np.int64)
+        new_levels = np.searchsorted(self._cumulative_array, totals, side='right')
+        new_levels = np.maximum(levels, np.minimum(new_levels, self.max_level))
+        return new_levels, totals - self._cumulative_array[new_levels - 1]
+
+# Таблица опыта до максимального уровня
+experience_table = ExperienceTable(settings.MAX_LEVEL)
@@ -9,8 +9,13 @@ class GameFormulas:
     
     @staticmethod
     def total_experience_for_level(level: int) -> int:
-        """Calculate total experience needed to reach level"""
-        return sum(GameFormulas.experience_for_level(i) for i in range(1, level))
+        """Total experience to go from level 1 to `level`: the costs of levels 2..level.
+        
+        Reaching level + 1 costs experience_for_level(level + 1), as add_experience
+        spends it; the cost of level 1 is not included.
+        """
+        from utils.experience import experience_table
+        return experience_table.total_for_level(level)
     
     @staticmethod
     def calculate_damage(attacker_stats: dict, defender_stats: dict, skill_multiplier: float = 1.0) -> int:
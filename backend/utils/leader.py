@@ -0,0 +1,46 @@
+import fcntl
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class LeaderLock:
+    """Exclusive lock on a file, held by at most one process of the box.
+
+    Used to elect the worker that runs the war scheduler. The kernel drops
+    the lock when its holder exits or crashes, so another worker can take
+    over by calling try_acquire() again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if nobody holds it; never blocks"""
+        if self._fd is not None:
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        # Holder's pid, for whoever looks at the file
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
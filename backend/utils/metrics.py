@@ -0,0 +1,247 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+READ_TIMEOUT = 2.0  # Seconds the monitor waits for a process's snapshot
+
+class Metric(ABC):
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> list:
+        """[label values, value] per label set"""
+
+    def describe(self) -> dict:
+        return {'name': self.name, 'type': self.type, 'help': self.help,
+                'labels': list(self.labelnames), 'samples': self.samples()}
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        return [[list(key), value] for key, value in self._values.items()]
+
+class Gauge(Metric):
+    """A value read when a snapshot is taken, from `set()` or from a function per label set"""
+    type = 'gauge'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels):
+        self._functions[self._key(labels)] = function
+
+    def samples(self) -> list:
+        values = dict(self._values)
+        for key, function in self._functions.items():
+            try:
+                values[key] = function()
+            except Exception as e:
+                logger.error(f"Error reading gauge {self.name}{key}: {e}")
+        return [[list(key), value] for key, value in values.items()]
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple[str, ...], list] = {}  # key -> [count per bucket (+Inf last), sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def describe(self) -> dict:
+        described = super().describe()
+        described['buckets'] = list(self.buckets)
+        return described
+
+    def samples(self) -> list:
+        return [[list(key), {'counts': list(counts), 'sum': total}] for key, (counts, total) in self._values.items()]
+
+class MetricsRegistry:
+    """Counters, gauges and histograms of this process; plain dicts, no locks (one event loop)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._fields: Dict[str, Callable[[], object]] = {}
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets)
+
+    def field(self, name: str, function: Callable[[], object]):
+        """JSON value read when a snapshot is taken, for the web monitor; not exported to Prometheus"""
+        self._fields[name] = function
+
+    def snapshot(self) -> dict:
+        fields = {}
+        for name, function in self._fields.items():
+            try:
+                fields[name] = function()
+            except Exception as e:
+                logger.error(f"Error reading snapshot field {name}: {e}")
+        return {'pid': os.getpid(), 'time': time.time(), 'fields': fields,
+                'metrics': [metric.describe() for metric in self._metrics.values()]}
+
+class MetricsServer:
+    """Hands a JSON snapshot of the registry to whoever connects to a Unix socket.
+
+    The web monitor reads it instead of querying the game database.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.path: Optional[str] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, path: str):
+        if self._server is not None:
+            return
+        if os.path.exists(path):
+            os.unlink(path)  # left behind by a killed process
+        self._server = await asyncio.start_unix_server(self._serve, path=path)
+        self.path = path
+        logger.info(f"Metrics served on {path}")
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            writer.write(json.dumps(self.registry.snapshot()).encode() + b"\n")
+            await writer.drain()
+        except Exception as e:
+            logger.warning(f"Error serving metrics: {e}")
+        finally:
+            writer.close()
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+async def read_snapshot(path: str, timeout: float = READ_TIMEOUT) -> dict:
+    """Snapshot served on `path` by a bot process"""
+    reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(path), timeout)
+    try:
+        return json.loads(await asyncio.wait_for(reader.readline(), timeout))
+    finally:
+        writer.close()
+
+def metrics_sockets(path: str) -> Dict[str, str]:
+    """Sockets served at `path` by the bot process or its workers ("{path}.{shard}"), by worker"""
+    sockets = {}
+    if os.path.exists(path):
+        sockets['main'] = path
+    for worker_path in sorted(glob.glob(glob.escape(path) + ".*")):
+        sockets[worker_path.rsplit(".", 1)[1]] = worker_path
+    return sockets
+
+async def collect_snapshots(path: str) -> Dict[str, dict]:
+    """Snapshots of every bot process answering on its socket; stale sockets are skipped"""
+    sockets = metrics_sockets(path)
+    results = await asyncio.gather(*(read_snapshot(socket) for socket in sockets.values()), return_exceptions=True)
+    return {worker: result for worker, result in zip(sockets, results) if not isinstance(result, Exception)}
+
+def gauge_values(snapshot: dict, name: str) -> Dict[Tuple[str, ...], float]:
+    """Samples of a counter or gauge in a snapshot, by label values"""
+    for metric in snapshot['metrics']:
+        if metric['name'] == name:
+            return {tuple(values): value for values, value in metric['samples']}
+    return {}
+
+def _format_labels(names: List[str], values: List[str]) -> str:
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(snapshots: Dict[str, dict]) -> str:
+    """Prometheus text format of the snapshots of several processes.
+
+    With more than one process every sample gets a `worker` label with the
+    key of its snapshot, so the series of the workers stay apart.
+    """
+    families: Dict[str, dict] = {}
+    lines = []
+    for worker, snapshot in snapshots.items():
+        extra = ['worker'] if len(snapshots) > 1 else []
+        for metric in snapshot['metrics']:
+            family = families.setdefault(metric['name'], {'meta': metric, 'lines': []})
+            names = metric['labels'] + extra
+            for values, value in metric['samples']:
+                values = values + [worker] * len(extra)
+                if metric['type'] == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(metric['buckets'] + ['+Inf'], value['counts']):
+                        cumulative += count
+                        labels = _format_labels(names + ['le'], values + [bound])
+                        family['lines'].append(f"{metric['name']}_bucket{labels} {cumulative}")
+                    labels = _format_labels(names, values)
+                    family['lines'].append(f"{metric['name']}_sum{labels} {_format_value(value['sum'])}")
+                    family['lines'].append(f"{metric['name']}_count{labels} {cumulative}")
+                else:
+                    family['lines'].append(f"{metric['name']}{_format_labels(names, values)} {_format_value(value)}")
+
+    for name, family in families.items():
+        lines.append(f"# HELP {name} {family['meta']['help']}")
+        lines.append(f"# TYPE {name} {family['meta']['type']}")
+        lines.extend(family['lines'])
+    return "\n".join(lines) + "\n"
+
+# Глобальный реестр метрик процесса
+metrics = MetricsRegistry()
+metrics_server = MetricsServer(metrics)
@@ -0,0 +1,35 @@
+import time
+
+class TokenBucket:
+    """Token bucket: `rate` tokens per second, bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, now: float = None) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float = None) -> float:
+        """Consume a token if available, returns the wait time otherwise"""
+        wait = self.delay(now)
+        if wait == 0.0:
+            self.tokens -= 1
+        return wait
+
+    def is_full(self, now: float = None) -> bool:
+        """Bucket is idle and can be dropped without changing behaviour"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return self.tokens >= self.capacity
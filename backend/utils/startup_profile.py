@@ -0,0 +1,43 @@
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Tuple
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Our own packages are broken down per module, libraries per package
+GAME_PACKAGES = {'config', 'handlers', 'keyboards', 'middlewares', 'models', 'services', 'utils'}
+
+def _group(module: str) -> str:
+    parts = module.split('.')
+    if parts[0] in GAME_PACKAGES:
+        return '.'.join(parts[:2])
+    return parts[0]
+
+def import_breakdown(code: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """Run `code` in a fresh interpreter with -X importtime.
+
+    Returns the total import time and the self time of every module summed
+    by group (a package of ours or a library), slowest first, in seconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=os.environ, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import profiling failed: {result.stderr.strip().splitlines()[-1:]}")
+
+    groups = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, module = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        seconds = int(self_us) / 1e6
+        groups[_group(module.strip())] += seconds
+        total += seconds
+    return total, sorted(groups.items(), key=lambda item: item[1], reverse=True)
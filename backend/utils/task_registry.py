@@ -0,0 +1,79 @@
+from typing import Awaitable, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class TaskRegistry:
+    """Keeps the background tasks started outside of an update handler.
+
+    Work (a battle being resolved) is waited for on shutdown; timers (a round
+    timeout sleeping for 50 s) are cancelled right away, the state they would
+    act on is in the database.
+    """
+
+    def __init__(self):
+        self._work: Set[asyncio.Task] = set()
+        self._timers: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.spawned = 0
+        self.completed = 0
+        self.failed = 0
+        self.abandoned = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._work)
+
+    def spawn(self, coro: Awaitable, name: Optional[str] = None, timer: bool = False) -> asyncio.Task:
+        """Run `coro` in the background; failures are logged instead of lost"""
+        task = asyncio.get_running_loop().create_task(coro, name=name)
+        tasks = self._timers if timer else self._work
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        task.add_done_callback(self._done)
+        self.spawned += 1
+        return task
+
+    def _done(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            self.completed += 1
+        else:
+            self.failed += 1
+            logger.error(f"Background task {task.get_name()} failed: {error!r}")
+
+    async def drain(self, timeout: float) -> Tuple[int, int]:
+        """Cancel the timers and wait up to `timeout` seconds for the work.
+
+        Work still running at the deadline is cancelled. Returns how many
+        tasks were waited for and how many of them were abandoned.
+        """
+        for task in list(self._timers):
+            task.cancel()
+
+        deadline = time.monotonic() + timeout
+        waited = set()
+        # A finishing task may spawn another one, e.g. a battle scheduling its rewards
+        while self._work:
+            waited |= self._work
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.wait(list(self._work), timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+
+        abandoned = list(self._work)
+        for task in abandoned:
+            task.cancel()
+            logger.warning(f"Abandoned background task {task.get_name()}")
+        if abandoned:
+            await asyncio.wait(abandoned)
+        self.abandoned += len(abandoned)
+        return len(waited), len(abandoned)
+
+# Глобальный реестр фоновых задач
+background_tasks = TaskRegistry()
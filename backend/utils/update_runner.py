@@ -0,0 +1,84 @@
+from collections import deque
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class KeyedTaskRunner:
+    """Runs jobs concurrently, at most `max_concurrency` at a time, but one at a time per key.
+
+    Jobs of the same key (a user) run in submission order, so two taps of one
+    player are never handled in parallel or out of order; different players
+    are handled side by side.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queues: Dict[Hashable, deque] = {}
+        self._workers = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    @property
+    def pending_count(self) -> int:
+        return self.submitted - self.completed - self.failed - self.cancelled
+
+    def submit(self, key: Hashable, job: Callable[[], Awaitable]):
+        """Queue a job (a coroutine factory) behind the other jobs of its key"""
+        self.submitted += 1
+        self._idle.clear()
+
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append(job)
+            return
+
+        self._queues[key] = deque([job])
+        worker = asyncio.create_task(self._drain(key))
+        self._workers.add(worker)
+        worker.add_done_callback(self._workers.discard)
+
+    async def _drain(self, key: Hashable):
+        queue = self._queues[key]
+        while queue:
+            job = queue[0]
+            async with self._semaphore:
+                try:
+                    await job()
+                    self.completed += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Error handling update for {key}: {e}")
+            queue.popleft()
+
+        del self._queues[key]
+        if not self._queues:
+            self._idle.set()
+
+    async def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued job has finished, returns False on timeout"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def cancel(self) -> int:
+        """Cancel the jobs still queued or running, returns how many were dropped"""
+        dropped = self.pending_count
+        workers = list(self._workers)
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._queues.clear()
+        self._idle.set()
+        self.cancelled += dropped
+        return dropped
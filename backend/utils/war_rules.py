@@ -0,0 +1,101 @@
+from typing import Dict, List, Tuple
+
+class WarRules:
+    """Kingdom war resolution rules shared by the war service and the offline simulator"""
+
+    MULTI_ATTACK_DEFENSE_BUFF = 1.3  # Defense armor buff when several kingdoms attack
+    MONEY_LOSS_RATE = 0.4  # Share of money every defending player loses per broken defense
+    NON_PARTICIPANT_PENALTY_RATE = 0.4  # Additional loss for players who did not defend
+    MIN_DAMAGE_RATE = 0.1  # Minimum damage as a share of attack power
+    BASE_WAR_EXPERIENCE = 75  # Experience per level for a full share of the spoils
+
+    @staticmethod
+    def defense_buff(num_attacking: int) -> float:
+        """Defense multiplier for the number of attacking kingdoms"""
+        return WarRules.MULTI_ATTACK_DEFENSE_BUFF if num_attacking > 1 else 1.0
+
+    @staticmethod
+    def squad_power(stats: dict) -> int:
+        """Total power used to order attacking kingdoms"""
+        return stats['total_strength'] + stats['total_armor'] + stats['total_agility']
+
+    @staticmethod
+    def player_power(stats: dict) -> int:
+        """Individual power used to split the spoils inside a squad"""
+        return stats['strength'] + stats['armor'] + stats['agility']
+
+    @staticmethod
+    def resolve_battles(defending_kingdom: str, attack_stats: Dict[str, dict],
+                        defense_stats: dict, defense_buff: float) -> Tuple[List[dict], List[str]]:
+        """Resolve attack waves (weakest first), returns battle results and winning kingdoms"""
+        # Sort attacking kingdoms by total stats (weakest first)
+        sorted_attackers = sorted(
+            attack_stats.items(),
+            key=lambda x: WarRules.squad_power(x[1])
+        )
+
+        # Apply defense buff
+        defense_armor = int(defense_stats['total_armor'] * defense_buff)
+        defense_power = defense_stats['total_strength'] + defense_stats['total_agility']
+        full_defense_hp = defense_stats['total_hp']
+
+        battle_results = []
+        winners = []
+        current_defense_hp = full_defense_hp
+
+        # Process attacks in order (weakest to strongest)
+        for kingdom, kingdom_stats in sorted_attackers:
+            if current_defense_hp <= 0:
+                # Defense already broken, this kingdom gets nothing
+                battle_results.append({
+                    'attacker': kingdom,
+                    'defender': defending_kingdom,
+                    'result': 'too_late',
+                    'message': f'{kingdom} опоздало - город уже разграблен!'
+                })
+                continue
+
+            attack_power = kingdom_stats['total_strength'] + kingdom_stats['total_agility']
+
+            damage_to_defense = max(attack_power - defense_armor, attack_power * WarRules.MIN_DAMAGE_RATE)
+            damage_to_attacker = max(defense_power - kingdom_stats['total_armor'], defense_power * WarRules.MIN_DAMAGE_RATE)
+
+            current_defense_hp -= damage_to_defense
+
+            if current_defense_hp <= 0:
+                # Attacker breaks through defense
+                winners.append(kingdom)
+                battle_results.append({
+                    'attacker': kingdom,
+                    'defender': defending_kingdom,
+                    'result': 'victory',
+                    'damage_dealt': damage_to_defense,
+                    'message': f'{kingdom} сломало защиту {defending_kingdom}!'
+                })
+            else:
+                # Defense holds
+                battle_results.append({
+                    'attacker': kingdom,
+                    'defender': defending_kingdom,
+                    'result': 'defeat',
+                    'damage_dealt': damage_to_defense,
+                    'damage_received': damage_to_attacker,
+                    'message': f'{kingdom} не смогло сломать защиту {defending_kingdom}'
+                })
+
+            # Restore defense HP to full for next wave
+            current_defense_hp = full_defense_hp
+
+        return battle_results, winners
+
+    @staticmethod
+    def reward_share(player_power: int, squad_power: int, squad_size: int) -> float:
+        """Share of the squad spoils for one attacker"""
+        if squad_power > 0:
+            return player_power / squad_power
+        return 1.0 / squad_size
+
+    @staticmethod
+    def war_experience(share: float, level: int) -> int:
+        """Experience reward for an attacker's share"""
+        return int(WarRules.BASE_WAR_EXPERIENCE * share * level)
@@ -5,22 +5,44 @@ Enhanced Kingdom War Scheduler - запускает войны в указанн
 import asyncio
 from datetime import datetime, timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.triggers.cron import CronTrigger
 from services.enhanced_kingdom_war_service import EnhancedKingdomWarService
+from services.notification_service import notification_queue
+from config.settings import settings, GameConstants
+from utils.metrics import metrics
+from utils.task_registry import background_tasks
 import logging
 import pytz
+import time
 
 logger = logging.getLogger(__name__)
 
+war_resolution = metrics.histogram(
+    'rpg_war_resolution_seconds', 'Time to resolve one kingdom war',
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
+
+PRE_WAR_MISFIRE_GRACE = 25 * 60  # Уведомление бесполезно после начала войны
+RESTORE_AFTER = 5  # Minutes after the war start when participants get their HP/MP back
+
 class EnhancedKingdomWarScheduler:
     def __init__(self, bot=None):
-        self.scheduler = AsyncIOScheduler()
-        self.war_service = EnhancedKingdomWarService()
         self.tashkent_tz = pytz.timezone('Asia/Tashkent')
+        # Jobs are persisted in the game DB so a restart does not lose a run that was due
+        self.scheduler = AsyncIOScheduler(
+            jobstores={'default': SQLAlchemyJobStore(url=settings.SCHEDULER_DATABASE_URL, tablename='scheduler_jobs')},
+            job_defaults={'coalesce': True, 'misfire_grace_time': settings.WAR_MISFIRE_GRACE},
+            timezone=self.tashkent_tz
+        )
+        self.war_service = EnhancedKingdomWarService()
         self.bot = bot  # For sending notifications
     
     def start(self):
         """Запуск планировщика войн"""
+        # Paused until every job is registered, so persisted missed runs are not replaced
+        self.scheduler.start(paused=True)
+        
         # Планировщик уведомлений за 30 минут до войн
         for hour in [8, 13, 18]:
             # Pre-war notifications (30 minutes before)
@@ -33,51 +55,75 @@ class EnhancedKingdomWarScheduler:
             elif hour == 18:
                 pre_war_hour = 17
                 
-            self.scheduler.add_job(
-                self.send_pre_war_notifications,
+            self._ensure_job(
+                run_pre_war_notifications,
                 trigger=CronTrigger(hour=pre_war_hour, minute=30, timezone=self.tashkent_tz),
-                id=f'pre_war_notification_{hour}',
-                args=[hour]
+                job_id=f'pre_war_notification_{hour}',
+                args=[hour],
+                misfire_grace_time=PRE_WAR_MISFIRE_GRACE
             )
             
             # War start
-            self.scheduler.add_job(
-                self.process_scheduled_wars,
+            self._ensure_job(
+                run_process_scheduled_wars,
                 trigger=CronTrigger(hour=hour, minute=0, timezone=self.tashkent_tz),
-                id=f'enhanced_kingdom_war_{hour}',
+                job_id=f'enhanced_kingdom_war_{hour}',
                 args=[hour]
             )
         
         # Планирование войн на завтра каждый день в полночь
-        self.scheduler.add_job(
-            self.schedule_tomorrow_wars,
+        self._ensure_job(
+            run_schedule_tomorrow_wars,
             trigger=CronTrigger(hour=0, minute=0, timezone=self.tashkent_tz),
-            id='schedule_enhanced_wars'
+            job_id='schedule_enhanced_wars',
+            misfire_grace_time=None  # Idempotent, always catch up
         )
         
         # Планирование войн на сегодня при запуске
         self.scheduler.add_job(
-            self.schedule_today_wars,
-            id='schedule_today_enhanced_wars'
+            run_schedule_today_wars,
+            id='schedule_today_enhanced_wars',
+            replace_existing=True
         )
         
         # HP/MP restoration after wars (5 minutes after war end)
         for hour in [8, 13, 18]:
             restore_hour = hour
-            restore_minute = 5
+            restore_minute = RESTORE_AFTER
             if hour == 23:  # Edge case for midnight
                 restore_hour = 0
                 
-            self.scheduler.add_job(
-                self.restore_participants,
+            self._ensure_job(
+                run_restore_participants,
                 trigger=CronTrigger(hour=restore_hour, minute=restore_minute, timezone=self.tashkent_tz),
-                id=f'restore_participants_{hour}',
+                job_id=f'restore_participants_{hour}',
                 args=[hour]
             )
         
-        self.scheduler.start()
+        self.scheduler.resume()
         logger.info("Enhanced Kingdom War Scheduler started")
     
+    def _ensure_job(self, func, trigger, job_id: str, args=None, **kwargs):
+        """Add a cron job, keeping the persisted one (and its missed run) if nothing changed"""
+        args = tuple(args or ())
+        job = self.scheduler.get_job(job_id)
+        if job and job.func is func and job.args == args and repr(job.trigger) == repr(trigger):
+            return job
+        
+        # New job: pick up a fire time missed within the grace period (e.g. first start after 08:00)
+        grace = kwargs.get('misfire_grace_time', settings.WAR_MISFIRE_GRACE)
+        now = datetime.now(self.tashkent_tz)
+        catch_up_from = now - timedelta(seconds=grace) if grace else now
+        return self.scheduler.add_job(
+            func,
+            trigger=trigger,
+            id=job_id,
+            args=args,
+            next_run_time=trigger.get_next_fire_time(None, catch_up_from),
+            replace_existing=True,
+            **kwargs
+        )
+    
     async def send_pre_war_notifications(self, war_hour: int):
         """Отправка уведомлений за 30 минут до войны"""
         try:
@@ -108,7 +154,6 @@ class EnhancedKingdomWarScheduler:
             )
             
             for war in war_announcements:
-                from config.settings import GameConstants
                 kingdom_info = GameConstants.KINGDOMS.get(war.defending_kingdom, {})
                 emoji = kingdom_info.get('emoji', '🏰')
                 name = kingdom_info.get('name', war.defending_kingdom)
@@ -131,6 +176,13 @@ class EnhancedKingdomWarScheduler:
                     logger.error(f"Error sending war notification to channel: {e}")
             else:
                 logger.warning("War channel ID not configured")
+            
+            # Personal reminders for registered players
+            participations = await self.war_service.get_war_participations([war.id for war in war_announcements])
+            await notification_queue.enqueue_many([
+                (participation.user_id, self._pre_war_personal_text(participation, war_hour))
+                for participation in participations
+            ])
                 
         except Exception as e:
             logger.error(f"Error sending pre-war notifications for {war_hour}:00: {e}")
@@ -149,7 +201,9 @@ class EnhancedKingdomWarScheduler:
                 # Проверить, что время войны соответствует текущему часу
                 war_time_tashkent = war.scheduled_time.astimezone(self.tashkent_tz)
                 if war_time_tashkent.hour == hour:
+                    started = time.monotonic()
                     success = await self.war_service.start_enhanced_war(war.id)
+                    war_resolution.observe(time.monotonic() - started)
                     if success:
                         wars_started += 1
                         war_results.append(war.id)
@@ -164,8 +218,22 @@ class EnhancedKingdomWarScheduler:
                     except Exception as e:
                         logger.error(f"Error sending war summary to channel: {e}")
             
+            # Personal results for every participant
+            if war_results:
+                wars = {war.id: war for war in wars}
+                participations = await self.war_service.get_war_participations(war_results)
+                await notification_queue.enqueue_many([
+                    (participation.user_id, self._war_result_personal_text(participation, wars[participation.war_id]))
+                    for participation in participations
+                ])
+            
             logger.info(f"Processed {wars_started} enhanced wars at {hour}:00 Tashkent time")
             
+            # A misfired run resolves its wars after the restore job of the hour has already run
+            restore_time = now.replace(hour=hour, minute=RESTORE_AFTER, second=0, microsecond=0)
+            if datetime.now(self.tashkent_tz) >= restore_time:
+                await self.restore_participants(hour)
+            
         except Exception as e:
             logger.error(f"Error processing enhanced wars at {hour}:00: {e}")
     
@@ -175,6 +243,9 @@ class EnhancedKingdomWarScheduler:
             today = datetime.now(self.tashkent_tz)
             await self.war_service.schedule_daily_wars(today)
             logger.info("Scheduled enhanced wars for today")
+            
+            # Startup pass: today's wars that were missed must not stay scheduled
+            await self.reconcile_overdue_wars()
         except Exception as e:
             logger.error(f"Error scheduling today's enhanced wars: {e}")
     
@@ -184,85 +255,117 @@ class EnhancedKingdomWarScheduler:
             tomorrow = datetime.now(self.tashkent_tz) + timedelta(days=1)
             await self.war_service.schedule_daily_wars(tomorrow)
             logger.info("Scheduled enhanced wars for tomorrow")
+            
+            await self.reconcile_overdue_wars()
         except Exception as e:
             logger.error(f"Error scheduling tomorrow's enhanced wars: {e}")
     
     async def restore_participants(self, war_hour: int):
         """Восстановить HP/MP участников через 5 минут после войны"""
         try:
-            from datetime import datetime, timedelta
+            # Every finished war not restored yet, including ones resolved late
+            total_restored = await self.war_service.restore_war_participants()
             
-            # Найти завершённые войны этого часа и восстановить участников
-            end_time = datetime.now(self.tashkent_tz).replace(hour=war_hour, minute=5, second=0)
-            
-            # Get recently finished wars
-            from config.database import AsyncSessionLocal
-            from models.kingdom_war import KingdomWar, WarParticipation, WarStatusEnum
-            from models.user import User
-            from sqlalchemy import select, and_
-            
-            async with AsyncSessionLocal() as session:
-                # Find wars that finished around this time
-                search_time_start = end_time - timedelta(minutes=10)
-                search_time_end = end_time + timedelta(minutes=10)
-                
-                finished_wars = await session.execute(
-                    select(KingdomWar).where(
-                        and_(
-                            KingdomWar.status == WarStatusEnum.finished,
-                            KingdomWar.finished_at >= search_time_start,
-                            KingdomWar.finished_at <= search_time_end
-                        )
-                    )
-                )
+            if total_restored > 0:
+                logger.info(f"Restored HP/MP for {total_restored} war participants")
                 
-                wars_list = finished_wars.scalars().all()
-                total_restored = 0
-                
-                for war in wars_list:
-                    # Get all participants
-                    participants = await session.execute(
-                        select(WarParticipation).where(WarParticipation.war_id == war.id)
+                # Send notification to war channel if configured
+                if self.bot and self.war_service.war_channel_id:
+                    restoration_message = (
+                        f"🩹 **ВОССТАНОВЛЕНИЕ УЧАСТНИКОВ**\n\n"
+                        f"⚡ Восстановлено здоровье и мана у {total_restored} участников войн\n"
+                        f"🕐 Время: {datetime.now(self.tashkent_tz).strftime('%H:%M')} (Ташкентское время)\n\n"
+                        f"Все участники готовы к новым сражениям!"
                     )
-                    
-                    for participation in participants.scalars():
-                        # Restore HP and MP to full
-                        user = await session.get(User, participation.user_id)
-                        if user:
-                            user.current_hp = user.hp
-                            user.current_mana = user.mana
-                            total_restored += 1
-                
-                await session.commit()
-                
-                if total_restored > 0:
-                    logger.info(f"Restored HP/MP for {total_restored} war participants")
-                    
-                    # Send notification to war channel if configured
-                    if self.bot and self.war_service.war_channel_id:
-                        restoration_message = (
-                            f"🩹 **ВОССТАНОВЛЕНИЕ УЧАСТНИКОВ**\n\n"
-                            f"⚡ Восстановлено здоровье и мана у {total_restored} участников войн\n"
-                            f"🕐 Время: {end_time.strftime('%H:%M')} (Ташкентское время)\n\n"
-                            f"Все участники готовы к новым сражениям!"
-                        )
-                        try:
-                            await self.bot.send_message(self.war_service.war_channel_id, restoration_message)
-                        except Exception as e:
-                            logger.error(f"Error sending restoration notification: {e}")
+                    try:
+                        await self.bot.send_message(self.war_service.war_channel_id, restoration_message)
+                    except Exception as e:
+                        logger.error(f"Error sending restoration notification: {e}")
             
         except Exception as e:
             logger.error(f"Error restoring participants for {war_hour}:00 wars: {e}")
     
+    async def reconcile_overdue_wars(self):
+        """Закрыть пропущенные во время простоя войны и завершить прерванные сбоем"""
+        try:
+            # Wars still inside the grace period are started by their misfired job
+            overdue_before = datetime.utcnow() - timedelta(seconds=settings.WAR_MISFIRE_GRACE)
+            cancelled = await self.war_service.cancel_overdue_wars(overdue_before)
+            if cancelled:
+                logger.warning(f"Cancelled {cancelled} overdue wars missed while the bot was down")
+            
+            # Wars whose resolution was cut short by a crash are resolved now
+            resumed = await self.war_service.resume_interrupted_wars(overdue_before)
+            if resumed:
+                logger.warning(f"Resolved interrupted wars {resumed}")
+                await self.restore_participants(datetime.now(self.tashkent_tz).hour)
+        except Exception as e:
+            logger.error(f"Error reconciling overdue wars: {e}")
+    
+    def _pre_war_personal_text(self, participation, war_hour: int) -> str:
+        """Личное напоминание о заявке на войну"""
+        role_text = "🗡️ Атака" if participation.role.name == 'attacker' else "🛡️ Защита"
+        return (
+            f"⚔️ <b>Вы заявлены на войну королевств!</b>\n\n"
+            f"{role_text}\n"
+            f"🕐 Начало: <b>{war_hour}:00</b> (Ташкентское время)\n\n"
+            f"Другие действия заблокированы до окончания битвы."
+        )
+    
+    def _war_result_personal_text(self, participation, war) -> str:
+        """Личный итог войны для участника"""
+        kingdom_info = GameConstants.KINGDOMS.get(war.defending_kingdom, {})
+        kingdom_name = f"{kingdom_info.get('emoji', '🏰')} {kingdom_info.get('name', war.defending_kingdom)}"
+        
+        if participation.role.name == 'attacker':
+            if participation.money_gained:
+                return (
+                    f"🏆 <b>Ваш отряд победил!</b>\n\n"
+                    f"Защита {kingdom_name} сломлена.\n"
+                    f"💰 +{participation.money_gained} золота\n"
+                    f"⚡ +{participation.exp_gained} опыта"
+                )
+            return f"❌ <b>Атака отбита</b>\n\nВаш отряд не смог сломать защиту {kingdom_name}."
+        
+        if participation.money_lost:
+            return (
+                f"💔 <b>Защита пала</b>\n\n"
+                f"{kingdom_name} разграблено.\n"
+                f"💰 -{participation.money_lost} золота"
+            )
+        return f"🛡️ <b>Защита выстояла!</b>\n\n{kingdom_name} в безопасности."
+    
     def set_bot(self, bot):
         """Установить бота для отправки уведомлений"""
         self.bot = bot
         self.war_service.bot = bot
+        notification_queue.set_bot(bot)
     
     def stop(self):
         """Остановка планировщика"""
+        if not self.scheduler.running:
+            return  # Another worker runs the wars
         self.scheduler.shutdown()
         logger.info("Enhanced Kingdom War Scheduler stopped")
 
 # Глобальный экземпляр планировщика
-enhanced_war_scheduler = EnhancedKingdomWarScheduler()
\ No newline at end of file
+enhanced_war_scheduler = EnhancedKingdomWarScheduler()
+
+# Job callables are stored by reference in the persistent job store, so they must be module level
+async def run_pre_war_notifications(war_hour: int):
+    await enhanced_war_scheduler.send_pre_war_notifications(war_hour)
+
+async def run_process_scheduled_wars(hour: int):
+    # The scheduler cancels running jobs when it stops; a war being resolved is finished on shutdown instead
+    await asyncio.shield(background_tasks.spawn(
+        enhanced_war_scheduler.process_scheduled_wars(hour), name=f"war-{hour}"
+    ))
+
+async def run_schedule_today_wars():
+    await enhanced_war_scheduler.schedule_today_wars()
+
+async def run_schedule_tomorrow_wars():
+    await enhanced_war_scheduler.schedule_tomorrow_wars()
+
+async def run_restore_participants(war_hour: int):
+    await enhanced_war_scheduler.restore_participants(war_hour)
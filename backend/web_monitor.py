@@ -3,50 +3,151 @@
 Web Monitor for RPG Telegram Bot
 """
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import select, func
-from config.database import AsyncSessionLocal
-from models.user import User
-from models.battle import Battle
-import os
-import subprocess
+from config.settings import settings
+from utils.metrics import collect_snapshots, gauge_values, render
+from typing import Optional
+import asyncio
+import html
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="RPG Bot Monitor")
 
-@app.get("/", response_class=HTMLResponse)
-async def dashboard():
-    """Bot dashboard"""
+# Pages, the JSON API and the event stream are all served from this snapshot.
+# It is rebuilt in the background from the bot's metrics sockets, so the
+# monitor never queries the game database or forks a process to find out
+# whether the bot is up
+DASHBOARD_REFRESH = 5
+KEEPALIVE = 15  # Seconds between SSE comments so idle proxies keep the stream open
+
+KINGDOM_EMOJI = {
+    'north': '❄️',
+    'west': '🌅',
+    'east': '🌸',
+    'south': '🔥'
+}
+
+EMPTY_STATS = {'total_users': 0, 'active_users': 0, 'total_battles': 0, 'active_battles': 0, 'top_players': []}
+
+_stats: dict = {}
+_stats_updated = asyncio.Event()  # Replaced on each refresh; streams wait on the current one
+_refresh_task: Optional[asyncio.Task] = None
+
+def _worker_sum(snapshots: dict, name: str, values: tuple = None) -> int:
+    """Counter of rows split between the workers: the sum of their samples"""
+    return sum(
+        value for snapshot in snapshots.values()
+        for labels, value in gauge_values(snapshot, name).items() if values is None or labels == values
+    )
+
+def _any_worker(snapshots: dict, name: str) -> int:
+    """Value every worker holds in full (leaderboards, opponent index)"""
+    return max((gauge_values(snapshot, name).get((), 0) for snapshot in snapshots.values()), default=0)
+
+def collect_stats(snapshots: dict) -> dict:
+    """Dashboard snapshot from the bot processes answering on their metrics sockets.
     
-    # Get bot stats
-    async with AsyncSessionLocal() as session:
-        # User stats
-        total_users = await session.scalar(select(func.count(User.id)))
-        active_users = await session.scalar(
-            select(func.count(User.id)).where(User.is_active == True)
-        )
-        
-        # Battle stats
-        total_battles = await session.scalar(select(func.count(Battle.id)))
-        active_battles = await session.scalar(
-            select(func.count(Battle.id)).where(Battle.status == 'active')
-        )
-        
-        # Top players
-        top_players = await session.execute(
-            select(User).order_by(User.level.desc(), User.experience.desc()).limit(5)
-        )
-        top_players_list = top_players.scalars().all()
+    While the bot is down the last values seen are kept and it shows as offline.
+    """
+    if not snapshots:
+        return {**EMPTY_STATS, **_stats, 'bot_running': False, 'workers': 0, 'updated_at': time.time()}
     
-    # Check if bot process is running
-    try:
-        result = subprocess.run(['pgrep', '-f', 'bot_main.py'], capture_output=True)
-        bot_running = len(result.stdout.decode().strip()) > 0
-    except:
-        bot_running = False
+    return {
+        'bot_running': True,
+        'workers': len(snapshots),
+        'total_users': _any_worker(snapshots, 'rpg_registered_players'),
+        'active_users': _any_worker(snapshots, 'rpg_active_players'),
+        'total_battles': _worker_sum(snapshots, 'rpg_battles'),
+        'active_battles': _worker_sum(snapshots, 'rpg_battles', ('active',)),
+        'top_players': next(iter(snapshots.values()))['fields'].get('top_players', []),
+        'updated_at': time.time()
+    }
+
+async def refresh_stats():
+    global _stats, _stats_updated
+    _stats = collect_stats(await collect_snapshots(settings.METRICS_SOCKET))
+    updated, _stats_updated = _stats_updated, asyncio.Event()
+    updated.set()
+
+async def _refresh_dashboard():
+    while True:
+        await asyncio.sleep(DASHBOARD_REFRESH)
+        try:
+            await refresh_stats()
+        except Exception as e:
+            logger.error(f"Error refreshing dashboard: {e}")
+
+@app.on_event("startup")
+async def load_stats():
+    global _refresh_task
+    await refresh_stats()
+    _refresh_task = asyncio.create_task(_refresh_dashboard())
+
+@app.on_event("shutdown")
+async def stop_stats():
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape target: the bot's own counters, read over its metrics socket"""
+    snapshots = await collect_snapshots(settings.METRICS_SOCKET)
+    body = render(snapshots) if snapshots else ""
+    body += (
+        "# HELP rpg_bot_up Bot processes answering on their metrics socket\n"
+        "# TYPE rpg_bot_up gauge\n"
+        f"rpg_bot_up {len(snapshots)}\n"
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+@app.get("/api/stats")
+async def api_stats():
+    """Latest dashboard snapshot"""
+    return JSONResponse(_stats)
+
+async def _stats_events():
+    yield f"data: {json.dumps(_stats)}\n\n"
+    while True:
+        updated = _stats_updated
+        try:
+            await asyncio.wait_for(updated.wait(), KEEPALIVE)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+        yield f"data: {json.dumps(_stats)}\n\n"
+
+@app.get("/api/stream")
+async def api_stream():
+    """Server-Sent Events: the dashboard snapshot each time it is refreshed"""
+    return StreamingResponse(
+        _stats_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _player_item(i: int, player: dict) -> str:
+    kingdom_emoji = KINGDOM_EMOJI.get(player['kingdom'], '🏰')
+    return f"""
+                    <li class="player-item">
+                        <span>#{i} {kingdom_emoji} {html.escape(player['name'])}</span>
+                        <span>Lv.{player['level']} | {player['pvp_wins']}W/{player['pvp_losses']}L</span>
+                    </li>
+    """
+
+@app.get("/", response_class=HTMLResponse)
+async def dashboard():
+    """Bot dashboard: rendered from the cached snapshot, then kept current over /api/stream"""
+    stats = _stats
+    bot_running = stats.get('bot_running', False)
+    players = "".join(_player_item(i, player) for i, player in enumerate(stats.get('top_players', []), 1))
     
-    html_content = f"""
+    return f"""
     <!DOCTYPE html>
     <html>
     <head>
@@ -76,7 +177,7 @@ async def dashboard():
             
             <div class="card">
                 <h2>🤖 Bot Status</h2>
-                <div class="status {'online' if bot_running else 'offline'}">
+                <div id="status" class="status {'online' if bot_running else 'offline'}">
                     {'🟢 ONLINE' if bot_running else '🔴 OFFLINE'}
                 </div>
             </div>
@@ -85,19 +186,19 @@ async def dashboard():
                 <h2>📊 Statistics</h2>
                 <div class="stats">
                     <div class="stat-item">
-                        <div class="stat-value">{total_users or 0}</div>
+                        <div class="stat-value" id="total_users">{stats.get('total_users', 0)}</div>
                         <div class="stat-label">👤 Total Users</div>
                     </div>
                     <div class="stat-item">
-                        <div class="stat-value">{active_users or 0}</div>
+                        <div class="stat-value" id="active_users">{stats.get('active_users', 0)}</div>
                         <div class="stat-label">✅ Active Users</div>
                     </div>
                     <div class="stat-item">
-                        <div class="stat-value">{total_battles or 0}</div>
+                        <div class="stat-value" id="total_battles">{stats.get('total_battles', 0)}</div>
                         <div class="stat-label">⚔️ Total Battles</div>
                     </div>
                     <div class="stat-item">
-                        <div class="stat-value">{active_battles or 0}</div>
+                        <div class="stat-value" id="active_battles">{stats.get('active_battles', 0)}</div>
                         <div class="stat-label">🔥 Active Battles</div>
                     </div>
                 </div>
@@ -105,27 +206,7 @@ async def dashboard():
             
             <div class="card">
                 <h2>🏆 Top Players</h2>
-                <ul class="player-list">
-    """
-    
-    for i, player in enumerate(top_players_list, 1):
-        kingdoms = {
-            'north': '❄️',
-            'west': '🌅', 
-            'east': '🌸',
-            'south': '🔥'
-        }
-        kingdom_emoji = kingdoms.get(player.kingdom.value, '🏰')
-        
-        html_content += f"""
-                    <li class="player-item">
-                        <span>#{i} {kingdom_emoji} {player.name}</span>
-                        <span>Lv.{player.level} | {player.pvp_wins}W/{player.pvp_losses}L</span>
-                    </li>
-        """
-    
-    html_content += """
-                </ul>
+                <ul class="player-list" id="top_players">{players}</ul>
             </div>
             
             <div class="card">
@@ -147,14 +228,35 @@ async def dashboard():
         </div>
         
         <script>
-            // Auto-refresh every 30 seconds
-            setTimeout(() => location.reload(), 30000);
+            // Updated in place from the server's snapshot instead of reloading the page
+            const kingdoms = {json.dumps(KINGDOM_EMOJI)};
+            
+            function show(stats) {{
+                const status = document.getElementById('status');
+                status.className = 'status ' + (stats.bot_running ? 'online' : 'offline');
+                status.textContent = stats.bot_running ? '🟢 ONLINE' : '🔴 OFFLINE';
+                for (const key of ['total_users', 'active_users', 'total_battles', 'active_battles']) {{
+                    document.getElementById(key).textContent = stats[key];
+                }}
+                const list = document.getElementById('top_players');
+                list.replaceChildren(...stats.top_players.map((player, i) => {{
+                    const item = document.createElement('li');
+                    item.className = 'player-item';
+                    const name = document.createElement('span');
+                    name.textContent = `#${{i + 1}} ${{kingdoms[player.kingdom] || '🏰'}} ${{player.name}}`;
+                    const record = document.createElement('span');
+                    record.textContent = `Lv.${{player.level}} | ${{player.pvp_wins}}W/${{player.pvp_losses}}L`;
+                    item.append(name, record);
+                    return item;
+                }}));
+            }}
+            
+            // EventSource reconnects by itself if the monitor restarts
+            new EventSource('/api/stream').onmessage = (event) => show(JSON.parse(event.data));
         </script>
     </body>
     </html>
     """
-    
-    return html_content
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,109 @@
+"""
+Webhook ingestion: Telegram POSTs updates to an aiohttp server instead of
+the bot long-polling for them.
+
+Updates are acknowledged right away and handled in the background by a
+KeyedTaskRunner: at most MAX_CONCURRENT_UPDATES handlers run at once, and
+updates of one user are handled one after another in arrival order. On
+shutdown the server stops first; bot_main.shutdown then gives the accepted
+updates SHUTDOWN_TIMEOUT to finish.
+"""
+import asyncio
+import hmac
+import logging
+from typing import Callable, Hashable, List
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from config.settings import settings
+from utils.update_runner import KeyedTaskRunner
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+def update_key(update: Update) -> Hashable:
+    """Ordering key of an update: its user, else its chat, else the update itself"""
+    try:
+        event = update.event
+    except Exception:
+        return ('update', update.update_id)
+
+    user = getattr(event, 'from_user', None) or getattr(event, 'user', None)
+    if user is not None:
+        return ('user', user.id)
+    chat = getattr(event, 'chat', None)
+    if chat is not None:
+        return ('chat', chat.id)
+    return ('update', update.update_id)
+
+def create_update_app(bot: Bot, path: str, secret: str,
+                      on_update: Callable[[Update], None]) -> web.Application:
+    """aiohttp application passing each POSTed update to `on_update`"""
+
+    async def handle_update(request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), secret.encode()):
+            logger.warning(f"Rejected webhook request from {request.remote}: bad secret token")
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except Exception as e:
+            logger.warning(f"Rejected malformed webhook update: {e}")
+            return web.Response(status=400)
+
+        on_update(update)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+    return app
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, runner: KeyedTaskRunner,
+                       path: str, secret: str) -> web.Application:
+    """aiohttp application feeding POSTed updates to the dispatcher"""
+
+    def handle_update(update: Update):
+        runner.submit(update_key(update), lambda: dp.feed_update(bot, update))
+
+    return create_update_app(bot, path, secret, handle_update)
+
+async def serve_webhook(bot: Bot, app: web.Application, allowed_updates: List[str]):
+    """Register the webhook with Telegram and serve `app` until cancelled"""
+    if not settings.WEBHOOK_URL or not settings.WEBHOOK_SECRET:
+        raise ValueError("BOT_MODE=webhook needs WEBHOOK_URL and WEBHOOK_SECRET")
+
+    # The webhook stays registered on shutdown: Telegram keeps the updates
+    # that arrive during a restart and delivers them once we are back
+    await bot.set_webhook(
+        url=settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+        secret_token=settings.WEBHOOK_SECRET,
+        drop_pending_updates=settings.DROP_PENDING_UPDATES,
+        allowed_updates=allowed_updates,
+        max_connections=100
+    )
+
+    app_runner = web.AppRunner(app)
+    await app_runner.setup()
+    site = web.TCPSite(app_runner, settings.WEBHOOK_HOST, settings.WEBHOOK_PORT)
+    await site.start()
+    logger.info(f"Webhook server listening on {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}{settings.WEBHOOK_PATH}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # Stops intake only: handlers already started keep running, the caller drains them
+        await app_runner.cleanup()
+
+async def run_webhook(dp: Dispatcher, bot: Bot, runner: KeyedTaskRunner):
+    """Serve the dispatcher behind a webhook until cancelled"""
+    app = create_webhook_app(dp, bot, runner, settings.WEBHOOK_PATH, settings.WEBHOOK_SECRET)
+
+    async def on_startup(app: web.Application):
+        await dp.emit_startup(bot=bot, **dp.workflow_data)
+
+    app.on_startup.append(on_startup)
+    await serve_webhook(bot, app, dp.resolve_used_update_types())
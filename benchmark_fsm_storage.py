@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark of FSM storage get/set latency.
+
+Plays registration-like dialogs (set state, update data, read both) for many
+users against MemoryStorage, the SQLite storage with its write-back cache,
+and the SQLite storage written through on every change, on a fresh local
+database.
+
+    python benchmark_fsm_storage.py --users 2000 --steps 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+async def play_dialogs(storage, users: int, steps: int, write_through: bool = False):
+    """Per-call latencies (µs) of get_state/set_state/update_data over all dialogs"""
+    from aiogram.fsm.storage.base import StorageKey
+
+    timings = {'get': [], 'set': []}
+    for step in range(steps):
+        for user_id in range(1, users + 1):
+            key = StorageKey(bot_id=42, chat_id=user_id, user_id=user_id)
+
+            started = time.perf_counter()
+            await storage.get_state(key)
+            timings['get'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await storage.update_data(key, {f"step_{step}": "значение"})
+            await storage.set_state(key, f"RegistrationStates:step_{step}")
+            if write_through:
+                await storage.flush()
+            timings['set'].append(time.perf_counter() - started)
+    return timings
+
+
+def percentile(values, q: float) -> float:
+    return statistics.quantiles(values, n=100)[int(q) - 1] * 1e6
+
+
+async def run_benchmark(users: int, steps: int):
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from config.database import engine, init_db
+    from services.fsm_storage import SQLiteStorage
+
+    await init_db()
+
+    results = []
+    results.append(("MemoryStorage", await play_dialogs(MemoryStorage(), users, steps)))
+
+    storage = SQLiteStorage()
+    results.append(("SQLite, write-back", await play_dialogs(storage, users, steps)))
+    await storage.close()
+
+    # Same dialogs on a cold cache: every first get loads its row
+    storage = SQLiteStorage()
+    results.append(("SQLite, write-back cold", await play_dialogs(storage, users, 1)))
+    await storage.close()
+
+    storage = SQLiteStorage()
+    results.append(("SQLite, write-through", await play_dialogs(storage, users, steps, write_through=True)))
+    await storage.close()
+
+    await engine.dispose()
+
+    print(f"🧠 FSM storage, {users} users x {steps} dialog steps (µs per call)")
+    print(f"{'Storage':<26}{'get p50':>9}{'get p99':>9}{'set p50':>9}{'set p99':>9}")
+    for title, timings in results:
+        print(f"{title:<26}"
+              f"{percentile(timings['get'], 50):>9.1f}{percentile(timings['get'], 99):>9.1f}"
+              f"{percentile(timings['set'], 50):>9.1f}{percentile(timings['set'], 99):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FSM storage get/set latency")
+    parser.add_argument("--users", type=int, default=2000, help="users in a dialog")
+    parser.add_argument("--steps", type=int, default=4, help="dialog steps per user")
+    args = parser.parse_args()
+
+    # Local throwaway database, never the game one
+    os.environ["DB_PATH"] = str(Path(tempfile.mkdtemp()) / "fsm_bench.db")
+
+    asyncio.run(run_benchmark(args.users, args.steps))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the menu render path with and without cached keyboards.
+
+Runs menu handlers (main menu, battle menu, kingdom attack, war sign-up, shop
+pages) against a fake Bot API session that serializes the request like the
+real one, on a fresh local SQLite database with the game items. Each handler
+is timed twice: with the prebuilt/memoized keyboards, and with every keyboard
+rebuilt per call as before.
+
+    python benchmark_keyboards.py --renders 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def make_fake_session():
+    from aiogram.client.session.base import BaseSession
+
+    class SerializingSession(BaseSession):
+        """Serializes every call like AiohttpSession does, then answers True"""
+
+        async def make_request(self, bot, method, timeout=None):
+            files = {}
+            for key, value in method.model_dump(warnings=False).items():
+                self.prepare_value(value, bot=bot, files=files)
+            return True
+
+        async def close(self):
+            pass
+
+        async def stream_content(self, *args, **kwargs):
+            raise NotImplementedError
+
+    return SerializingSession()
+
+
+@contextmanager
+def rebuilt_keyboards():
+    """Swap every cached keyboard for a builder that runs on each call"""
+    from aiogram.types import InlineKeyboardMarkup
+    from handlers import battle, enhanced_main_battle, kingdom_war, start
+    from keyboards import kingdom_war as war_keyboards, main_menu, static
+    from services.shop_catalog import BACK_TO_CATEGORIES_BUTTON, CatalogPage
+
+    def legacy_page_keyboard(self, money, level):
+        rows = [item.buttons_for(money, level) for item in self.items]
+        if self.nav_row:
+            rows.append(list(self.nav_row))
+        rows.append([BACK_TO_CATEGORIES_BUTTON])
+        return InlineKeyboardMarkup(inline_keyboard=rows)
+
+    patches = [
+        (start, 'main_menu_keyboard', main_menu._build_main_menu),
+        (battle, 'battle_menu_keyboard', main_menu._build_battle_menu),
+        (battle, 'kingdom_attack_keyboard', main_menu.kingdom_attack_keyboard.__wrapped__),
+        (kingdom_war, 'war_attack_keyboard', war_keyboards.war_attack_keyboard.__wrapped__),
+        (kingdom_war, 'war_defense_keyboard', war_keyboards.war_defense_keyboard.__wrapped__),
+        (enhanced_main_battle, 'join_attack_keyboard', war_keyboards.join_attack_keyboard.__wrapped__),
+        (kingdom_war, 'single_button_keyboard', static.single_button_keyboard.__wrapped__),
+        (CatalogPage, 'keyboard', legacy_page_keyboard),
+    ]
+    originals = [(owner, name, getattr(owner, name)) for owner, name, _ in patches]
+    try:
+        for owner, name, replacement in patches:
+            setattr(owner, name, replacement)
+        yield
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+async def run_benchmark(renders: int):
+    from aiogram import Bot
+    from aiogram.types import CallbackQuery
+    from sqlalchemy import select
+    from config.database import AsyncSessionLocal, engine, init_db
+    from data_init import init_game_data
+    from handlers import battle, enhanced_main_battle, kingdom_war, shop, start
+    from models.user import User
+    from services.shop_catalog import shop_catalog
+
+    await init_db()
+    await init_game_data()
+    async with AsyncSessionLocal() as session:
+        session.add(User(id=1, name="bench", gender="male", kingdom="north", money=350, level=4))
+        await session.commit()
+        user = (await session.execute(select(User).where(User.id == 1))).scalar_one()
+        session.expunge(user)
+    await shop_catalog.reload()
+
+    bot = Bot(token="42:BENCH", session=make_fake_session())
+
+    def callback(data: str) -> CallbackQuery:
+        return CallbackQuery.model_validate({
+            "id": "1",
+            "from": {"id": 1, "is_bot": False, "first_name": "bench"},
+            "chat_instance": "1",
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": 1, "type": "private"},
+                "text": "menu"
+            }
+        }, context={"bot": bot})
+
+    scenarios = [
+        ("Главное меню", start.show_main_menu, "main_menu"),
+        ("Меню сражений", battle.show_battle_menu, "battle_menu"),
+        ("Атака королевства", battle.show_kingdom_attack, "kingdom_attack"),
+        ("Запись на атаку", kingdom_war.show_attack_kingdoms, "kingdom_war_attack"),
+        ("Запись на защиту", kingdom_war.show_defend_options, "kingdom_war_defend"),
+        ("Присоединиться к атаке", enhanced_main_battle.show_join_attack_menu, "join_attack_menu"),
+        ("Магазин: все товары", shop.show_shop_category, "shop_category_all_1"),
+    ]
+
+    async def time_handler(handler, data: str) -> float:
+        event = callback(data)
+        await handler(event, user, True)  # warm-up
+        started = time.perf_counter()
+        for _ in range(renders):
+            await handler(event, user, True)
+        return (time.perf_counter() - started) / renders * 1e6
+
+    results = []
+    for title, handler, data in scenarios:
+        cached = await time_handler(handler, data)
+        with rebuilt_keyboards():
+            rebuilt = await time_handler(handler, data)
+        results.append((title, rebuilt, cached))
+
+    await bot.session.close()
+    await engine.dispose()
+
+    print(f"⌨️ Menu render path, {renders} renders per handler (µs per render)")
+    print(f"{'Handler':<26}{'rebuilt':>10}{'cached':>10}{'saved':>8}")
+    for title, rebuilt, cached in results:
+        print(f"{title:<26}{rebuilt:>10.1f}{cached:>10.1f}{(1 - cached / rebuilt) * 100:>7.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cached vs rebuilt keyboards on the menu render path")
+    parser.add_argument("--renders", type=int, default=2000, help="renders per handler")
+    args = parser.parse_args()
+
+    # Local throwaway database, never the game one
+    os.environ["DB_PATH"] = str(Path(tempfile.mkdtemp()) / "keyboards_bench.db")
+
+    asyncio.run(run_benchmark(args.renders))
+
+
+if __name__ == "__main__":
+    main()
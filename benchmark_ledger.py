@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the money ledger overhead on the buy_item path.
+
+Runs the same series of concurrent purchases twice on a fresh local SQLite
+database, once with the ledger writer disabled and once with it running, and
+compares buy_item latency. The ledger time spent in background flushes is
+reported separately.
+
+    python benchmark_ledger.py --users 200 --purchases 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+async def run_purchases(users: int, purchases: int, concurrency: int, user_offset: int):
+    """Every player buys `purchases` potions; returns per-call latencies"""
+    from config.database import AsyncSessionLocal
+    from models.ledger import LedgerReasonEnum
+    from models.user import User
+    from services.ledger_service import money_ledger
+    from services.shop_service import ShopService
+
+    async with AsyncSessionLocal() as session:
+        for user_id in range(user_offset + 1, user_offset + users + 1):
+            session.add(User(id=user_id, name=f"bench_{user_id}", gender="male", kingdom="north", money=purchases * 10))
+            money_ledger.add(session, user_id, purchases * 10, LedgerReasonEnum.opening)
+        await session.commit()
+
+    shop_service = ShopService()
+    latencies = []
+    in_flight = asyncio.Semaphore(concurrency)
+
+    async def buy(user_id: int):
+        async with in_flight:
+            started = time.perf_counter()
+            success, message = await shop_service.buy_item(user_id, 1)
+            latencies.append(time.perf_counter() - started)
+            if not success:
+                print(f"❌ Purchase failed for {user_id}: {message}")
+
+    await asyncio.gather(*[
+        buy(user_id)
+        for _ in range(purchases)
+        for user_id in range(user_offset + 1, user_offset + users + 1)
+    ])
+    return latencies
+
+
+def summarize(name: str, latencies: list, elapsed: float):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    mean = sum(latencies) / len(latencies) * 1000
+    print(f"{name}: {len(latencies)} purchases in {elapsed:.2f}s, {len(latencies) / elapsed:.0f}/s, "
+          f"mean {mean:.2f}ms, p50 {p50:.2f}ms, p95 {p95:.2f}ms")
+    return mean
+
+
+async def run_benchmark(users: int, purchases: int, concurrency: int):
+    from config.database import AsyncSessionLocal, engine, init_db
+    from models.item import Item, ItemTypeEnum
+    from services.ledger_service import money_ledger
+    from services.shop_catalog import shop_catalog
+
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        session.add(Item(id=1, name="Зелье здоровья", item_type=ItemTypeEnum.consumable, price=10))
+        await session.commit()
+    await shop_catalog.reload()
+
+    # Warm up the connection pool and the catalog
+    money_ledger.enabled = False
+    await run_purchases(10, 1, concurrency, user_offset=10_000_000)
+
+    started = time.perf_counter()
+    baseline = await run_purchases(users, purchases, concurrency, user_offset=0)
+    baseline_mean = summarize("Without ledger", baseline, time.perf_counter() - started)
+
+    money_ledger.enabled = True
+    await money_ledger.start()
+    started = time.perf_counter()
+    with_ledger = await run_purchases(users, purchases, concurrency, user_offset=users)
+    ledger_mean = summarize("With ledger   ", with_ledger, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await money_ledger.stop()
+    final_flush = time.perf_counter() - started
+
+    print(f"Ledger: {money_ledger.written} entries in {money_ledger.flushes} batches, "
+          f"final flush {final_flush * 1000:.1f}ms")
+    print(f"Overhead per purchase: {ledger_mean - baseline_mean:+.3f}ms "
+          f"({(ledger_mean / baseline_mean - 1) * 100:+.1f}%)")
+
+    # Only the players of the ledger run have ledger entries
+    mismatches = [row async for row in money_ledger.reconcile() if users < row[0] <= 2 * users]
+    await engine.dispose()
+    return not mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Money ledger overhead on buy_item")
+    parser.add_argument("--users", type=int, default=200, help="number of buying players")
+    parser.add_argument("--purchases", type=int, default=20, help="purchases per player")
+    parser.add_argument("--concurrency", type=int, default=50, help="maximum purchases in flight")
+    args = parser.parse_args()
+
+    # Local throwaway database, never the game one
+    os.environ["DB_PATH"] = str(Path(tempfile.mkdtemp()) / "ledger_benchmark.db")
+
+    ok = asyncio.run(run_benchmark(args.users, args.purchases, args.concurrency))
+    print("🎉 Ledger reconciles with balances" if ok else "❌ Ledger does not reconcile")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end load test of the dispatcher, no Telegram needed.
+
+Builds the real dispatcher (middlewares and handlers) on a fresh local SQLite
+database and lets simulated players click through the game concurrently.
+Telegram is replaced by a fake session that answers every Bot API call after
+a simulated round trip (--rtt) and records what each chat was shown.
+
+Every player plays --flows flows, each picked from the --mix of scenarios:
+
+* registration - /start, name, gender, kingdom, confirmation (a new player)
+* profile - profile, stats, battle stats, back to the main menu
+* pve - a monster encounter fought for --rounds rounds
+* shop - shop menu, a category, buying an item
+* war - kingdom wars menu, attack or defense, registering for a war slot
+
+Like a real client, a player taps the buttons of the keyboard the bot showed
+last: steps ending in "_" pick one of the shown buttons with that prefix
+(a battle, an item, a war slot). A flow ends early when the button is not
+there, e.g. after an alert. Players wait for a keyboard before tapping it,
+so edits paced per chat (EDIT_CHAT_RATE) bound how fast one flow goes; the
+updates/s of a scenario is its share of the whole run. Latency is measured from feeding an update to the
+dispatcher until its handler returned; PvE includes the 3 s pause the dodge
+handler makes before showing a round's results.
+
+    python load_test_dispatcher.py --players 100 --flows 5
+    python load_test_dispatcher.py --mix profile=1 --players 500 --rtt 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+DEFAULT_MIX = "registration=1,profile=4,pve=2,shop=2,war=1"
+STEP_TIMEOUT = 15.0  # Longest wait for the keyboard a step leads to (edits are paced per chat)
+WAR_PLAYER_ID = 100000  # Players registering for a war are blocked afterwards, each is used once
+NEW_PLAYER_ID = 200000  # Telegram ids of players going through registration
+
+
+def build_scenarios(rounds: int) -> dict:
+    """Steps of every scenario: ("text", message) or ("tap", callback data or prefixes ending in "_")"""
+    pve_round = [("tap", "attack_type_"), ("tap", "dodge_dir_"), ("tap", "continue_enhanced_battle_")]
+    return {
+        "registration": [
+            ("text", "/start"), ("tap", "register"), ("text", "{name}"),
+            ("tap", "gender_"), ("tap", "kingdom_"), ("tap", "confirm_registration")
+        ],
+        "profile": [("tap", "profile"), ("tap", "view_stats"), ("tap", "battle_statistics"), ("tap", "main_menu")],
+        "pve": [("tap", "enhanced_pve_encounter"), ("tap", "accept_enhanced_pve_")] + pve_round * rounds,
+        "shop": [("tap", "shop_menu"), ("tap", "shop_category_"), ("tap", "buy_item_")],
+        "war": [("tap", "kingdom_wars"), ("tap", "kingdom_war_"), ("tap", ("attack_kingdom_", "defend_kingdom_"))],
+    }
+
+
+def is_choice(data) -> bool:
+    return isinstance(data, tuple) or data.endswith("_")
+
+
+def parse_mix(mix: str, scenarios: dict) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in scenarios:
+            raise SystemExit(f"Unknown scenario {name.strip()!r}, expected one of {', '.join(scenarios)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def make_recording_session(rtt: float):
+    from datetime import datetime
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import AnswerCallbackQuery, EditMessageText, GetMe, SendMessage
+    from aiogram.types import Chat, Message, User as TelegramUser
+
+    class RecordingSession(BaseSession):
+        """Answers every Bot API call after `rtt` seconds; keeps the last keyboard or alert of each chat"""
+
+        def __init__(self):
+            super().__init__()
+            self.calls = Counter()
+            self.shown = Counter()  # chat_id -> screens shown so far
+            self.screens = {}  # chat_id -> (callback data of the buttons, alert)
+            self.message_ids = defaultdict(lambda: 1)
+            self._changed = defaultdict(asyncio.Event)
+
+        def _show(self, chat_id: int, buttons: tuple, alert: bool = False):
+            self.shown[chat_id] += 1
+            self.screens[chat_id] = (buttons, alert)
+            self._changed[chat_id].set()
+
+        async def next_screen(self, chat_id: int, seen: int, prefixes, timeout: float):
+            """The first screen after the `seen` ones with a button starting with `prefixes`, or an alert.
+
+            A paced edit of an earlier step may still arrive in between; it is
+            skipped. Returns None on timeout.
+            """
+            deadline = time.monotonic() + timeout
+            while True:
+                while self.shown[chat_id] <= seen:
+                    changed = self._changed[chat_id]
+                    changed.clear()
+                    try:
+                        await asyncio.wait_for(changed.wait(), deadline - time.monotonic())
+                    except asyncio.TimeoutError:
+                        return None
+                seen = self.shown[chat_id]
+                buttons, alert = self.screens[chat_id]
+                if alert or any(data.startswith(prefixes) for data in buttons):
+                    return buttons, alert
+
+        async def make_request(self, bot, method, timeout=None):
+            self.calls[method.__api_method__] += 1
+            if rtt:
+                await asyncio.sleep(rtt)
+
+            if isinstance(method, GetMe):
+                return TelegramUser(id=42, is_bot=True, first_name="LoadTestBot")
+            if isinstance(method, AnswerCallbackQuery):
+                if method.show_alert:
+                    self._show(int(method.callback_query_id.split(":")[0]), (), alert=True)
+                return True
+
+            chat_id = getattr(method, "chat_id", None)
+            markup = getattr(method, "reply_markup", None)
+            if chat_id is not None and getattr(markup, "inline_keyboard", None):
+                self._show(chat_id, tuple(
+                    button.callback_data for row in markup.inline_keyboard for button in row if button.callback_data
+                ))
+
+            now = datetime.now()
+            if isinstance(method, SendMessage):
+                self.message_ids[chat_id] += 1
+                return Message(message_id=self.message_ids[chat_id], date=now,
+                               chat=Chat(id=chat_id, type="private"), text=method.text)
+            if isinstance(method, EditMessageText):
+                return Message(message_id=method.message_id, date=now, edit_date=int(now.timestamp()),
+                               chat=Chat(id=chat_id, type="private"), text=method.text)
+            return True
+
+        async def close(self):
+            pass
+
+        async def stream_content(self, *args, **kwargs):
+            raise NotImplementedError
+
+    return RecordingSession()
+
+
+class ScenarioStats:
+    def __init__(self):
+        self.flows = 0
+        self.ended_early = 0
+        self.errors = 0
+        self.latencies = []
+
+
+def percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_load_test(players: int, flows: int, mix: str, rounds: int, rtt: float, think: float, seed: int):
+    from datetime import datetime, timedelta
+    import pytz
+    from aiogram import Bot
+    from aiogram.types import Update
+    from bot_main import create_dispatcher, load_caches, shutdown
+    from config.database import AsyncSessionLocal, init_db
+    from data_init import seed_game_data
+    from models.user import User, KingdomEnum
+    from services.enhanced_kingdom_war_service import EnhancedKingdomWarService
+    from services.ledger_service import money_ledger
+
+    rng = random.Random(seed)
+    scenarios = build_scenarios(rounds)
+    weights = parse_mix(mix, scenarios)
+    plan = [rng.choices(list(weights), list(weights.values()), k=flows) for _ in range(players)]
+    war_flows = sum(flow == "war" for player_plan in plan for flow in player_plan)
+
+    # Registered players (money for the shop) and today's and tomorrow's wars
+    kingdoms = [kingdom.value for kingdom in KingdomEnum]
+    await init_db()
+    await seed_game_data()
+    async with AsyncSessionLocal() as session:
+        ids = list(range(1, players + 1)) + list(range(WAR_PLAYER_ID, WAR_PLAYER_ID + war_flows))
+        session.add_all([
+            User(id=user_id, name=f"load_{user_id}", gender="male", kingdom=rng.choice(kingdoms), money=100000)
+            for user_id in ids
+        ])
+        await session.commit()
+    war_service = EnhancedKingdomWarService()
+    today = datetime.now(pytz.timezone('Asia/Tashkent'))
+    for day in (today, today + timedelta(days=1)):
+        await war_service.schedule_daily_wars(day)
+    await load_caches()
+    await money_ledger.start()
+
+    dp = create_dispatcher(rate_limit=10 ** 6)
+    session = make_recording_session(rtt)
+    bot = Bot(token="42:LOAD-TEST", session=session)
+    stats = defaultdict(ScenarioStats)
+    update_ids = iter(range(1, 10 ** 9))
+    new_player_ids = iter(range(NEW_PLAYER_ID, NEW_PLAYER_ID + players * flows))
+    war_player_ids = iter(range(WAR_PLAYER_ID, WAR_PLAYER_ID + war_flows))
+
+    def make_update(user_id: int, kind: str, value: str) -> Update:
+        update_id = next(update_ids)
+        sender = {"id": user_id, "is_bot": False, "first_name": f"load_{user_id}"}
+        chat = {"id": user_id, "type": "private"}
+        if kind == "text":
+            event = {"message": {"message_id": session.message_ids[user_id], "date": int(time.time()),
+                                 "chat": chat, "from": sender, "text": value}}
+        else:
+            event = {"callback_query": {
+                "id": f"{user_id}:{update_id}", "from": sender, "chat_instance": str(user_id), "data": value,
+                "message": {"message_id": session.message_ids[user_id], "date": int(time.time()),
+                            "chat": chat, "text": "menu"}
+            }}
+        return Update.model_validate({"update_id": update_id, **event}, context={"bot": bot})
+
+    async def play_flow(name: str, user_id: int, player_rng: random.Random):
+        scenario = stats[name]
+        scenario.flows += 1
+        steps = scenarios[name]
+        screen = None
+        for index, (kind, value) in enumerate(steps):
+            if kind == "tap" and is_choice(value):
+                buttons = [data for data in (screen[0] if screen else ()) if data.startswith(value)]
+                if not buttons:
+                    scenario.ended_early += 1
+                    return
+                value = player_rng.choice(buttons)
+            elif kind == "text":
+                value = value.format(name=f"reg_{user_id}")
+
+            seen = session.shown[user_id]
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, make_update(user_id, kind, value))
+            except Exception as e:
+                scenario.errors += 1
+                if scenario.errors <= 3:
+                    print(f"❌ {name} step {value!r} of player {user_id}: {e!r}")
+                return
+            finally:
+                scenario.latencies.append(time.perf_counter() - started)
+
+            # Look at the screen before tapping one of its buttons
+            if index + 1 < len(steps) and is_choice(steps[index + 1][1]):
+                screen = await session.next_screen(user_id, seen, steps[index + 1][1], STEP_TIMEOUT)
+            if think:
+                await asyncio.sleep(player_rng.uniform(0, 2 * think))
+
+    async def play(player_id: int, player_plan: list):
+        player_rng = random.Random(seed * 100003 + player_id)
+        for name in player_plan:
+            if name == "registration":
+                user_id = next(new_player_ids)
+            elif name == "war":
+                user_id = next(war_player_ids)
+            else:
+                user_id = player_id
+            await play_flow(name, user_id, player_rng)
+
+    await dp.emit_startup(bot=bot, **dp.workflow_data)
+    started = time.perf_counter()
+    await asyncio.gather(*(play(player_id, player_plan) for player_id, player_plan in enumerate(plan, 1)))
+    elapsed = time.perf_counter() - started
+
+    # Queued edits, ledger entries and FSM states are written out as on a real stop
+    await shutdown(bot, dp)
+
+    total = sum(len(scenario.latencies) for scenario in stats.values())
+    print(f"🧪 Dispatcher load test: {players} players × {flows} flows, mix {mix}, PvE {rounds} rounds, "
+          f"simulated API round trip {rtt * 1000:.0f}ms, think time {think:.1f}s")
+    print(f"{'Scenario':<14}{'flows':>7}{'updates':>9}{'upd/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'early':>7}{'errors':>8}")
+    rows = [(name, stats[name]) for name in scenarios if name in stats]
+    overall = ScenarioStats()
+    for _, scenario in rows:
+        overall.flows += scenario.flows
+        overall.ended_early += scenario.ended_early
+        overall.errors += scenario.errors
+        overall.latencies += scenario.latencies
+    for name, scenario in rows + [("total", overall)]:
+        latencies = sorted(scenario.latencies)
+        if not latencies:
+            continue
+        print(f"{name:<14}{scenario.flows:>7}{len(latencies):>9}{len(latencies) / elapsed:>9.1f}"
+              f"{percentile(latencies, 0.5) * 1000:>9.1f}{percentile(latencies, 0.95) * 1000:>9.1f}"
+              f"{percentile(latencies, 0.99) * 1000:>9.1f}{scenario.ended_early:>7}{scenario.errors:>8}")
+    calls = sum(session.calls.values())
+    print(f"⏱️ {total} updates in {elapsed:.2f}s, {total / elapsed:.0f} updates/s")
+    print(f"📡 {calls} API calls ({calls / max(total, 1):.2f} per update): "
+          + ", ".join(f"{method} {count}" for method, count in session.calls.most_common()))
+    return overall.errors == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end dispatcher load test")
+    parser.add_argument("--players", type=int, default=100, help="players clicking at the same time")
+    parser.add_argument("--flows", type=int, default=5, help="scenario flows played by every player")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario weights, e.g. profile=4,pve=1")
+    parser.add_argument("--rounds", type=int, default=2, help="rounds fought in a PvE flow")
+    parser.add_argument("--rtt", type=float, default=0.0, help="simulated Bot API round trip, seconds")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause of a player between steps, seconds")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    args = parser.parse_args()
+
+    # Local throwaway database, never the game one
+    os.environ["DB_PATH"] = str(Path(tempfile.mkdtemp()) / "dispatcher_load.db")
+
+    ok = asyncio.run(run_load_test(args.players, args.flows, args.mix, args.rounds,
+                                   args.rtt, args.think, args.seed))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
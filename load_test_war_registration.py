@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Load test for kingdom war registration.
+
+Fires thousands of concurrent join_attack_squad / join_defense_squad calls against
+a fresh local SQLite database and checks that no registration is lost or
+duplicated. Every player also sends a second, conflicting registration at the
+same time to exercise the "already registered" guard.
+
+Replaces simulate_war_registration.py, which edited the squad JSON of a live
+database by hand instead of going through the service. --users 1 is the
+single registration smoke test it used to be.
+
+    python load_test_war_registration.py --users 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+async def run_load_test(users: int, concurrency: int, seed: int):
+    from datetime import datetime, timedelta
+    import pytz
+    from sqlalchemy import select, func
+    from config.database import AsyncSessionLocal, engine, init_db
+    from models.user import User, KingdomEnum
+    from models.kingdom_war import KingdomWar, WarParticipation
+    from services.enhanced_kingdom_war_service import EnhancedKingdomWarService
+
+    rng = random.Random(seed)
+    kingdoms = [kingdom.value for kingdom in KingdomEnum]
+
+    await init_db()
+    war_service = EnhancedKingdomWarService()
+
+    # Players spread over all kingdoms
+    async with AsyncSessionLocal() as session:
+        session.add_all([
+            User(id=user_id, name=f"load_{user_id}", gender="male", kingdom=rng.choice(kingdoms))
+            for user_id in range(1, users + 1)
+        ])
+        await session.commit()
+        players = (await session.execute(select(User.id, User.kingdom))).all()
+
+    # Wars of tomorrow, registration for the 08:00 slot
+    tashkent_tz = pytz.timezone('Asia/Tashkent')
+    tomorrow = datetime.now(tashkent_tz) + timedelta(days=1)
+    await war_service.schedule_daily_wars(tomorrow)
+    war_time = tashkent_tz.localize(
+        datetime.combine(tomorrow.date(), datetime.min.time().replace(hour=8))
+    ).astimezone(pytz.UTC)
+
+    latencies = []
+    in_flight = asyncio.Semaphore(concurrency)
+
+    async def register(user_id: int, kingdom: str, attack: bool):
+        async with in_flight:
+            return await _register(user_id, kingdom, attack)
+
+    async def _register(user_id: int, kingdom: str, attack: bool):
+        started = time.perf_counter()
+        try:
+            if attack:
+                target = rng.choice([k for k in kingdoms if k != kingdom])
+                success, _ = await war_service.join_attack_squad(user_id, target, war_time)
+            else:
+                success, _ = await war_service.join_defense_squad(user_id, war_time)
+        except Exception as e:
+            print(f"❌ Registration error for {user_id}: {e}")
+            success = False
+        latencies.append(time.perf_counter() - started)
+        return user_id, success
+
+    requests = []
+    for user_id, kingdom in players:
+        attack = rng.random() < 0.5
+        requests.append(register(user_id, kingdom.value, attack))
+        requests.append(register(user_id, kingdom.value, not attack))  # conflicting duplicate
+    rng.shuffle(requests)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*requests)
+    elapsed = time.perf_counter() - started
+
+    accepted = {}
+    for user_id, success in results:
+        if success:
+            accepted[user_id] = accepted.get(user_id, 0) + 1
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            select(WarParticipation.user_id, func.count(WarParticipation.id))
+            .group_by(WarParticipation.user_id)
+        )).all()
+        stored = dict(rows)
+
+        # Squads rebuilt at war start must contain every registered player
+        squad_members = set()
+        for war in (await session.execute(select(KingdomWar))).scalars():
+            await war_service._load_squads(war, session)
+            squad_members.update(war.get_defense_squad())
+            for squad in war.get_attack_squads().values():
+                squad_members.update(squad)
+
+    await engine.dispose()
+
+    lost = [user_id for user_id in accepted if user_id not in stored]
+    duplicated = [user_id for user_id, count in stored.items() if count > 1]
+    double_accepted = [user_id for user_id, count in accepted.items() if count > 1]
+    missing_from_squads = [user_id for user_id in stored if user_id not in squad_members]
+    unregistered = users - len(stored)
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+
+    print(f"🧪 War registration load test: {users} players, {len(requests)} requests, {concurrency} in flight")
+    print(f"⏱️ {elapsed:.2f}s, {len(requests) / elapsed:.0f} requests/s, p50 {p50:.1f}ms, p95 {p95:.1f}ms")
+    print(f"✅ Accepted: {len(accepted)}, stored: {len(stored)}, without registration: {unregistered}")
+    print(f"Lost: {len(lost)}, duplicated rows: {len(duplicated)}, accepted twice: {len(double_accepted)}, "
+          f"missing from squads: {len(missing_from_squads)}")
+
+    return not (lost or duplicated or double_accepted or missing_from_squads or unregistered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent war registration load test")
+    parser.add_argument("--users", type=int, default=2000, help="number of players registering")
+    parser.add_argument("--concurrency", type=int, default=200, help="maximum requests in flight")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    args = parser.parse_args()
+
+    # Local throwaway database, never the game one
+    os.environ["DB_PATH"] = str(Path(tempfile.mkdtemp()) / "war_registration_load.db")
+
+    ok = asyncio.run(run_load_test(args.users, args.concurrency, args.seed))
+    print("🎉 No lost registrations" if ok else "❌ Registration consistency check failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Load test of update ingestion: webhook vs long polling.
+
+Builds the real dispatcher (middlewares and handlers) on a fresh local SQLite
+database with registered players, then pushes the same synthetic menu taps
+through it twice:
+
+* webhook - POSTed to the local aiohttp webhook server, handled by the
+  KeyedTaskRunner (capped concurrency, per-user order)
+* polling - served to dp.start_polling() by a fake Telegram session through
+  getUpdates, in batches of up to 100
+
+Telegram is replaced by a fake session that answers every API call after a
+simulated round trip (--rtt). Taps arrive at --rate updates per second (0 sends
+them all at once, like a backlog after a restart); the report gives the
+throughput and the delay from arrival to handled.
+With --echo the game handlers are replaced by one that only answers the
+callback, which takes the database out of the measurement.
+
+    python load_test_webhook.py --users 200 --taps 10 --rate 100
+    python load_test_webhook.py --users 1000 --taps 10 --rate 1000 --echo
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+TAPS = ["main_menu", "profile", "inventory", "shop_menu", "leaderboards", "leaderboard_pvp_all"]
+SECRET = "load-test-secret"
+
+
+def make_fake_session(rtt: float):
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import GetMe, GetUpdates
+    from aiogram.types import User as TelegramUser
+
+    class FakeTelegramSession(BaseSession):
+        """Answers every Bot API call after `rtt` seconds; getUpdates long-polls a backlog"""
+
+        def __init__(self):
+            super().__init__()
+            self.backlog = []
+            self.arrived = asyncio.Event()
+
+        def deliver(self, update):
+            self.backlog.append(update)
+            self.arrived.set()
+
+        async def make_request(self, bot, method, timeout=None):
+            if isinstance(method, GetUpdates):
+                offset = method.offset or 0
+                self.backlog = [update for update in self.backlog if update.update_id >= offset]
+                if not self.backlog:
+                    self.arrived.clear()
+                    try:
+                        await asyncio.wait_for(self.arrived.wait(), method.timeout or 10)
+                    except asyncio.TimeoutError:
+                        pass
+                await asyncio.sleep(rtt)
+                return self.backlog[:method.limit or 100]
+
+            await asyncio.sleep(rtt)
+            if isinstance(method, GetMe):
+                return TelegramUser(id=42, is_bot=True, first_name="LoadTestBot")
+            return True
+
+        async def close(self):
+            pass
+
+        async def stream_content(self, *args, **kwargs):
+            raise NotImplementedError
+
+    return FakeTelegramSession()
+
+
+def make_updates(users: int, taps: int, seed: int) -> list:
+    """Menu taps of every player, interleaved as they would arrive"""
+    rng = random.Random(seed)
+    pending = [(user_id, seq) for user_id in range(1, users + 1) for seq in range(taps)]
+    rng.shuffle(pending)
+    pending.sort(key=lambda tap: tap[1])  # a player's taps stay in order
+
+    now = int(time.time())
+    updates = []
+    for update_id, (user_id, seq) in enumerate(pending, 1):
+        updates.append({
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": {"id": user_id, "is_bot": False, "first_name": f"load_{user_id}"},
+                "chat_instance": str(user_id),
+                "data": rng.choice(TAPS),
+                "message": {
+                    "message_id": 1,
+                    "date": now,
+                    "chat": {"id": user_id, "type": "private"},
+                    "text": "menu"
+                }
+            }
+        })
+    return updates
+
+
+async def send_at_rate(updates: list, rate: float, send):
+    """Call send(update) for every update, `rate` per second (all at once if 0)"""
+    started = time.perf_counter()
+    for index, update in enumerate(updates):
+        if rate:
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        send(update)
+
+
+def percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_load_test(users: int, taps: int, rate: float, rtt: float, connections: int, echo: bool, seed: int):
+    from aiohttp import ClientSession, TCPConnector, web
+    from aiogram import Bot, Dispatcher
+    from aiogram.types import CallbackQuery, Update
+    from bot_main import create_dispatcher
+    from config.database import AsyncSessionLocal, engine, init_db
+    from config.settings import settings
+    from models.user import User, KingdomEnum
+    from services.leaderboard_service import leaderboards
+    from services.ledger_service import money_ledger
+    from services.opponent_index import opponent_index
+    from services.shop_catalog import shop_catalog
+    from utils.update_runner import KeyedTaskRunner
+    from webhook import SECRET_HEADER, create_webhook_app
+
+    rng = random.Random(seed)
+    kingdoms = [kingdom.value for kingdom in KingdomEnum]
+
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        session.add_all([
+            User(id=user_id, name=f"load_{user_id}", gender="male", kingdom=rng.choice(kingdoms))
+            for user_id in range(1, users + 1)
+        ])
+        await session.commit()
+    await shop_catalog.reload()
+    await leaderboards.load()
+    await opponent_index.load()
+
+    if echo:
+        dp = Dispatcher()
+
+        @dp.callback_query()
+        async def echo_tap(callback: CallbackQuery):
+            await callback.answer(callback.data)
+    else:
+        dp = create_dispatcher(rate_limit=10 ** 6)
+    fake_session = make_fake_session(rtt)
+    bot = Bot(token="42:LOAD-TEST", session=fake_session)
+
+    arrived_at = {}
+    delays = []
+    all_handled = asyncio.Event()
+    expected = 0
+
+    @dp.update.outer_middleware()
+    async def measure(handler, event, data):
+        try:
+            return await handler(event, data)
+        finally:
+            delays.append(time.perf_counter() - arrived_at[event.update_id])
+            if len(delays) == expected:
+                all_handled.set()
+
+    def reset(updates: list):
+        nonlocal expected
+        arrived_at.clear()
+        delays.clear()
+        expected = len(updates)
+        all_handled.clear()
+
+    results = {}
+
+    # Webhook: Telegram keeps up to `connections` connections open and POSTs one update per request
+    updates = make_updates(users, taps, seed)
+    reset(updates)
+    runner = KeyedTaskRunner(settings.MAX_CONCURRENT_UPDATES)
+    app_runner = web.AppRunner(create_webhook_app(dp, bot, runner, "/webhook", SECRET))
+    await app_runner.setup()
+    site = web.TCPSite(app_runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    statuses = []
+    async with ClientSession(connector=TCPConnector(limit=connections)) as client:
+        posts = []
+
+        async def post(update):
+            async with client.post(f"http://127.0.0.1:{port}/webhook", json=update,
+                                   headers={SECRET_HEADER: SECRET}) as response:
+                statuses.append(response.status)
+
+        def send(update):
+            arrived_at[update["update_id"]] = time.perf_counter()
+            posts.append(asyncio.create_task(post(update)))
+
+        started = time.perf_counter()
+        await send_at_rate(updates, rate, send)
+        await asyncio.gather(*posts)
+        await all_handled.wait()
+        results['webhook'] = (time.perf_counter() - started, sorted(delays))
+    await app_runner.cleanup()
+    rejected = sum(status != 200 for status in statuses)
+
+    # Polling: the same taps served through getUpdates
+    updates = [Update.model_validate(update, context={"bot": bot}) for update in make_updates(users, taps, seed + 1)]
+    reset(updates)
+
+    def deliver(update):
+        arrived_at[update.update_id] = time.perf_counter()
+        fake_session.deliver(update)
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, close_bot_session=False))
+    started = time.perf_counter()
+    await send_at_rate(updates, rate, deliver)
+    await all_handled.wait()
+    results['polling'] = (time.perf_counter() - started, sorted(delays))
+    await dp.stop_polling()
+    await polling
+
+    await money_ledger.flush()
+    await engine.dispose()
+
+    count = users * taps
+    print(f"🧪 Update ingestion load test: {users} players × {taps} taps = {count} updates, "
+          f"{f'{rate:.0f}/s' if rate else 'all at once'}, simulated API round trip {rtt * 1000:.0f}ms, "
+          f"{'echo handler' if echo else 'game handlers'}")
+    for mode, emoji in (('webhook', '🌐'), ('polling', '🔁')):
+        elapsed, mode_delays = results[mode]
+        print(f"{emoji} {mode.capitalize()}: {elapsed:.2f}s, {count / elapsed:.0f} updates/s, "
+              f"delay p50 {percentile(mode_delays, 0.5) * 1000:.0f}ms, "
+              f"p95 {percentile(mode_delays, 0.95) * 1000:.0f}ms, "
+              f"p99 {percentile(mode_delays, 0.99) * 1000:.0f}ms")
+    print(f"Webhook: max {settings.MAX_CONCURRENT_UPDATES} handlers, {connections} connections, "
+          f"rejected {rejected}")
+    return rejected == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook vs polling update ingestion load test")
+    parser.add_argument("--users", type=int, default=200, help="number of players")
+    parser.add_argument("--taps", type=int, default=10, help="menu taps per player")
+    parser.add_argument("--rate", type=float, default=0, help="arriving updates per second, 0 for all at once")
+    parser.add_argument("--rtt", type=float, default=0.05, help="simulated Bot API round trip, seconds")
+    parser.add_argument("--connections", type=int, default=40, help="webhook connections opened by Telegram")
+    parser.add_argument("--echo", action="store_true", help="answer taps without the game handlers")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    args = parser.parse_args()
+
+    # Local throwaway database, never the game one
+    os.environ["DB_PATH"] = str(Path(tempfile.mkdtemp()) / "webhook_load.db")
+
+    ok = asyncio.run(run_load_test(args.users, args.taps, args.rate, args.rtt,
+                                   args.connections, args.echo, args.seed))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
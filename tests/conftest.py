@@ -0,0 +1,35 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level packages (config, models, services...)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Never touch the real game database
+os.environ["DB_PATH"] = str(Path(tempfile.mkdtemp()) / "test_rpg_game.db")
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine on a fresh database and dispose the engine afterwards"""
+    from config.database import Base, engine, init_db
+
+    def runner(coro):
+        async def wrapper():
+            await init_db()
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+                await conn.run_sync(Base.metadata.create_all)
+            try:
+                return await coro
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(wrapper())
+
+    return runner
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+
+class FakeEditAPI:
+    """Minimal local Bot API server for editMessageText, with Telegram's "not modified" rule"""
+
+    def __init__(self, flood_chat: int = None):
+        self.calls = []
+        self.shown = {}
+        self.flood_chat = flood_chat  # The first edit in this chat gets a 429
+
+    async def edit_message_text(self, request):
+        data = await request.post()
+        chat_id, message_id = int(data["chat_id"]), int(data["message_id"])
+        content = (data["text"], data.get("reply_markup"))
+        if chat_id == self.flood_chat:
+            self.flood_chat = None
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }, status=429)
+        if self.shown.get((chat_id, message_id)) == content:
+            return web.json_response({
+                "ok": False,
+                "error_code": 400,
+                "description": "Bad Request: message is not modified",
+            }, status=400)
+        self.shown[(chat_id, message_id)] = content
+        self.calls.append((chat_id, message_id, data["text"], time.monotonic()))
+        message = {
+            "message_id": message_id,
+            "date": 1,
+            "edit_date": len(self.calls),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": data["text"],
+        }
+        if content[1]:
+            message["reply_markup"] = json.loads(content[1])
+        return web.json_response({"ok": True, "result": message})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/editMessageText", self.edit_message_text)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.bot = Bot(
+            "42:TEST",
+            session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}")),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.bot.session.close()
+        await self.runner.cleanup()
+
+    def message(self, chat_id: int, message_id: int, edit_date: int = None) -> Message:
+        """A bot message as it arrives with a callback query"""
+        return Message.model_validate({
+            "message_id": message_id,
+            "date": 1,
+            "edit_date": edit_date,
+            "chat": {"id": chat_id, "type": "private"},
+            "text": "menu",
+        }, context={"bot": self.bot})
+
+
+def keyboard(data: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text=data, callback_data=data)]])
+
+
+def test_rapid_edits_of_a_message_send_only_the_latest():
+    from services.edit_queue import EditQueue
+
+    async def scenario():
+        async with FakeEditAPI() as api:
+            queue = EditQueue(chat_rate=5, chat_burst=1)
+            message = api.message(1, 10)
+
+            await queue.edit(message, "choice", reply_markup=keyboard("a"))
+            await asyncio.sleep(0.05)  # the first edit goes out right away
+            for step in ("round result", "calculating", "next phase"):
+                await queue.edit(message, step, reply_markup=keyboard(step))
+            await queue.stop()
+            return queue, api.calls
+
+    queue, calls = asyncio.run(scenario())
+
+    assert [text for _, _, text, _ in calls] == ["choice", "next phase"]
+    assert queue.coalesced == 2 and queue.sent == 2 and queue.pending_count == 0
+
+
+def test_identical_payloads_are_not_sent_again():
+    from services.edit_queue import EditQueue
+
+    async def scenario():
+        async with FakeEditAPI() as api:
+            queue = EditQueue(chat_rate=100, chat_burst=10)
+
+            await queue.edit(api.message(1, 10), "status", reply_markup=keyboard("refresh"))
+            await queue.stop()
+            # A second tap on the message as Telegram shows it now: nothing to change
+            await queue.edit(api.message(1, 10, edit_date=1), "status", reply_markup=keyboard("refresh"))
+            await queue.stop()
+            sent_before_outside_edit = len(api.calls)
+
+            # The message was edited elsewhere since, so the same content has to be sent
+            api.shown[(1, 10)] = ("menu", None)
+            await queue.edit(api.message(1, 10, edit_date=5), "status", reply_markup=keyboard("refresh"))
+            await queue.stop()
+            return queue, sent_before_outside_edit, len(api.calls)
+
+    queue, sent_before_outside_edit, sent = asyncio.run(scenario())
+
+    assert sent_before_outside_edit == 1
+    assert sent == 2
+    assert queue.deduplicated == 1 and queue.failed == 0
+
+
+def test_not_modified_errors_are_swallowed():
+    from services.edit_queue import EditQueue
+
+    async def scenario():
+        async with FakeEditAPI() as api:
+            queue = EditQueue(chat_rate=100, chat_burst=10)
+            api.shown[(1, 10)] = ("same", None)
+            await queue.edit(api.message(1, 10), "same")
+            await queue.stop()
+            return queue
+
+    queue = asyncio.run(scenario())
+
+    assert queue.sent == 0 and queue.failed == 0 and queue.deduplicated == 1
+
+
+def test_edits_are_paced_per_chat_and_resent_after_flood_control():
+    from services.edit_queue import EditQueue
+
+    async def scenario():
+        async with FakeEditAPI(flood_chat=1) as api:
+            queue = EditQueue(chat_rate=10, chat_burst=1)
+            started = time.monotonic()
+            for message_id in range(1, 4):
+                await queue.edit(api.message(1, message_id), f"edit {message_id}")
+            await queue.edit(api.message(2, 1), "other chat")
+            await queue.stop()
+            return queue, api.calls, started
+
+    queue, calls, started = asyncio.run(scenario())
+
+    chat_times = sorted(at for chat_id, _, _, at in calls if chat_id == 1)
+    assert len(chat_times) == 3
+    # One 429 held the first chat for a second, the rest is paced at 10 edits/s
+    assert chat_times[0] - started >= 0.9
+    assert chat_times[2] - chat_times[1] >= 0.08
+    assert queue.retried == 1 and queue.sent == 4 and queue.failed == 0
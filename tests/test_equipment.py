@@ -0,0 +1,60 @@
+def test_equip_swap_and_unequip_change_stats_by_exact_deltas(run):
+    from sqlalchemy import update
+    from config.database import AsyncSessionLocal
+    from models.item import Item, UserItem, ItemTypeEnum
+    from models.user import User
+    from services.inventory_service import InventoryService
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            session.add(User(id=1, name="knight", gender="male", kingdom="north"))
+            items = [
+                Item(name="Меч", item_type=ItemTypeEnum.weapon, price=100, strength_bonus=5, hp_bonus=20),
+                Item(name="Кинжал", item_type=ItemTypeEnum.weapon, price=90, strength_bonus=2, agility_bonus=3),
+                Item(name="Кольчуга", item_type=ItemTypeEnum.armor, price=80, armor_bonus=4, mana_bonus=10),
+            ]
+            session.add_all(items)
+            await session.flush()
+            user_items = [UserItem(user_id=1, item_id=item.id) for item in items]
+            session.add_all(user_items)
+            await session.commit()
+            sword, dagger, mail = (user_item.id for user_item in user_items)
+
+        service = InventoryService()
+
+        async def state():
+            async with AsyncSessionLocal() as session:
+                user = await session.get(User, 1)
+                return (
+                    (user.strength_bonus, user.armor_bonus, user.hp_bonus, user.agility_bonus, user.mana_bonus),
+                    user.max_hp, user.max_mana, user.current_hp
+                )
+
+        async def full_hp():
+            async with AsyncSessionLocal() as session:
+                await session.execute(update(User).where(User.id == 1).values(current_hp=User.max_hp))
+                await session.commit()
+
+        steps = []
+        assert (await service.equip_item(1, sword))[0]
+        steps.append(await state())
+        await full_hp()
+        assert (await service.equip_item(1, mail))[0]
+        steps.append(await state())
+        assert (await service.equip_item(1, dagger))[0]  # replaces the sword
+        steps.append(await state())
+        assert (await service.equip_item(1, sword))[0]  # and back
+        steps.append(await state())
+        assert (await service.unequip_item(1, sword))[0]
+        assert (await service.unequip_item(1, mail))[0]
+        steps.append(await state())
+        return steps
+
+    equipped, armored, swapped, swapped_back, bare = run(scenario())
+
+    assert equipped == ((5, 0, 20, 0, 0), 120, 50, 100)
+    assert armored == ((5, 4, 20, 0, 10), 120, 60, 120)
+    # Losing the sword's HP bonus clamps current HP to the new maximum
+    assert swapped == ((2, 4, 0, 3, 10), 100, 60, 100)
+    assert swapped_back == ((5, 4, 20, 0, 10), 120, 60, 100)
+    assert bare == ((0, 0, 0, 0, 0), 100, 50, 100)
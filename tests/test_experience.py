@@ -0,0 +1,52 @@
+from config.settings import settings
+from utils.formulas import GameFormulas
+
+
+def level_up_loop(level, experience):
+    """Reference: the old one-level-at-a-time resolution"""
+    while level < settings.MAX_LEVEL and experience >= GameFormulas.experience_for_level(level + 1):
+        experience -= GameFormulas.experience_for_level(level + 1)
+        level += 1
+    return level, experience
+
+
+def test_table_matches_level_up_loop():
+    from utils.experience import experience_table
+
+    cases = [(1, 0), (1, 282), (1, 283), (3, 10_000), (10, 123_456), (50, 5), (1, 10**9)]
+    for level, experience in cases:
+        assert experience_table.resolve(level, experience) == level_up_loop(level, experience)
+
+    levels, leftovers = experience_table.resolve_many(*zip(*cases))
+    assert list(zip(levels.tolist(), leftovers.tolist())) == [level_up_loop(*case) for case in cases]
+    assert experience_table.for_next_level(4) == GameFormulas.experience_for_level(5)
+    assert experience_table.total_for_level(3) == GameFormulas.experience_for_level(2) + GameFormulas.experience_for_level(3)
+
+
+def test_add_experience_grants_points_for_every_level(run):
+    from config.database import AsyncSessionLocal
+    from models.user import User
+    from services.user_service import UserService
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            session.add(User(id=1, name="tester", gender="male", kingdom="north"))
+            await session.commit()
+        await UserService().add_experience(1, 1_000)
+        async with AsyncSessionLocal() as session:
+            return await session.get(User, 1)
+
+    user = run(scenario())
+
+    level, experience = level_up_loop(1, 1_000)
+    assert (user.level, user.experience) == (level, experience)
+    assert user.free_stat_points == (level - 1) * settings.STAT_POINTS_PER_LEVEL
+
+
+def test_total_experience_for_level_counts_levels_two_to_level():
+    assert GameFormulas.total_experience_for_level(1) == 0
+    assert GameFormulas.total_experience_for_level(2) == GameFormulas.experience_for_level(2)
+    for level in (3, 10, settings.MAX_LEVEL):
+        expected = sum(GameFormulas.experience_for_level(i) for i in range(2, level + 1))
+        assert GameFormulas.total_experience_for_level(level) == expected
+    assert level_up_loop(1, GameFormulas.total_experience_for_level(10)) == (10, 0)
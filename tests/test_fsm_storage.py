@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from aiogram.fsm.storage.base import StorageKey
+
+
+def key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=42, chat_id=user_id, user_id=user_id)
+
+
+def test_states_survive_a_restart_once_flushed(run):
+    from services.fsm_storage import SQLiteStorage
+
+    async def scenario():
+        storage = SQLiteStorage(flush_interval=60)
+        await storage.set_state(key(1), "RegistrationStates:waiting_for_gender")
+        await storage.update_data(key(1), {"name": "Аки"})
+        await storage.set_state(key(2), "RegistrationStates:waiting_for_name")
+        await storage.set_state(key(2), None)
+
+        # Nothing reached the table before the flush
+        assert storage.pending_count == 2
+        assert await SQLiteStorage().get_state(key(1)) is None
+        await storage.close()
+
+        restarted = SQLiteStorage()
+        assert await restarted.get_state(key(1)) == "RegistrationStates:waiting_for_gender"
+        assert await restarted.get_data(key(1)) == {"name": "Аки"}
+        assert await restarted.get_state(key(2)) is None
+
+        # Served from the cache afterwards, and callers get their own copy of the data
+        (await restarted.get_data(key(1)))["name"] = "changed"
+        assert await restarted.get_data(key(1)) == {"name": "Аки"}
+        assert restarted.loads == 2
+        await restarted.close()
+
+    run(scenario())
+
+
+def test_abandoned_states_expire_and_are_purged(run):
+    from sqlalchemy import func, select, update
+    from config.database import AsyncSessionLocal
+    from models.fsm import FSMRecord
+    from services.fsm_storage import SQLiteStorage
+
+    async def scenario():
+        storage = SQLiteStorage(state_ttl=3600)
+        for user_id in range(1, 6):
+            await storage.set_state(key(user_id), "RegistrationStates:confirmation")
+        assert await storage.flush() == 5
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(FSMRecord).where(FSMRecord.key.in_(["42:1:1::default", "42:2:2::default"]))
+                .values(updated_at=datetime.utcnow() - timedelta(hours=2))
+            )
+            await session.commit()
+
+        restarted = SQLiteStorage(state_ttl=3600)
+        assert await restarted.get_state(key(1)) is None
+        assert await restarted.get_state(key(3)) == "RegistrationStates:confirmation"
+
+        assert await restarted.purge_expired() == 2
+        async with AsyncSessionLocal() as session:
+            assert await session.scalar(select(func.count()).select_from(FSMRecord)) == 3
+        await storage.close()
+        await restarted.close()
+
+    run(scenario())
@@ -0,0 +1,139 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+
+@contextmanager
+def count_queries():
+    """Collect SQL statements sent to the database"""
+    from config.database import engine
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def create_inventory():
+    from config.database import AsyncSessionLocal
+    from models.item import Item, UserItem, ItemTypeEnum
+    from models.user import User
+
+    async with AsyncSessionLocal() as session:
+        user = User(id=1, name="tester", gender="male", kingdom="north")
+        sword = Item(name="Меч", item_type=ItemTypeEnum.weapon, price=100, strength_bonus=5)
+        shield = Item(name="Щит", item_type=ItemTypeEnum.armor, price=80, armor_bonus=4)
+        potion = Item(name="Зелье здоровья", item_type=ItemTypeEnum.consumable, price=20, hp_bonus=30)
+        session.add_all([user, sword, shield, potion])
+        await session.flush()
+        session.add_all([
+            UserItem(user_id=user.id, item_id=sword.id, is_equipped=True),
+            UserItem(user_id=user.id, item_id=shield.id),
+            UserItem(user_id=user.id, item_id=potion.id, quantity=3),
+        ])
+        await session.commit()
+        return user
+
+
+class FakeCallback:
+    """Just enough of CallbackQuery for the inventory handlers"""
+
+    def __init__(self, data: str):
+        self.data = data
+        self.edits = []
+        self.message = SimpleNamespace(edit_text=self.edit_text)
+
+    async def edit_text(self, text, reply_markup=None):
+        self.edits.append((text, reply_markup))
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+def test_inventory_reads_are_single_query_and_detached(run):
+    from services.inventory_service import InventoryService
+
+    async def scenario():
+        await create_inventory()
+        service = InventoryService()
+        with count_queries() as inventory_queries:
+            inventory = await service.get_user_inventory(1)
+        with count_queries() as equipped_queries:
+            equipped = await service.get_equipped_items(1)
+        return inventory, equipped, inventory_queries, equipped_queries
+
+    inventory, equipped, inventory_queries, equipped_queries = run(scenario())
+
+    assert len(inventory_queries) == 1
+    assert len(equipped_queries) == 1
+    # Item data is usable after the session has been closed
+    assert [entry.item.name for entry in inventory][0] == "Меч"
+    assert {entry.item.name for entry in inventory} == {"Меч", "Щит", "Зелье здоровья"}
+    assert equipped["weapon"].item.strength_bonus == 5
+
+
+def test_inventory_views_cost_one_query(run):
+    from handlers.inventory import show_inventory, show_inventory_category
+
+    async def scenario():
+        user = await create_inventory()
+        views = {}
+        for data in ["inventory", "inventory_armor", "inventory_consumables", "inventory_equipped"]:
+            callback = FakeCallback(data)
+            handler = show_inventory if data == "inventory" else show_inventory_category
+            with count_queries() as queries:
+                await handler(callback, user, True)
+            views[data] = (len(queries), callback.edits)
+        return views
+
+    views = run(scenario())
+
+    for data, (queries, edits) in views.items():
+        assert queries == 1, data
+        assert len(edits) == 1, data
+    assert "Использовано: 3/20" in views["inventory"][1][0][0]
+    assert "Зелье здоровья</b> x3" in views["inventory_consumables"][1][0][0]
+
+
+def test_category_pages_walk_forward_and_back(run):
+    from handlers.inventory import show_inventory_category
+
+    async def scenario():
+        from config.database import AsyncSessionLocal
+        from models.item import Item, UserItem, ItemTypeEnum
+
+        user = await create_inventory()
+        async with AsyncSessionLocal() as session:
+            ore = Item(name="Руда", item_type=ItemTypeEnum.material, price=1)
+            session.add(ore)
+            await session.flush()
+            session.add_all([UserItem(user_id=user.id, item_id=ore.id) for _ in range(25)])
+            await session.commit()
+
+        pages = []
+        data = "inventory_other"
+        while data:
+            callback = FakeCallback(data)
+            with count_queries() as queries:
+                await show_inventory_category(callback, user, True)
+            text, markup = callback.edits[0]
+            nav = {button.text: button.callback_data for row in markup.inline_keyboard for button in row}
+            pages.append((len(queries), text.count("Руда"), nav))
+            data = nav.get("➡️ Далее")
+
+        back = FakeCallback(pages[-1][2]["⬅️ Назад"])
+        await show_inventory_category(back, user, True)
+        return pages, back.edits[0][0].count("Руда")
+
+    pages, back_count = run(scenario())
+
+    assert [(queries, count) for queries, count, _ in pages] == [(1, 10), (1, 10), (1, 5)]
+    assert "⬅️ Назад" not in pages[0][2]
+    assert back_count == 10
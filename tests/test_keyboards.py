@@ -0,0 +1,71 @@
+import itertools
+
+import pytest
+
+
+def test_static_keyboards_are_shared_and_frozen():
+    from keyboards.main_menu import kingdom_attack_keyboard, main_menu_keyboard, profile_menu_keyboard
+    from keyboards.static import single_button_keyboard
+
+    assert main_menu_keyboard() is main_menu_keyboard()
+    assert kingdom_attack_keyboard("north") is kingdom_attack_keyboard("north")
+    assert profile_menu_keyboard(True) is not profile_menu_keyboard(False)
+    assert single_button_keyboard("🔙 Назад", "profile") is single_button_keyboard("🔙 Назад", "profile")
+
+    attack_targets = [row[0].callback_data for row in kingdom_attack_keyboard("north").inline_keyboard]
+    assert attack_targets == ["attack_west", "attack_east", "attack_south", "battle_menu"]
+
+    with pytest.raises(Exception):
+        main_menu_keyboard().inline_keyboard = []
+
+
+def test_memoized_shop_page_keyboards_match_a_fresh_build():
+    from models.item import Item, ItemTypeEnum, RarityEnum
+    from services.shop_catalog import BACK_TO_CATEGORIES_BUTTON, ShopCatalog
+
+    items = [
+        Item(id=item_id, name=f"item {item_id}", item_type=item_type, rarity=RarityEnum.common,
+             price=price, level_required=level, weight=1, strength_bonus=0, armor_bonus=0,
+             hp_bonus=0, agility_bonus=0, mana_bonus=0, durability=100, max_durability=100,
+             is_available_in_shop=True)
+        for item_id, (item_type, price, level) in enumerate([
+            (ItemTypeEnum.weapon, 100, 1),
+            (ItemTypeEnum.armor, 250, 5),
+            (ItemTypeEnum.consumable, 20, 1),
+            (ItemTypeEnum.consumable, 60, 3),
+            (ItemTypeEnum.material, 5, 10),
+        ], 1)
+    ]
+    page = ShopCatalog(items).get_page('all', 1)
+
+    for money, level in itertools.product(range(0, 400, 5), range(1, 13)):
+        rows = [item.buttons_for(money, level) for item in page.items]
+        rows.append([BACK_TO_CATEGORIES_BUTTON])
+        assert page.keyboard(money, level).inline_keyboard == rows
+
+    # One keyboard per threshold band, not per player
+    assert len(page._keyboards) <= (len(page.money_thresholds) + 1) * (len(page.level_thresholds) + 1)
+    assert page.keyboard(150, 4) is page.keyboard(199, 4)
+
+
+def test_handlers_do_not_rebuild_static_markups():
+    import ast
+    from pathlib import Path
+
+    def is_literal(node):
+        return isinstance(node, ast.Constant) or (
+            isinstance(node, ast.JoinedStr) and all(isinstance(value, ast.Constant) for value in node.values)
+        )
+
+    rebuilt = []
+    for path in sorted((Path(__file__).resolve().parent.parent / "backend" / "handlers").glob("*.py")):
+        for node in ast.walk(ast.parse(path.read_text())):
+            if not (isinstance(node, ast.Call) and getattr(node.func, 'id', None) == 'InlineKeyboardMarkup'):
+                continue
+            buttons = [keyword.value for keyword in ast.walk(node)
+                       if isinstance(keyword, ast.keyword) and keyword.arg in ('text', 'callback_data')]
+            dynamic = any(isinstance(child, (ast.ListComp, ast.GeneratorExp)) for child in ast.walk(node))
+            if all(is_literal(value) for value in buttons) and not dynamic:
+                rebuilt.append(f"{path.name}:{node.lineno}")
+
+    assert rebuilt == []  # use STATIC_KEYBOARDS or single_button_keyboard
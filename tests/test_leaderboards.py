@@ -0,0 +1,72 @@
+import random
+
+
+def test_leaderboard_ranks_match_a_full_sort():
+    from services.leaderboard_service import Leaderboard
+
+    rng = random.Random(7)
+    board = Leaderboard()
+    scores = {}
+    for _ in range(2000):
+        user_id = rng.randrange(200)
+        if rng.random() < 0.1:
+            board.remove(user_id)
+            scores.pop(user_id, None)
+        else:
+            scores[user_id] = (rng.randrange(10), rng.randrange(100))
+            board.update(user_id, scores[user_id])
+
+    expected = sorted(scores, key=lambda user_id: (tuple(-value for value in scores[user_id]), user_id))
+    assert [user_id for user_id, _ in board.top(len(scores))] == expected
+    assert all(board.rank(user_id) == position for position, user_id in enumerate(expected, 1))
+
+
+def test_leaderboards_follow_committed_changes(run):
+    from config.database import AsyncSessionLocal
+    from models.user import User
+    from services.leaderboard_service import leaderboards
+    from services.user_service import UserService
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            session.add_all([
+                User(id=1, name="north_1", gender="male", kingdom="north", level=5, money=500),
+                User(id=2, name="north_2", gender="male", kingdom="north", level=3, money=900),
+                User(id=3, name="south_1", gender="female", kingdom="south", level=4, money=50),
+            ])
+            await session.commit()
+        await leaderboards.load()
+        before = (leaderboards.rank('level', 3), leaderboards.rank('wealth', 2, 'north'))
+
+        user_service = UserService()
+        await user_service.add_experience(3, 5_000)  # ORM change, picked up on commit
+        await user_service.add_money(1, 1_000, reason=_reason())  # plain UPDATE
+        await user_service.create_user(4, "east_1", "male", "east")
+
+        # Rolled back changes are ignored
+        async with AsyncSessionLocal() as session:
+            (await session.get(User, 2)).pvp_wins = 99
+            await session.flush()
+            await session.rollback()
+
+        return before, {
+            'level': [user_id for user_id, _ in leaderboards.top('level')],
+            'wealth_north': [user_id for user_id, _ in leaderboards.top('wealth', 'north')],
+            'pvp_rank': leaderboards.rank('pvp', 2),
+            'east': leaderboards.rank('level', 4, 'east'),
+            'size': leaderboards.size('level'),
+        }
+
+    before, after = run(scenario())
+
+    assert before == (2, 1)
+    assert after['level'][:2] == [3, 1]
+    assert after['wealth_north'] == [1, 2]
+    assert after['pvp_rank'] == 2  # still tied at 0 wins behind the lower id
+    assert after['east'] == 1
+    assert after['size'] == 4
+
+
+def _reason():
+    from models.ledger import LedgerReasonEnum
+    return LedgerReasonEnum.pve_reward
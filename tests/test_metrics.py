@@ -0,0 +1,161 @@
+import asyncio
+import tempfile
+from pathlib import Path
+
+
+def test_worker_snapshots_are_rendered_for_prometheus():
+    from utils.metrics import MetricsRegistry, MetricsServer, collect_snapshots, render
+
+    async def scenario():
+        path = str(Path(tempfile.mkdtemp()) / "metrics.sock")
+        servers = []
+        for shard in range(2):
+            registry = MetricsRegistry()
+            registry.counter('rpg_updates_total', 'Updates', ['type']).inc(shard + 1, type='message')
+            histogram = registry.histogram('rpg_update_duration_seconds', 'Latency', buckets=(0.1, 1.0))
+            for seconds in (0.05, 0.5, 5.0):
+                histogram.observe(seconds)
+            registry.gauge('rpg_queue_depth', 'Depth').set_function(lambda: 7)
+            server = MetricsServer(registry)
+            await server.start(f"{path}.{shard}")
+            servers.append(server)
+
+        # A socket left behind by a killed worker is skipped
+        Path(f"{path}.9").touch()
+        snapshots = await collect_snapshots(path)
+
+        for server in servers:
+            await server.stop()
+        return render(snapshots)
+
+    text = asyncio.run(scenario())
+
+    assert '# TYPE rpg_updates_total counter' in text
+    assert 'rpg_updates_total{type="message",worker="0"} 1' in text
+    assert 'rpg_updates_total{type="message",worker="1"} 2' in text
+    assert 'rpg_update_duration_seconds_bucket{worker="0",le="0.1"} 1' in text
+    assert 'rpg_update_duration_seconds_bucket{worker="0",le="1.0"} 2' in text
+    assert 'rpg_update_duration_seconds_bucket{worker="0",le="+Inf"} 3' in text
+    assert 'rpg_update_duration_seconds_count{worker="1"} 3' in text
+    assert 'rpg_queue_depth{worker="1"} 7' in text
+    assert 'worker="9"' not in text
+
+
+def test_active_battles_follow_committed_changes(run):
+    from config.database import AsyncSessionLocal, db_statements
+    from models.interactive_battle import InteractiveBattle, BattleModeEnum, BattlePhaseEnum
+    from models.user import User
+    from services.active_battles import active_battles
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            session.add(User(id=1, name="fighter", gender="male", kingdom="north"))
+            session.add(InteractiveBattle(id=1, mode=BattleModeEnum.pve_interactive, player1_id=1,
+                                          player1_hp=100, player1_mana=50, phase=BattlePhaseEnum.finished))
+            await session.commit()
+        await active_battles.load()
+        loaded = active_battles.count
+
+        statements = sum(value for _, value in db_statements.samples())
+        async with AsyncSessionLocal() as session:
+            for battle_id in (2, 3):
+                session.add(InteractiveBattle(id=battle_id, mode=BattleModeEnum.pve_interactive, player1_id=1,
+                                              player1_hp=100, player1_mana=50))
+            await session.commit()
+        started = active_battles.count
+        counted = sum(value for _, value in db_statements.samples()) - statements
+
+        async with AsyncSessionLocal() as session:
+            (await session.get(InteractiveBattle, 2)).phase = BattlePhaseEnum.finished
+            await session.rollback()
+            rolled_back = active_battles.count
+            (await session.get(InteractiveBattle, 2)).phase = BattlePhaseEnum.finished
+            await session.commit()
+        return loaded, started, rolled_back, active_battles.count, counted
+
+    loaded, started, rolled_back, finished, counted = run(scenario())
+
+    assert (loaded, started, rolled_back, finished) == (0, 2, 2, 1)
+    assert counted >= 1
+
+
+def test_each_worker_counts_only_its_own_battles(run):
+    from config.database import AsyncSessionLocal
+    from models.interactive_battle import InteractiveBattle, BattleModeEnum, BattlePhaseEnum
+    from models.user import User
+    from services.active_battles import active_battles
+
+    async def commit_battle(battle_id: int, phase=BattlePhaseEnum.attack_selection):
+        async with AsyncSessionLocal() as session:
+            battle = await session.get(InteractiveBattle, battle_id)
+            if battle is None:
+                session.add(InteractiveBattle(id=battle_id, mode=BattleModeEnum.pvp_interactive, player1_id=battle_id,
+                                              player2_id=3 - battle_id, player1_hp=100, player1_mana=50))
+            else:
+                battle.phase = phase
+            await session.commit()
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            session.add_all([User(id=1, name="odd", gender="male", kingdom="north"),
+                             User(id=2, name="even", gender="male", kingdom="west")])
+            await session.commit()
+
+        # Worker 1 starts the battle of player 1 and handles player 2's moves in the battle of player 2
+        await active_battles.load(shard=1, workers=2)
+        await commit_battle(1)
+        await commit_battle(2)
+        await commit_battle(2, BattlePhaseEnum.dodge_selection)
+        worker_1 = active_battles.count
+
+        # Worker 0 finishes the battle of player 2 started before it loaded
+        await active_battles.load(shard=0, workers=2)
+        loaded = active_battles.count
+        await commit_battle(2, BattlePhaseEnum.finished)
+        await commit_battle(1, BattlePhaseEnum.calculating)
+        worker_0 = active_battles.count
+
+        await active_battles.load()
+        return worker_1, loaded, worker_0
+
+    assert run(scenario()) == (1, 1, 0)
+
+
+def test_battle_counts_follow_status_changes_of_the_worker(run):
+    from config.database import AsyncSessionLocal
+    from models.battle import Battle, BattleStatusEnum, BattleTypeEnum
+    from models.user import User
+    from services.battle_counts import battle_counts
+    from services.leaderboard_service import leaderboards
+    from utils.metrics import gauge_values, metrics
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            session.add_all([User(id=1, name="odd", gender="male", kingdom="north"),
+                             User(id=2, name="even", gender="male", kingdom="west"),
+                             Battle(id=1, battle_type=BattleTypeEnum.pvp, challenger_id=1,
+                                    status=BattleStatusEnum.finished)])
+            await session.commit()
+
+        await battle_counts.load(shard=1, workers=2)
+        loaded = dict(battle_counts.counts)
+
+        async with AsyncSessionLocal() as session:
+            session.add_all([Battle(id=2, battle_type=BattleTypeEnum.pvp, challenger_id=1),
+                             Battle(id=3, battle_type=BattleTypeEnum.pvp, challenger_id=2)])  # worker 0's
+            await session.commit()
+            (await session.get(Battle, 2)).status = BattleStatusEnum.active
+            await session.rollback()
+            (await session.get(Battle, 2)).status = BattleStatusEnum.active
+            await session.commit()
+
+        await leaderboards.load()
+        snapshot = metrics.snapshot()
+        await battle_counts.load()
+        return loaded, gauge_values(snapshot, 'rpg_battles'), snapshot['fields']['top_players']
+
+    loaded, exported, top_players = run(scenario())
+
+    assert loaded == {'pending': 0, 'active': 0, 'finished': 1, 'cancelled': 0}
+    assert exported == {('pending',): 0, ('active',): 1, ('finished',): 1, ('cancelled',): 0}
+    assert [player['name'] for player in top_players] == ['odd', 'even']
@@ -0,0 +1,54 @@
+import asyncio
+
+
+def test_ledger_records_committed_changes_and_reconciles(run):
+    from config.database import AsyncSessionLocal
+    from models.item import Item, ItemTypeEnum
+    from models.ledger import LedgerReasonEnum
+    from models.user import User
+    from services.inventory_service import InventoryService
+    from services.ledger_service import money_ledger
+    from services.shop_catalog import shop_catalog
+    from services.shop_service import ShopService
+    from services.user_service import UserService
+
+    async def scenario():
+        money_ledger._buffer.clear()
+        await UserService().create_user(1, "tester", "male", "north")
+        async with AsyncSessionLocal() as session:
+            session.add(Item(id=1, name="Зелье здоровья", item_type=ItemTypeEnum.consumable, price=30))
+            await session.commit()
+        await shop_catalog.reload()
+
+        await asyncio.gather(*[ShopService().buy_item(1, 1) for _ in range(5)])
+        await InventoryService().sell_all(1, 1)
+
+        # Changes that are rolled back never reach the ledger
+        async with AsyncSessionLocal() as session:
+            user = await session.get(User, 1)
+            user.money += 1000
+            money_ledger.add(session, 1, 1000, LedgerReasonEnum.pve_reward)
+            await session.rollback()
+
+        buffered = money_ledger.pending_count
+        mismatches = [row async for row in money_ledger.reconcile()]
+        aggregates = {reason: (count, total) async for reason, count, total in money_ledger.aggregate_by_reason()}
+
+        # A money change the ledger does not know about
+        async with AsyncSessionLocal() as session:
+            (await session.get(User, 1)).money += 7
+            await session.commit()
+        drift = [row async for row in money_ledger.reconcile()]
+        return buffered, mismatches, aggregates, drift
+
+    buffered, mismatches, aggregates, drift = run(scenario())
+
+    # registration + 3 purchases + 1 sale, written only when flushed
+    assert buffered == 5
+    assert mismatches == []
+    assert aggregates == {
+        LedgerReasonEnum.registration: (1, 100),
+        LedgerReasonEnum.shop_buy: (3, -90),
+        LedgerReasonEnum.shop_sell: (1, 45),
+    }
+    assert drift == [(1, 62, 55)]
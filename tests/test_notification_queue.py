@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from sqlalchemy import func, select
+
+
+class FakeBotAPI:
+    """Minimal local Bot API server recording sendMessage calls"""
+
+    def __init__(self, flood_first: int = 0):
+        self.calls = []
+        self.flood_first = flood_first
+
+    async def send_message(self, request):
+        data = await request.post()
+        chat_id = int(data["chat_id"])
+        if self.flood_first:
+            self.flood_first -= 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            })
+        self.calls.append((chat_id, data["text"], time.monotonic()))
+        return web.json_response({
+            "ok": True,
+            "result": {
+                "message_id": len(self.calls),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": data["text"],
+            },
+        })
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/sendMessage", self.send_message)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.bot = Bot(
+            "42:TEST",
+            session=AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}")),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.bot.session.close()
+        await self.runner.cleanup()
+
+
+async def wait_until_drained(queue, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while queue.pending_count and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+
+
+def test_per_chat_pacing_and_ordering(run):
+    from services.notification_service import NotificationQueue
+
+    async def scenario():
+        async with FakeBotAPI() as api:
+            queue = NotificationQueue(api.bot, global_rate=100, chat_rate=10)
+            await queue.start()
+            await queue.enqueue_many([(1, "a"), (1, "b"), (1, "c"), (2, "x")])
+            await wait_until_drained(queue)
+            await queue.stop()
+            return api.calls, queue.get_stats()
+
+    calls, stats = run(scenario())
+
+    chat_calls = [call for call in calls if call[0] == 1]
+    assert [text for _, text, _ in chat_calls] == ["a", "b", "c"]
+    gaps = [b[2] - a[2] for a, b in zip(chat_calls, chat_calls[1:])]
+    assert min(gaps) >= 0.08
+    assert stats["sent"] == 4 and stats["pending"] == 0
+    assert stats["throughput"] > 0
+
+
+def test_retry_after_flood_control(run):
+    from services.notification_service import NotificationQueue
+
+    async def scenario():
+        async with FakeBotAPI(flood_first=1) as api:
+            queue = NotificationQueue(api.bot, global_rate=100, chat_rate=100)
+            await queue.start()
+            started = time.monotonic()
+            await queue.enqueue(7, "hello")
+            await wait_until_drained(queue)
+            elapsed = time.monotonic() - started
+            await queue.stop()
+            return api.calls, queue.get_stats(), elapsed
+
+    calls, stats, elapsed = run(scenario())
+
+    assert [(chat_id, text) for chat_id, text, _ in calls] == [(7, "hello")]
+    assert stats["retried"] == 1
+    assert elapsed >= 1.0
+
+
+def test_pending_notifications_survive_restart(run):
+    from config.database import AsyncSessionLocal
+    from models.notification import PendingNotification
+    from services.notification_service import NotificationQueue
+
+    async def count_pending():
+        async with AsyncSessionLocal() as session:
+            return await session.scalar(select(func.count(PendingNotification.id)))
+
+    async def scenario():
+        # Queued but never sent, e.g. the process died
+        crashed = NotificationQueue(global_rate=100, chat_rate=100)
+        await crashed.enqueue_many([(1, "one"), (2, "two")])
+        before_restart = await count_pending()
+
+        async with FakeBotAPI() as api:
+            queue = NotificationQueue(api.bot, global_rate=100, chat_rate=100)
+            await queue.start()
+            await wait_until_drained(queue)
+            await queue.stop()
+            return before_restart, api.calls, await count_pending()
+
+    before_restart, calls, after = run(scenario())
+
+    assert before_restart == 2
+    assert sorted(text for _, text, _ in calls) == ["one", "two"]
+    assert after == 0
@@ -0,0 +1,70 @@
+import random
+
+
+async def create_players():
+    from config.database import AsyncSessionLocal
+    from models.user import User
+
+    async with AsyncSessionLocal() as session:
+        session.add(User(id=1, name="attacker", gender="male", kingdom="north", level=10))
+        session.add_all([
+            User(id=user_id, name=f"south_{user_id}", gender="male", kingdom="south",
+                 level=user_id % 20 + 1, current_hp=100 if user_id % 3 else 10)
+            for user_id in range(100, 400)
+        ])
+        session.add(User(id=999, name="inactive", gender="male", kingdom="south", level=10, is_active=False))
+        await session.commit()
+
+
+def test_sample_matches_the_sql_filter_and_rotates(run):
+    from services.opponent_index import opponent_index
+
+    async def scenario():
+        await create_players()
+        await opponent_index.load()
+        rng = random.Random(3)
+        picks = [opponent_index.sample("south", 10, exclude_id=1, limit=8, min_hp_ratio=0.3, rng=rng)
+                 for _ in range(20)]
+        everyone = opponent_index.sample("south", 10, exclude_id=1, limit=1000, min_hp_ratio=0.3)
+        return picks, everyone
+
+    picks, everyone = run(scenario())
+
+    expected = {user_id for user_id in range(100, 400) if 5 <= user_id % 20 + 1 <= 15 and user_id % 3}
+    assert {record.id for record in everyone} == expected
+    assert all(len(pick) == 8 and {record.id for record in pick} <= expected for pick in picks)
+    # Different players come up across calls instead of always the same first rows
+    assert len({record.id for pick in picks for record in pick}) > 60
+
+
+def test_index_follows_level_hp_and_equipment_changes(run):
+    from config.database import AsyncSessionLocal
+    from models.item import Item, UserItem, ItemTypeEnum
+    from models.user import User
+    from services.inventory_service import InventoryService
+    from services.opponent_index import opponent_index
+
+    async def scenario():
+        await create_players()
+        async with AsyncSessionLocal() as session:
+            session.add(Item(id=1, name="Кираса", item_type=ItemTypeEnum.armor, price=10, hp_bonus=50, armor_bonus=5))
+            session.add(UserItem(id=1, user_id=100, item_id=1))
+            await session.commit()
+        await opponent_index.load()
+
+        async with AsyncSessionLocal() as session:
+            player = await session.get(User, 101)
+            player.level = 40
+            player.current_hp = 5
+            await session.commit()
+
+        before = opponent_index.get(100)
+        await InventoryService().equip_item(100, 1)
+        return before, opponent_index.get(100), opponent_index.get(101), opponent_index.get(999)
+
+    before, after, moved, inactive = run(scenario())
+
+    assert inactive is None
+    assert (moved.level, moved.current_hp) == (40, 5)
+    assert after.max_hp == before.max_hp + 50
+    assert after.power == before.power + 5
@@ -0,0 +1,89 @@
+import asyncio
+
+
+async def create_shop():
+    from config.database import AsyncSessionLocal
+    from models.item import Item, ItemTypeEnum
+    from models.user import User
+    from services.shop_catalog import shop_catalog
+
+    async with AsyncSessionLocal() as session:
+        session.add_all([
+            User(id=1, name="tester", gender="male", kingdom="north", money=100),
+            Item(id=1, name="Зелье здоровья", item_type=ItemTypeEnum.consumable, price=30, hp_bonus=30),
+            Item(id=2, name="Меч", item_type=ItemTypeEnum.weapon, price=20, strength_bonus=5),
+        ])
+        await session.commit()
+    await shop_catalog.reload()
+
+
+async def load_state():
+    from sqlalchemy import select
+    from config.database import AsyncSessionLocal
+    from models.item import UserItem
+    from models.user import User
+
+    async with AsyncSessionLocal() as session:
+        user = await session.get(User, 1)
+        rows = (await session.execute(select(UserItem.item_id, UserItem.quantity).order_by(UserItem.id))).all()
+        return user.money, [tuple(row) for row in rows]
+
+
+def test_concurrent_purchases_never_overspend(run):
+    from services.shop_service import ShopService
+
+    async def scenario():
+        await create_shop()
+        service = ShopService()
+        results = await asyncio.gather(*[service.buy_item(1, 1) for _ in range(10)])
+        return results, await load_state()
+
+    results, (money, rows) = run(scenario())
+
+    assert sum(success for success, _ in results) == 3
+    assert "Недостаточно денег" in next(message for success, message in results if not success)
+    assert money == 10
+    # Stackable purchases land in a single row
+    assert rows == [(1, 3)]
+
+
+def test_concurrent_sales_sell_each_piece_once(run):
+    from services.inventory_service import InventoryService
+    from services.shop_service import ShopService
+
+    async def scenario():
+        await create_shop()
+        success, _ = await ShopService().buy_item(1, 1, 3)
+        assert success
+        service = InventoryService()
+        results = await asyncio.gather(*[service.sell_item(1, 1) for _ in range(6)])
+        return results, await load_state()
+
+    results, (money, rows) = run(scenario())
+
+    assert sum(success for success, _ in results) == 3
+    assert money == 10 + 3 * 15
+    assert rows == []
+
+
+def test_bulk_buy_and_sell_all(run):
+    from services.inventory_service import InventoryService
+    from services.shop_service import ShopService
+
+    async def scenario():
+        await create_shop()
+        bought = await ShopService().buy_item(1, 2, 4)
+        too_many = await ShopService().buy_item(1, 2, 2)
+        after_buy = await load_state()
+        sold = await InventoryService().sell_all(1, 2)
+        nothing_left = await InventoryService().sell_all(1, 2)
+        return bought, too_many, after_buy, sold, nothing_left, await load_state()
+
+    bought, too_many, after_buy, sold, nothing_left, after_sale = run(scenario())
+
+    assert bought[0] and not too_many[0]
+    # Equipment is stored one piece per row
+    assert after_buy == (20, [(2, 1)] * 4)
+    assert sold == (True, "Продано: 4x Меч за 40 золота")
+    assert not nothing_left[0]
+    assert after_sale == (60, [])
@@ -0,0 +1,62 @@
+import asyncio
+
+
+def test_drain_waits_for_work_and_cancels_timers():
+    from utils.task_registry import TaskRegistry
+
+    async def scenario():
+        registry = TaskRegistry()
+        finished = []
+
+        async def battle(battle_id: int, seconds: float):
+            await asyncio.sleep(seconds)
+            finished.append(battle_id)
+            if battle_id == 1:
+                # Work started by work is waited for as well
+                registry.spawn(battle(3, 0.05))
+
+        async def broken():
+            raise ValueError("no such battle")
+
+        registry.spawn(battle(1, 0.05))
+        registry.spawn(battle(2, 10))
+        registry.spawn(broken())
+        timer = registry.spawn(asyncio.sleep(50), timer=True)
+
+        waited, abandoned = await registry.drain(0.3)
+        return registry, finished, waited, abandoned, timer
+
+    registry, finished, waited, abandoned, timer = asyncio.run(scenario())
+
+    assert finished == [1, 3]
+    assert (waited, abandoned) == (4, 1)
+    assert timer.cancelled()
+    assert (registry.completed, registry.failed, registry.abandoned) == (2, 1, 1)
+    assert registry.pending_count == 0
+
+
+def test_shutdown_drains_updates_within_the_deadline(run):
+    from bot_main import shutdown
+    from utils.task_registry import background_tasks
+    from utils.update_runner import KeyedTaskRunner
+
+    async def scenario():
+        handled = []
+
+        async def update(user_id: int, seconds: float):
+            await asyncio.sleep(seconds)
+            handled.append(user_id)
+
+        runner = KeyedTaskRunner(max_concurrency=10)
+        runner.submit(1, lambda: update(1, 0.05))
+        runner.submit(2, lambda: update(2, 10))
+        runner.submit(2, lambda: update(2, 0))  # queued behind the stuck one
+        background_tasks.spawn(update(3, 0.05))
+
+        await shutdown(runner=runner, timeout=0.3)
+        return runner, handled
+
+    runner, handled = run(scenario())
+
+    assert sorted(handled) == [1, 3]
+    assert runner.cancelled == 2 and runner.pending_count == 0
@@ -0,0 +1,63 @@
+def test_init_db_skips_an_unchanged_schema(run):
+    from sqlalchemy import text
+    from config.database import _schema_fingerprint, engine, init_db
+
+    async def sqlite(sql: str):
+        async with engine.begin() as conn:
+            result = await conn.execute(text(sql))
+            return result.all() if result.returns_rows else []
+
+    async def indexes():
+        return {name for name, in await sqlite("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+    async def scenario():
+        await init_db()
+        version = (await sqlite("PRAGMA user_version"))[0][0]
+
+        # Same models: nothing is inspected or created
+        await sqlite("DROP INDEX ix_fsm_states_updated_at")
+        await init_db()
+        fast_path = 'ix_fsm_states_updated_at' in await indexes()
+
+        # A missing table or a changed fingerprint takes the full path
+        await sqlite("DROP TABLE money_ledger")
+        await init_db()
+        tables = {name for name, in await sqlite("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        await sqlite("PRAGMA user_version = 0")
+        await init_db()
+        return version, fast_path, tables, await indexes(), (await sqlite("PRAGMA user_version"))[0][0]
+
+    version, fast_path, tables, indexes_after, version_after = run(scenario())
+
+    assert version == version_after == _schema_fingerprint()
+    assert not fast_path
+    assert 'money_ledger' in tables
+    assert 'ix_fsm_states_updated_at' in indexes_after
+
+
+def test_seed_fills_empty_tables_once(run):
+    from sqlalchemy import delete, func, select
+    from config.database import AsyncSessionLocal
+    from data_init import game_items, seed_game_data
+    from data_init_skills import game_skills
+    from models.skill import Skill
+
+    async def scenario():
+        first = await seed_game_data()
+        second = await seed_game_data()
+
+        # Only the empty table is seeded again
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Skill))
+            await session.commit()
+        third = await seed_game_data()
+
+        async with AsyncSessionLocal() as session:
+            skills = await session.scalar(select(func.count(Skill.id)))
+        return first, second, third, skills
+
+    first, second, third, skills = run(scenario())
+
+    assert first == (len(game_items()), len(game_skills()))
+    assert second == (0, 0)
+    assert third == (0, len(game_skills())) and skills == len(game_skills())
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+
+
+def message_update(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": "/start"
+        }
+    }
+
+
+def test_updates_are_sharded_by_user_and_bus_messages_relayed():
+    from aiogram.types import Update
+    from supervisor import Supervisor, encode
+
+    async def connect(socket_path: str, shard: int):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(encode({'type': 'hello', 'shard': shard}))
+        return reader, writer
+
+    async def received(reader, count: int):
+        return [json.loads(await asyncio.wait_for(reader.readline(), 5)) for _ in range(count)]
+
+    async def scenario():
+        supervisor = Supervisor(workers=2, socket_path=str(Path(tempfile.mkdtemp()) / "workers.sock"))
+        await supervisor.listen()
+
+        # Worker 1 is still starting: its updates wait for it
+        reader_0, writer_0 = await connect(supervisor.socket_path, 0)
+        await asyncio.sleep(0.05)
+        for update_id, user_id in enumerate([10, 11, 12, 13, 10, 11], 1):
+            supervisor.forward(Update.model_validate(message_update(update_id, user_id)))
+        reader_1, writer_1 = await connect(supervisor.socket_path, 1)
+
+        to_0 = await received(reader_0, 3)
+        to_1 = await received(reader_1, 3)
+
+        writer_0.write(encode({'type': 'bus', 'topic': 'users', 'ids': [10, 12]}))
+        relayed = await received(reader_1, 1)
+
+        writer_0.close()
+        writer_1.close()
+        await supervisor.stop(timeout=1)
+        return to_0, to_1, relayed
+
+    to_0, to_1, relayed = asyncio.run(scenario())
+
+    assert [m['update']['message']['from']['id'] for m in to_0] == [10, 12, 10]
+    assert [m['update']['update_id'] for m in to_1] == [2, 4, 6]
+    assert relayed == [{'type': 'bus', 'topic': 'users', 'ids': [10, 12]}]
+
+
+def test_only_one_process_holds_the_scheduler_lock():
+    from utils.leader import LeaderLock
+
+    path = str(Path(tempfile.mkdtemp()) / "scheduler.lock")
+    leader, follower = LeaderLock(path), LeaderLock(path)
+
+    assert leader.try_acquire()
+    assert not follower.try_acquire()
+
+    leader.release()  # e.g. the leader died
+    assert follower.try_acquire() and follower.held
+    follower.release()
+
+
+def test_players_changed_by_another_worker_are_reloaded(run):
+    from sqlalchemy import update
+    from config.database import AsyncSessionLocal
+    from models.user import User
+    from services.leaderboard_service import leaderboards
+    from services.opponent_index import opponent_index
+    from services.worker_bus import worker_bus
+
+    async def scenario():
+        async with AsyncSessionLocal() as session:
+            session.add_all([
+                User(id=1, name="north_1", gender="male", kingdom="north", level=5, money=500),
+                User(id=2, name="north_2", gender="male", kingdom="north", level=3, money=900),
+            ])
+            await session.commit()
+        await leaderboards.load()
+        await opponent_index.load()
+
+        sent = []
+        worker_bus.attach(sent.append)
+        try:
+            # Local changes are announced once per loop iteration
+            async with AsyncSessionLocal() as session:
+                (await session.get(User, 1)).pvp_wins = 3
+                await session.commit()
+            await asyncio.sleep(0)
+            leaderboards.update_player(2, money=950)
+            leaderboards.update_player(1, money=600)
+            await asyncio.sleep(0)
+
+            # Another worker levelled player 2 up
+            async with AsyncSessionLocal() as session:
+                await session.execute(update(User).where(User.id == 2).values(level=20, experience=10))
+                await session.commit()
+            worker_bus.receive({'type': 'bus', 'topic': 'users', 'ids': [2]})
+            await asyncio.gather(*worker_bus._tasks)
+        finally:
+            worker_bus.detach()
+
+        return sent, leaderboards.rank('level', 2), opponent_index.get(2).level
+
+    sent, rank, level = run(scenario())
+
+    assert [message['ids'] for message in sent] == [[1], [1, 2]]
+    assert rank == 1 and level == 20
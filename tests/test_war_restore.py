@@ -0,0 +1,165 @@
+def test_participants_of_a_finished_war_are_restored_once(run):
+    from datetime import datetime, timedelta
+    from sqlalchemy import select
+    from config.database import AsyncSessionLocal
+    from models.kingdom_war import KingdomWar, WarParticipation, WarStatusEnum
+    from models.user import User
+    from war_scheduler import EnhancedKingdomWarScheduler
+
+    async def scenario():
+        scheduler = EnhancedKingdomWarScheduler()
+        service = scheduler.war_service
+        await service.schedule_daily_wars(datetime.now(service.tashkent_tz))
+
+        async with AsyncSessionLocal() as session:
+            war = await session.scalar(select(KingdomWar).order_by(KingdomWar.scheduled_time).limit(1))
+            war.status = WarStatusEnum.active
+            session.add(User(id=1, name="veteran", gender="male", kingdom="north", current_hp=10, current_mana=0))
+            session.add(User(id=2, name="bystander", gender="male", kingdom="west", current_hp=10, current_mana=0))
+            session.add(WarParticipation(war_id=war.id, user_id=1, kingdom="north", role="defender"))
+            await session.commit()
+            war_id = war.id
+
+        # The restore job fires while a misfired run is still resolving the war
+        while_active = await service.restore_war_participants()
+
+        async with AsyncSessionLocal() as session:
+            war = await session.get(KingdomWar, war_id)
+            war.status = WarStatusEnum.finished
+            war.finished_at = datetime.utcnow() + timedelta(hours=3)
+            await session.commit()
+
+        await scheduler.restore_participants(8)
+
+        async with AsyncSessionLocal() as session:
+            veteran = await session.get(User, 1)
+            bystander = await session.get(User, 2)
+            restored = (veteran.current_hp == veteran.max_hp, veteran.current_mana == veteran.max_mana)
+            untouched = bystander.current_hp
+            flagged = (await session.get(KingdomWar, war_id)).participants_restored
+        return while_active, restored, untouched, flagged, await service.restore_war_participants()
+
+    while_active, restored, untouched, flagged, second_run = run(scenario())
+
+    assert while_active == 0
+    assert restored == (True, True)
+    assert untouched == 10
+    assert flagged
+    assert second_run == 0
+
+
+def test_overdue_wars_are_cancelled_not_finished(run):
+    from datetime import datetime, timedelta
+    from sqlalchemy import select
+    from config.database import AsyncSessionLocal
+    from models.kingdom_war import KingdomWar, WarParticipation, WarStatusEnum
+    from models.user import User
+    from services.enhanced_kingdom_war_service import EnhancedKingdomWarService
+
+    async def scenario():
+        service = EnhancedKingdomWarService()
+        await service.schedule_daily_wars(datetime.now(service.tashkent_tz) - timedelta(days=1))
+
+        async with AsyncSessionLocal() as session:
+            war = await session.scalar(select(KingdomWar).limit(1))
+            session.add(User(id=1, name="late", gender="male", kingdom="north", current_hp=10))
+            session.add(WarParticipation(war_id=war.id, user_id=1, kingdom="north", role="defender"))
+            await session.commit()
+
+        blocked, _ = await service.check_user_war_block(1)
+        cancelled = await service.cancel_overdue_wars(datetime.utcnow())
+
+        async with AsyncSessionLocal() as session:
+            statuses = set((await session.scalars(select(KingdomWar.status))).all())
+        released, _ = await service.check_user_war_block(1)
+        return blocked, cancelled, statuses, released, await service.restore_war_participants()
+
+    blocked, cancelled, statuses, released, restored = run(scenario())
+
+    assert blocked and not released
+    assert cancelled > 0
+    assert statuses == {WarStatusEnum.cancelled}
+    assert restored == 0
+
+
+def test_restored_flag_is_backfilled_from_war_state(run):
+    from datetime import datetime, timedelta
+    from sqlalchemy import select, text
+    from config.database import AsyncSessionLocal, engine, init_db
+    from models.kingdom_war import KingdomWar, WarStatusEnum
+
+    async def scenario():
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            session.add_all([
+                KingdomWar(id=1, scheduled_time=now - timedelta(days=1), defending_kingdom="north",
+                           status=WarStatusEnum.finished, finished_at=now - timedelta(days=1)),
+                KingdomWar(id=2, scheduled_time=now - timedelta(hours=1), defending_kingdom="west",
+                           status=WarStatusEnum.finished, finished_at=now - timedelta(minutes=30)),
+                KingdomWar(id=3, scheduled_time=now + timedelta(hours=1), defending_kingdom="east",
+                           status=WarStatusEnum.scheduled),
+            ])
+            await session.commit()
+
+        # A database from before the column existed
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE kingdom_wars DROP COLUMN participants_restored"))
+            await conn.execute(text("PRAGMA user_version = 0"))
+        await init_db()
+
+        async with AsyncSessionLocal() as session:
+            rows = await session.execute(select(KingdomWar.id, KingdomWar.participants_restored).order_by(KingdomWar.id))
+            return dict(rows.all())
+
+    assert run(scenario()) == {1: True, 2: False, 3: False}
+
+
+def test_war_interrupted_during_resolution_is_resolved_on_reconcile(run):
+    from datetime import datetime, timedelta
+    from sqlalchemy import update
+    from config.database import AsyncSessionLocal
+    from models.kingdom_war import KingdomWar, WarParticipation, WarStatusEnum
+    from models.user import User
+    from war_scheduler import EnhancedKingdomWarScheduler
+
+    async def scenario():
+        scheduler = EnhancedKingdomWarScheduler()
+        service = scheduler.war_service
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            session.add_all([
+                User(id=1, name="raider", gender="male", kingdom="west", current_hp=10),
+                User(id=2, name="guard", gender="male", kingdom="north", current_hp=10),
+                KingdomWar(id=1, scheduled_time=now, defending_kingdom="north"),
+                WarParticipation(war_id=1, user_id=1, kingdom="west", role="attacker"),
+                WarParticipation(war_id=1, user_id=2, kingdom="north", role="defender"),
+            ])
+            await session.commit()
+
+        # The process dies after the war is committed as active, before its battles are resolved
+        resolve = service._process_enhanced_war_battles
+        async def crash(war, session):
+            raise RuntimeError("killed")
+        service._process_enhanced_war_battles = crash
+        try:
+            await service.start_enhanced_war(1)
+        except RuntimeError:
+            pass
+        service._process_enhanced_war_battles = resolve
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(update(KingdomWar).values(started_at=now - timedelta(hours=1)))
+            await session.commit()
+
+        await scheduler.reconcile_overdue_wars()
+
+        async with AsyncSessionLocal() as session:
+            war = await session.get(KingdomWar, 1)
+            users = [await session.get(User, user_id) for user_id in (1, 2)]
+            return war.status, war.participants_restored, [user.current_hp == user.max_hp for user in users]
+
+    status, restored, full_hp = run(scenario())
+
+    assert status == WarStatusEnum.finished
+    assert restored
+    assert full_hp == [True, True]
@@ -0,0 +1,33 @@
+def squad(strength, armor, hp, agility):
+    return {'total_strength': strength, 'total_armor': armor, 'total_hp': hp,
+            'total_agility': agility, 'total_mana': 0, 'player_count': 1}
+
+
+def test_skewed_squads_give_both_outcomes():
+    from utils.war_rules import WarRules
+
+    strong = squad(strength=900, armor=300, hp=3000, agility=600)
+    weak = squad(strength=20, armor=20, hp=200, agility=20)
+
+    broken, winners = WarRules.resolve_battles('north', {'west': strong}, weak, WarRules.defense_buff(1))
+    held, no_winners = WarRules.resolve_battles('north', {'west': weak}, strong, WarRules.defense_buff(1))
+
+    assert winners == ['west'] and broken[0]['result'] == 'victory'
+    assert no_winners == [] and held[0]['result'] == 'defeat'
+
+
+def test_simulator_report_flags_one_sided_runs():
+    import numpy as np
+    from war_simulator import Population, WarSimulator, format_report
+
+    def report(attack_rate, defend_rate, online_rate):
+        rng = np.random.default_rng(1)
+        simulator = WarSimulator(Population(400, rng), rng, attack_rate, defend_rate, online_rate, 50)
+        simulator.run(10)
+        return simulator, format_report(simulator, 10, 0.0)
+
+    held, held_report = report(0.05, 0.05, 0.1)
+    mixed, mixed_report = report(0.15, 0.01, 0.01)
+
+    assert held.victories == 0 and "one-sided" in held_report
+    assert mixed.victories and mixed.defense_holds and "one-sided" not in mixed_report
@@ -0,0 +1,114 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+
+def message_update(update_id: int, user_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": text
+        }
+    }
+
+
+def test_runner_keeps_user_order_and_caps_concurrency():
+    from utils.update_runner import KeyedTaskRunner
+
+    async def scenario():
+        runner = KeyedTaskRunner(max_concurrency=3)
+        running = 0
+        peak = 0
+        handled = {user_id: [] for user_id in range(10)}
+
+        async def handle(user_id: int, seq: int):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001 * ((user_id + seq) % 3))
+            handled[user_id].append(seq)
+            running -= 1
+
+        for seq in range(5):
+            for user_id in range(10):
+                runner.submit(user_id, lambda user_id=user_id, seq=seq: handle(user_id, seq))
+
+        assert await runner.join(5)
+        return runner, peak, handled
+
+    runner, peak, handled = asyncio.run(scenario())
+
+    assert peak == 3
+    assert all(seqs == [0, 1, 2, 3, 4] for seqs in handled.values())
+    assert runner.completed == 50 and runner.pending_count == 0
+
+
+def test_runner_survives_failing_jobs():
+    from utils.update_runner import KeyedTaskRunner
+
+    async def scenario():
+        runner = KeyedTaskRunner(max_concurrency=2)
+        done = []
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        async def ok():
+            done.append(True)
+
+        runner.submit(1, fail)
+        runner.submit(1, ok)
+        assert await runner.join(5)
+        return runner, done
+
+    runner, done = asyncio.run(scenario())
+
+    assert done == [True]
+    assert runner.failed == 1 and runner.completed == 1
+
+
+def test_webhook_checks_secret_and_feeds_dispatcher():
+    from aiogram import Bot, Dispatcher, Router
+    from aiogram.types import Message
+    from utils.update_runner import KeyedTaskRunner
+    from webhook import SECRET_HEADER, create_webhook_app
+
+    async def scenario():
+        received = []
+        router = Router()
+
+        @router.message()
+        async def on_message(message: Message):
+            received.append((message.from_user.id, message.text))
+
+        dp = Dispatcher()
+        dp.include_router(router)
+        bot = Bot(token="42:TEST")
+        runner = KeyedTaskRunner(max_concurrency=10)
+        app = create_webhook_app(dp, bot, runner, "/webhook", "s3cret")
+
+        async with TestClient(TestServer(app)) as client:
+            missing = await client.post("/webhook", json=message_update(1, 7, "no secret"))
+            wrong = await client.post("/webhook", json=message_update(2, 7, "wrong"),
+                                      headers={SECRET_HEADER: "guess"})
+            malformed = await client.post("/webhook", data=b"not json",
+                                          headers={SECRET_HEADER: "s3cret"})
+            accepted = [
+                await client.post("/webhook", json=message_update(10 + seq, 7, f"msg {seq}"),
+                                  headers={SECRET_HEADER: "s3cret"})
+                for seq in range(3)
+            ]
+            assert await runner.join(5)
+
+        await bot.session.close()
+        return missing.status, wrong.status, malformed.status, [r.status for r in accepted], received
+
+    missing, wrong, malformed, accepted, received = asyncio.run(scenario())
+
+    assert (missing, wrong, malformed) == (401, 401, 400)
+    assert accepted == [200, 200, 200]
+    assert received == [(7, "msg 0"), (7, "msg 1"), (7, "msg 2")]